@@ -1,15 +1,19 @@
 from django.contrib import admin
+from django.urls import reverse
+from django.utils.html import format_html
 from import_export import resources, fields
 from import_export.widgets import ForeignKeyWidget
-from import_export.admin import ImportExportModelAdmin
 from .models import (
     Company, CompanyTag, Metric, Lead, Investment, UserProfile,
     HighLevelAnalysis, PerceptionAnalysis, MarketAnalysis,
     KeyIndividualsAnalysis, CompetitiveAnalysis,
     KeyIndividual, IndividualRisk, PublicMention, Competitor, StrategicRecommendation,
     SentimentBySource, CompetitorSentiment, RecentMention, KeyTopic, BrandMetric, RiskAlert,
-    RevenueInformation, MarketForce, SalesChannel, IndustryTrend
+    RevenueInformation, MarketForce, SalesChannel, IndustryTrend, Job, ArchivedRow,
+    RequestProfile, CompetitorEdge
 )
+from . import jobs
+from .admin_tools import CachedValuesFilter, EstimatedCountPaginator, ScalableAdmin, ScoreBandFilter
 
 # =============================
 # Import-Export Resources
@@ -78,26 +82,84 @@ class InvestmentResource(resources.ModelResource):
             "updated_at",
         )
 
+# =============================
+# Background admin actions
+# =============================
+
+def _enqueue_bulk_update(modeladmin, request, queryset, changes):
+    ids = [str(pk) for pk in queryset.values_list('pk', flat=True)]
+    job = jobs.enqueue(
+        'admin_bulk_update',
+        {'model': queryset.model._meta.label, 'ids': ids, 'changes': changes},
+        user=request.user,
+    )
+    modeladmin.message_user(
+        request,
+        f"Queued job {job.pk} to update {len(ids)} {queryset.model._meta.verbose_name_plural}. "
+        f"Track its progress at /api/jobs/{job.pk}/."
+    )
+
+
+@admin.action(description="Mark selected analyses as completed (background job)")
+def mark_completed_in_background(modeladmin, request, queryset):
+    _enqueue_bulk_update(modeladmin, request, queryset, {'is_completed': True})
+
+
+@admin.action(description="Deactivate selected companies (background job)")
+def deactivate_in_background(modeladmin, request, queryset):
+    _enqueue_bulk_update(modeladmin, request, queryset, {'is_active': False})
+
+
+@admin.action(description="Recompute AI match score of selected leads (background job)")
+def rescore_in_background(modeladmin, request, queryset):
+    ids = [str(pk) for pk in queryset.values_list('pk', flat=True)]
+    job = jobs.enqueue('score_leads', {'ids': ids, 'force': True}, user=request.user)
+    modeladmin.message_user(
+        request, f"Queued job {job.pk} to rescore {len(ids)} leads. Track its progress at /api/jobs/{job.pk}/."
+    )
+
+
 @admin.register(Company)
-class CompanyAdmin(ImportExportModelAdmin):
+class CompanyAdmin(ScalableAdmin):
     list_display = ['name', 'industry', 'stage', 'founded_year', 'ai_score', 'is_active', 'created_at']
-    list_filter = ['industry', 'stage', 'is_active', 'created_at']
+    list_filter = [('industry', CachedValuesFilter), 'stage', 'is_active', 'created_at']
     search_fields = ['name', 'description', 'headquarters']
-    readonly_fields = ['id', 'created_at', 'updated_at']
+    readonly_fields = ['id', 'ai_score', 'ai_confidence', 'created_at', 'updated_at']
     resource_classes = [CompanyResource]
+    actions = [deactivate_in_background]
 
 @admin.register(CompanyTag)
-class CompanyTagAdmin(ImportExportModelAdmin):
+class CompanyTagAdmin(ScalableAdmin):
     list_display = ['name', 'company']
-    list_filter = ['company__industry']
+    list_filter = [('company__industry', CachedValuesFilter)]
+    search_fields = ['name', 'company__name']
+    list_select_related = ['company']
+    autocomplete_fields = ['company']
+
+class AnalysisAdmin(ScalableAdmin):
+    """Base of the analysis admins; __str__ (also in autocomplete results) reads company.name"""
+    list_select_related = ['company', 'analyst']
+    autocomplete_fields = ['company', 'analyst']
+
+    def get_queryset(self, request):
+        # The changelist skips list_select_related once the queryset selects anything
+        return super().get_queryset(request).select_related(*self.list_select_related)
+
+
+class AnalysisChildAdmin(ScalableAdmin):
+    """Base of the admins of rows that belong to an analysis"""
+    list_select_related = ['analysis__company']
+    autocomplete_fields = ['analysis']
+
 
 # Analysis Admins for each type
 @admin.register(HighLevelAnalysis)
-class HighLevelAnalysisAdmin(ImportExportModelAdmin):
+class HighLevelAnalysisAdmin(AnalysisAdmin):
     list_display = ['company', 'title', 'overall_score', 'is_completed', 'analyst', 'created_at']
     list_filter = ['is_completed', 'created_at']
     search_fields = ['title', 'summary', 'company__name']
     readonly_fields = ['id', 'created_at', 'updated_at']
+    actions = [mark_completed_in_background]
     fieldsets = (
         (None, {
             'fields': ('company', 'title', 'summary', 'key_findings', 'risk_factors', 'opportunities', 'recommendations', 'overall_score', 'confidence_score', 'analyst', 'is_completed', 'created_at', 'updated_at')
@@ -165,11 +227,12 @@ class RiskAlertInline(admin.StackedInline):
     fields = ('title', 'priority', 'description', 'impact', 'recommendation', 'display_order')
 
 @admin.register(PerceptionAnalysis)
-class PerceptionAnalysisAdmin(ImportExportModelAdmin):
+class PerceptionAnalysisAdmin(AnalysisAdmin):
     list_display = ['company', 'title', 'overall_score', 'sentiment_score', 'is_completed', 'analyst', 'created_at']
     list_filter = ['is_completed', 'created_at']
     search_fields = ['title', 'summary', 'company__name']
     readonly_fields = ['id', 'created_at', 'updated_at']
+    actions = [mark_completed_in_background]
     inlines = [SentimentBySourceInline, CompetitorSentimentInline, RecentMentionInline, KeyTopicInline, BrandMetricInline, RiskAlertInline]
     fieldsets = (
         ('Basic Information', {
@@ -193,11 +256,12 @@ class RevenueInformationInline(admin.StackedInline):
     fields = ('title', 'source', 'date', 'url', 'revenue_figure', 'description', 'reliability', 'growth_rate', 'display_order')
 
 @admin.register(MarketAnalysis)
-class MarketAnalysisAdmin(ImportExportModelAdmin):
+class MarketAnalysisAdmin(AnalysisAdmin):
     list_display = ['company', 'title', 'overall_score', 'is_completed', 'analyst', 'created_at']
     list_filter = ['is_completed', 'created_at']
     search_fields = ['title', 'summary', 'company__name']
     readonly_fields = ['id', 'created_at', 'updated_at']
+    actions = [mark_completed_in_background]
     inlines = [RevenueInformationInline]
     fieldsets = (
         ('Basic Information', {
@@ -242,11 +306,12 @@ class StrategicRecommendationInline(admin.StackedInline):
     fields = ('category', 'priority', 'recommendations', 'description', 'display_order')
 
 @admin.register(KeyIndividualsAnalysis)
-class KeyIndividualsAnalysisAdmin(ImportExportModelAdmin):
+class KeyIndividualsAnalysisAdmin(AnalysisAdmin):
     list_display = ['company', 'title', 'overall_score', 'is_completed', 'analyst', 'created_at']
     list_filter = ['is_completed', 'created_at']
     search_fields = ['title', 'summary', 'company__name']
     readonly_fields = ['id', 'created_at', 'updated_at']
+    actions = [mark_completed_in_background]
     inlines = [KeyIndividualInline, IndividualRiskInline, PublicMentionInline]
     fieldsets = (
         (None, {
@@ -255,11 +320,12 @@ class KeyIndividualsAnalysisAdmin(ImportExportModelAdmin):
     )
 
 @admin.register(CompetitiveAnalysis)
-class CompetitiveAnalysisAdmin(ImportExportModelAdmin):
+class CompetitiveAnalysisAdmin(AnalysisAdmin):
     list_display = ['company', 'title', 'overall_score', 'is_completed', 'analyst', 'created_at']
     list_filter = ['is_completed', 'created_at']
     search_fields = ['title', 'summary', 'company__name']
     readonly_fields = ['id', 'created_at', 'updated_at']
+    actions = [mark_completed_in_background]
     inlines = [CompetitorInline, StrategicRecommendationInline]
     fieldsets = (
         ('Basic Information', {
@@ -291,27 +357,27 @@ class CompetitiveAnalysisAdmin(ImportExportModelAdmin):
 
 
 @admin.register(KeyIndividual)
-class KeyIndividualAdmin(ImportExportModelAdmin):
+class KeyIndividualAdmin(AnalysisChildAdmin):
     list_display = ['analysis', 'name', 'role', 'is_board_member', 'credibility_score']
     list_filter = ['is_board_member']
     search_fields = ['name', 'role', 'analysis__company__name']
 
 
 @admin.register(IndividualRisk)
-class IndividualRiskAdmin(ImportExportModelAdmin):
+class IndividualRiskAdmin(AnalysisChildAdmin):
     list_display = ['analysis', 'title']
     search_fields = ['title', 'analysis__company__name']
 
 
 @admin.register(PublicMention)
-class PublicMentionAdmin(ImportExportModelAdmin):
+class PublicMentionAdmin(AnalysisChildAdmin):
     list_display = ['analysis', 'title', 'person', 'source', 'date', 'sentiment']
-    list_filter = ['sentiment', 'date']
+    list_filter = [('sentiment', CachedValuesFilter), 'date']
     search_fields = ['title', 'person', 'source', 'analysis__company__name']
 
 
 @admin.register(Competitor)
-class CompetitorAdmin(ImportExportModelAdmin):
+class CompetitorAdmin(AnalysisChildAdmin):
     list_display = ['analysis', 'name', 'score', 'trend', 'market_share', 'display_order']
     list_filter = ['trend']
     search_fields = ['name', 'position', 'analysis__company__name']
@@ -333,7 +399,7 @@ class CompetitorAdmin(ImportExportModelAdmin):
 
 
 @admin.register(StrategicRecommendation)
-class StrategicRecommendationAdmin(ImportExportModelAdmin):
+class StrategicRecommendationAdmin(AnalysisChildAdmin):
     list_display = ['analysis', 'category', 'priority', 'display_order']
     list_filter = ['priority']
     search_fields = ['category', 'description', 'analysis__company__name']
@@ -350,15 +416,15 @@ class StrategicRecommendationAdmin(ImportExportModelAdmin):
 
 
 @admin.register(SentimentBySource)
-class SentimentBySourceAdmin(ImportExportModelAdmin):
+class SentimentBySourceAdmin(AnalysisChildAdmin):
     list_display = ['analysis', 'source_name', 'positive_percentage', 'mentions_count', 'sentiment_label', 'display_order']
-    list_filter = ['source_name', 'sentiment_label']
+    list_filter = [('source_name', CachedValuesFilter), ('sentiment_label', CachedValuesFilter)]
     search_fields = ['source_name', 'analysis__company__name']
     ordering = ['display_order', '-positive_percentage']
 
 
 @admin.register(CompetitorSentiment)
-class CompetitorSentimentAdmin(ImportExportModelAdmin):
+class CompetitorSentimentAdmin(AnalysisChildAdmin):
     list_display = ['analysis', 'company_name', 'positive_percentage', 'mentions_count', 'is_current_company', 'display_order']
     list_filter = ['is_current_company']
     search_fields = ['company_name', 'analysis__company__name']
@@ -366,12 +432,12 @@ class CompetitorSentimentAdmin(ImportExportModelAdmin):
 
 
 @admin.register(RecentMention)
-class RecentMentionAdmin(ImportExportModelAdmin):
+class RecentMentionAdmin(AnalysisChildAdmin):
     list_display = ['title', 'source', 'date', 'sentiment_label', 'sentiment_score', 'engagement_level', 'display_order']
-    list_filter = ['source', 'sentiment_label', 'engagement_level', 'date']
+    list_filter = [('source', CachedValuesFilter), ('sentiment_label', CachedValuesFilter), 'engagement_level', 'date']
     search_fields = ['title', 'source', 'excerpt', 'analysis__company__name']
     ordering = ['display_order', '-date']
-    date_hierarchy = 'date'
+    list_select_related = False
     fieldsets = (
         ('Basic Information', {
             'fields': ('analysis', 'title', 'source', 'date', 'url', 'display_order')
@@ -389,9 +455,9 @@ class RecentMentionAdmin(ImportExportModelAdmin):
 
 
 @admin.register(KeyTopic)
-class KeyTopicAdmin(ImportExportModelAdmin):
+class KeyTopicAdmin(AnalysisChildAdmin):
     list_display = ['topic_name', 'analysis', 'sentiment_score', 'mentions_count', 'trend', 'display_order']
-    list_filter = ['trend', 'sentiment_score']
+    list_filter = ['trend', ('sentiment_score', ScoreBandFilter)]
     search_fields = ['topic_name', 'description', 'analysis__company__name']
     ordering = ['display_order', '-sentiment_score']
     fieldsets = (
@@ -409,9 +475,9 @@ class KeyTopicAdmin(ImportExportModelAdmin):
 
 
 @admin.register(BrandMetric)
-class BrandMetricAdmin(ImportExportModelAdmin):
+class BrandMetricAdmin(AnalysisChildAdmin):
     list_display = ['metric_name', 'analysis', 'current_score', 'industry_benchmark', 'benchmark_difference', 'trend', 'display_order']
-    list_filter = ['trend', 'current_score']
+    list_filter = ['trend', ('current_score', ScoreBandFilter)]
     search_fields = ['metric_name', 'description', 'analysis__company__name']
     ordering = ['display_order', '-current_score']
     readonly_fields = ['benchmark_difference', 'is_above_benchmark']
@@ -430,7 +496,7 @@ class BrandMetricAdmin(ImportExportModelAdmin):
 
 
 @admin.register(RiskAlert)
-class RiskAlertAdmin(ImportExportModelAdmin):
+class RiskAlertAdmin(AnalysisChildAdmin):
     list_display = ['title', 'analysis', 'priority', 'display_order']
     list_filter = ['priority']
     search_fields = ['title', 'description', 'impact', 'recommendation', 'analysis__company__name']
@@ -451,12 +517,12 @@ class RiskAlertAdmin(ImportExportModelAdmin):
 
 
 @admin.register(RevenueInformation)
-class RevenueInformationAdmin(ImportExportModelAdmin):
+class RevenueInformationAdmin(AnalysisChildAdmin):
     list_display = ['title', 'revenue_figure', 'source', 'date', 'reliability', 'display_order']
-    list_filter = ['reliability', 'source', 'date']
+    list_filter = ['reliability', ('source', CachedValuesFilter), 'date']
     search_fields = ['title', 'revenue_figure', 'description', 'source', 'analysis__company__name']
     ordering = ['display_order', '-date']
-    date_hierarchy = 'date'
+    list_select_related = False
     fieldsets = (
         ('Basic Information', {
             'fields': ('analysis', 'title', 'source', 'date', 'url', 'display_order')
@@ -471,7 +537,7 @@ class RevenueInformationAdmin(ImportExportModelAdmin):
 
 
 @admin.register(MarketForce)
-class MarketForceAdmin(ImportExportModelAdmin):
+class MarketForceAdmin(AnalysisChildAdmin):
     list_display = ['force_name', 'analysis', 'intensity', 'score', 'display_order']
     list_filter = ['intensity']
     search_fields = ['force_name', 'description', 'analysis__company__name']
@@ -487,7 +553,7 @@ class MarketForceAdmin(ImportExportModelAdmin):
 
 
 @admin.register(SalesChannel)
-class SalesChannelAdmin(ImportExportModelAdmin):
+class SalesChannelAdmin(AnalysisChildAdmin):
     list_display = ['platform_name', 'analysis', 'count_unit', 'installs_count', 'revenue_amount', 'rating', 'display_order']
     list_filter = []
     search_fields = ['platform_name', 'analysis__company__name']
@@ -503,7 +569,7 @@ class SalesChannelAdmin(ImportExportModelAdmin):
 
 
 @admin.register(IndustryTrend)
-class IndustryTrendAdmin(ImportExportModelAdmin):
+class IndustryTrendAdmin(AnalysisChildAdmin):
     list_display = ['title', 'analysis', 'impact', 'relevance', 'display_order']
     list_filter = ['impact']
     search_fields = ['title', 'description', 'analysis__company__name']
@@ -519,26 +585,106 @@ class IndustryTrendAdmin(ImportExportModelAdmin):
 
 
 @admin.register(Metric)
-class MetricAdmin(ImportExportModelAdmin):
+class MetricAdmin(ScalableAdmin):
     list_display = ['analysis', 'category', 'name', 'value', 'score', 'trend']
     list_filter = ['category', 'trend']
 
+    def get_queryset(self, request):
+        # analysis is a generic foreign key: one query per analysis type, not per row
+        return super().get_queryset(request).prefetch_related('analysis__company')
+
 @admin.register(Lead)
-class LeadAdmin(ImportExportModelAdmin):
+class LeadAdmin(ScalableAdmin):
     list_display = ['company', 'status', 'priority', 'assigned_to', 'ai_match_score', 'created_at']
     list_filter = ['status', 'priority', 'created_at']
     search_fields = ['company__name', 'source', 'notes']
     resource_classes = [LeadResource]
+    actions = [rescore_in_background]
+    list_select_related = ['company', 'assigned_to']
+    autocomplete_fields = ['company', 'assigned_to']
+
+    def get_queryset(self, request):
+        # __str__, also in the Investment form's autocomplete, reads company.name
+        return super().get_queryset(request).select_related(*self.list_select_related)
 
 @admin.register(Investment)
-class InvestmentAdmin(ImportExportModelAdmin):
+class InvestmentAdmin(ScalableAdmin):
     list_display = ['company', 'amount', 'currency', 'status', 'investment_date', 'created_by']
-    list_filter = ['status', 'currency', 'investment_date']
+    list_filter = ['status', ('currency', CachedValuesFilter), 'investment_date']
     search_fields = ['company__name']
     resource_classes = [InvestmentResource]
+    list_select_related = ['company', 'created_by']
+    autocomplete_fields = ['company', 'lead', 'created_by']
 
 @admin.register(UserProfile)
-class UserProfileAdmin(ImportExportModelAdmin):
+class UserProfileAdmin(ScalableAdmin):
     list_display = ['user', 'role', 'created_at']
     list_filter = ['role', 'created_at']
     search_fields = ['user__username', 'user__email']
+    list_select_related = ['user']
+    autocomplete_fields = ['user', 'watched_companies']
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ['kind', 'status', 'progress_current', 'progress_total', 'created_by', 'created_at', 'finished_at']
+    list_filter = ['status', ('kind', CachedValuesFilter)]
+    search_fields = ['kind', 'progress_message']
+    readonly_fields = [f.name for f in Job._meta.fields]
+    list_select_related = ['created_by']
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def has_add_permission(self, request):
+        return False
+
+
+@admin.register(ArchivedRow)
+class ArchivedRowAdmin(admin.ModelAdmin):
+    list_display = ['model', 'original_id', 'analysis_id', 'row_date', 'reason', 'archived_at']
+    list_filter = [('model', CachedValuesFilter), 'reason']
+    search_fields = ['original_id', 'analysis_id']
+    readonly_fields = [f.name for f in ArchivedRow._meta.fields]
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def has_add_permission(self, request):
+        return False
+
+
+@admin.register(RequestProfile)
+class RequestProfileAdmin(admin.ModelAdmin):
+    list_display = ['created_at', 'method', 'path', 'view', 'status_code', 'duration_ms', 'mode', 'user', 'download']
+    list_filter = ['mode', ('method', CachedValuesFilter), ('status_code', CachedValuesFilter)]
+    search_fields = ['path', 'view']
+    exclude = ['data']
+    readonly_fields = [f.name for f in RequestProfile._meta.fields if f.name != 'data'] + ['download']
+    list_select_related = ['user']
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).defer('data')
+
+    @admin.display(description="Profile")
+    def download(self, obj):
+        return format_html('<a href="{}">{}</a>', reverse('requestprofile-download', args=[obj.pk]), obj.filename)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(CompetitorEdge)
+class CompetitorEdgeAdmin(admin.ModelAdmin):
+    list_display = ['company', 'competitor', 'mentions', 'similarity', 'updated_at']
+    search_fields = ['company__name', 'competitor__name']
+    readonly_fields = [f.name for f in CompetitorEdge._meta.fields]
+    list_select_related = ['company', 'competitor']
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def has_add_permission(self, request):
+        return False
@@ -0,0 +1,138 @@
+"""
+Admin building blocks for tables with hundreds of thousands of rows.
+
+* ``EstimatedCountPaginator``: an unfiltered changelist takes its row count
+  from the database's statistics (PostgreSQL ``reltuples``, SQLite
+  ``sqlite_stat1`` once ``ANALYZE`` has run) instead of ``COUNT(*)`` over the
+  table. Without statistics the count is exact.
+* ``CachedValuesFilter``: ``AllValuesFieldListFilter`` whose choices (a
+  ``SELECT DISTINCT`` over the whole column) are cached until the model
+  changes, using the response cache's model tags (api/cache.py).
+* ``ScoreBandFilter``: 0-100 score columns filtered by fixed bands, one
+  indexed range lookup, instead of one choice per distinct value.
+* ``ScalableAdmin``: the ``ImportExportModelAdmin`` base of the api admins
+  that uses the paginator and never counts the unfiltered table a second
+  time for "(N total)".
+
+Run ``manage.py bench_admin`` to see changelist query counts at scale.
+"""
+from django.conf import settings
+from django.contrib import admin
+from django.contrib.admin.utils import reverse_field_path
+from django.core.cache import caches
+from django.core.paginator import EmptyPage, Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+from import_export.admin import ImportExportModelAdmin
+
+from .cache import model_tag, tag_versions
+
+# Below this many rows an exact count is cheap enough
+ESTIMATE_THRESHOLD = 10000
+
+
+def estimated_row_count(model, using='default'):
+    """Row count of ``model``'s table from the database's statistics, or None"""
+    connection = connections[using]
+    table = model._meta.db_table
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute('SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass', [table])
+            row = cursor.fetchone()
+        elif connection.vendor == 'sqlite':
+            row = _sqlite_stat_rows(cursor, table)
+        else:
+            return None
+    if row is None or row[0] is None or row[0] < 0:
+        return None
+    return int(row[0])
+
+
+def _sqlite_stat_rows(cursor, table):
+    """(rows,) of ``table`` as of the last ANALYZE, or None before the first one"""
+    # MAX(rowid) is no estimate: it never goes down when rows are deleted (e.g. archived)
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'sqlite_stat1'")
+    if cursor.fetchone() is None:
+        return None
+    # One row per index, each stat starting with the table's row count
+    cursor.execute('SELECT stat FROM sqlite_stat1 WHERE tbl = %s', [table])
+    counts = [int(stat.split()[0]) for stat, in cursor.fetchall() if stat]
+    return (max(counts),) if counts else None
+
+
+class EstimatedCountPaginator(Paginator):
+    """Paginator that estimates the count of unfiltered querysets of large tables"""
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if hasattr(queryset, 'query') and not queryset.query.where:
+            estimate = estimated_row_count(queryset.model, queryset.db)
+            if estimate is not None and estimate >= ESTIMATE_THRESHOLD:
+                self.estimated = True
+                return estimate
+        self.estimated = False
+        return super().count
+
+    def validate_number(self, number):
+        try:
+            return super().validate_number(number)
+        except EmptyPage:
+            # The last pages of an overestimated count are empty, not invalid
+            if self.count and self.estimated and int(number) >= 1:
+                return int(number)
+            raise
+
+
+def _filter_cache():
+    return caches[getattr(settings, 'API_CACHE_ALIAS', 'default')]
+
+
+class CachedValuesFilter(admin.AllValuesFieldListFilter):
+    """AllValuesFieldListFilter with the distinct values cached until the model changes"""
+
+    def __init__(self, field, request, params, model, model_admin, field_path):
+        super().__init__(field, request, params, model, model_admin, field_path)
+        parent_model, _ = reverse_field_path(model, field_path)
+        tag = model_tag(parent_model)
+        key = f'admin-filter:{tag}:{field_path}:{tag_versions([tag])[tag]}'
+        choices = _filter_cache().get(key)
+        if choices is None:
+            choices = list(self.lookup_choices)
+            _filter_cache().set(key, choices, getattr(settings, 'API_CACHE_TIMEOUT', 300))
+        self.lookup_choices = choices
+
+
+class ScoreBandFilter(admin.FieldListFilter):
+    """Fixed bands of a 0-100 score"""
+    bands = ((0, 25), (25, 50), (50, 75), (75, 101))
+
+    def __init__(self, field, request, params, model, model_admin, field_path):
+        self.lookup_kwarg_gte = f'{field_path}__gte'
+        self.lookup_kwarg_lt = f'{field_path}__lt'
+        super().__init__(field, request, params, model, model_admin, field_path)
+        self.selected = (
+            self.used_parameters.get(self.lookup_kwarg_gte), self.used_parameters.get(self.lookup_kwarg_lt)
+        )
+
+    def expected_parameters(self):
+        return [self.lookup_kwarg_gte, self.lookup_kwarg_lt]
+
+    def choices(self, changelist):
+        params = self.expected_parameters()
+        yield {
+            'selected': self.selected == (None, None),
+            'query_string': changelist.get_query_string(remove=params),
+            'display': 'All',
+        }
+        for low, high in self.bands:
+            yield {
+                'selected': self.selected == ([str(low)], [str(high)]),
+                'query_string': changelist.get_query_string({params[0]: low, params[1]: high}),
+                'display': f'{low}-{min(high - 1, 100)}',
+            }
+
+
+class ScalableAdmin(ImportExportModelAdmin):
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
@@ -0,0 +1,192 @@
+"""
+Hot/cold archival of analysis child rows.
+
+Mentions, revenue items and the other structured children of an analysis
+only ever grow. ``archive_rows`` moves rows out of the hot tables into the
+compact ``ArchivedRow`` table when either
+
+* the row is dated and older than the archive horizon (mentions, revenue
+  information), or
+* the row belongs to a superseded analysis, i.e. one that is no longer the
+  most recent analysis of its type for the company.
+
+Archived rows are still returned by the analysis endpoints when the request
+asks for them with ``?include_archived=true``; they are rendered through the
+same serializers and flagged with ``"archived": true``.
+"""
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import OuterRef, Q, Subquery
+from django.utils import timezone
+from rest_framework import serializers
+
+from .models import (
+    ArchivedRow,
+    KeyIndividual, IndividualRisk, PublicMention, Competitor, StrategicRecommendation,
+    SentimentBySource, CompetitorSentiment, RecentMention, KeyTopic, BrandMetric, RiskAlert,
+    RevenueInformation, MarketForce, SalesChannel, IndustryTrend
+)
+
+# Child model -> date field the age horizon applies to (None: superseded only)
+ARCHIVE_POLICIES = {
+    RecentMention: 'date',
+    PublicMention: 'date',
+    RevenueInformation: 'date',
+    SentimentBySource: None,
+    CompetitorSentiment: None,
+    KeyTopic: None,
+    BrandMetric: None,
+    RiskAlert: None,
+    MarketForce: None,
+    SalesChannel: None,
+    IndustryTrend: None,
+    KeyIndividual: None,
+    IndividualRisk: None,
+    Competitor: None,
+    StrategicRecommendation: None,
+}
+
+DEFAULT_BATCH_SIZE = 1000
+
+
+def archive_horizon():
+    return timezone.now().date() - timedelta(days=getattr(settings, 'ARCHIVE_HORIZON_DAYS', 365))
+
+
+def include_archived_requested(request):
+    value = request.query_params.get('include_archived', '')
+    return value.lower() in ('1', 'true', 'yes')
+
+
+def superseded_analysis_ids(analysis_model):
+    """
+    Queryset of the ids of analyses that are not the newest of their type for
+    their company. It stays a subquery: the ids are never loaded into Python.
+    """
+    newest = (
+        analysis_model.objects.filter(company_id=OuterRef('company_id'))
+        .order_by('-created_at')
+        .values('pk')[:1]
+    )
+    return analysis_model.objects.filter(~Q(pk=Subquery(newest))).order_by().values('pk')
+
+
+def _parent_model(child_model):
+    return child_model._meta.get_field('analysis').related_model
+
+
+def _archive_queryset(child_model, reason, superseded_ids=None, horizon=None):
+    queryset = child_model.objects.order_by()
+    if reason == 'age':
+        return queryset.filter(**{f'{ARCHIVE_POLICIES[child_model]}__lt': horizon})
+    return queryset.filter(analysis_id__in=superseded_ids)
+
+
+def _move_batch(child_model, rows, reason):
+    date_field = ARCHIVE_POLICIES[child_model]
+    label = child_model._meta.label
+    archived = []
+    for row in rows:
+        company_id = row.pop('analysis__company_id')
+        archived.append(ArchivedRow(
+            model=label,
+            original_id=str(row['id']),
+            analysis_id=row['analysis_id'],
+            company_id=company_id,
+            row_date=row[date_field] if date_field else None,
+            data=row,
+            reason=reason,
+        ))
+    with transaction.atomic():
+        ArchivedRow.objects.bulk_create(archived)
+        child_model.objects.filter(pk__in=[row['id'] for row in rows]).delete()
+    return len(archived)
+
+
+def archive_rows(models=None, horizon=None, superseded=True, by_age=True,
+                 batch_size=DEFAULT_BATCH_SIZE, dry_run=False, progress=None):
+    """
+    Move eligible rows to the archive. Returns {model label: rows archived}
+    (or rows that would be archived with ``dry_run``).
+    """
+    models = models or list(ARCHIVE_POLICIES)
+    horizon = horizon or archive_horizon()
+    superseded_by_parent = {}
+    counts = defaultdict(int)
+
+    plans = []
+    for child_model in models:
+        if by_age and ARCHIVE_POLICIES[child_model]:
+            plans.append((child_model, 'age'))
+        if superseded:
+            plans.append((child_model, 'superseded'))
+
+    for index, (child_model, reason) in enumerate(plans):
+        superseded_ids = None
+        if reason == 'superseded':
+            parent = _parent_model(child_model)
+            if parent not in superseded_by_parent:
+                ids = superseded_analysis_ids(parent)
+                superseded_by_parent[parent] = ids if ids.exists() else None
+            superseded_ids = superseded_by_parent[parent]
+            if superseded_ids is None:
+                continue
+
+        queryset = _archive_queryset(child_model, reason, superseded_ids, horizon)
+        label = child_model._meta.label
+        if dry_run:
+            if reason == 'superseded' and (child_model, 'age') in plans:
+                # The real run has moved these by age already
+                queryset = queryset.exclude(pk__in=_archive_queryset(child_model, 'age', horizon=horizon))
+            counts[label] += queryset.count()
+            continue
+
+        columns = [f.attname for f in child_model._meta.concrete_fields]
+        while True:
+            rows = list(queryset.values(*columns, 'analysis__company_id')[:batch_size])
+            if not rows:
+                break
+            counts[label] += _move_batch(child_model, rows, reason)
+            if progress:
+                progress(index, len(plans), label)
+    return dict(counts)
+
+
+def restore_instance(archived_row, model):
+    """Rebuild an unsaved model instance from an archived row"""
+    values = {}
+    for field in model._meta.concrete_fields:
+        if field.attname in archived_row.data:
+            values[field.attname] = field.to_python(archived_row.data[field.attname])
+    return model(**values)
+
+
+def merge_archived(items, serializer_class):
+    """
+    Append archived children to serialized analyses (dicts with an ``id``)
+    for every nested ``many=True`` field whose model is archivable.
+    """
+    if not items:
+        return items
+    nested = {}
+    for name, field in serializer_class().fields.items():
+        if isinstance(field, serializers.ListSerializer):
+            child_model = getattr(getattr(field.child, 'Meta', None), 'model', None)
+            if child_model in ARCHIVE_POLICIES:
+                nested[child_model._meta.label] = (name, child_model, type(field.child))
+    if not nested:
+        return items
+
+    by_analysis = {str(item['id']): item for item in items}
+    archived = ArchivedRow.objects.filter(
+        analysis_id__in=list(by_analysis), model__in=list(nested)
+    ).order_by('row_date', 'pk')
+    for row in archived:
+        name, child_model, child_serializer = nested[row.model]
+        data = dict(child_serializer(restore_instance(row, child_model)).data)
+        data['archived'] = True
+        by_analysis[str(row.analysis_id)][name].append(data)
+    return items
@@ -0,0 +1,130 @@
+"""
+Async variants of the composite read endpoints, served under ASGI
+(``uvicorn core.asgi:application``).
+
+DRF views are sync, so these are plain Django async views that reuse DRF's
+authentication and JSON rendering. Each section of the response
+(api/sections.py) is loaded in its own worker thread with its own database
+connection and the sections are awaited together, so a request takes about
+as long as its slowest section instead of the sum of all of them.
+
+Under WSGI they still work, but Django runs them in a per-request event loop,
+so the sync endpoints are the better choice there.
+"""
+import asyncio
+
+from asgiref.sync import sync_to_async
+from django.db import close_old_connections
+from django.http import HttpResponse
+from rest_framework import exceptions, status
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+from rest_framework.views import APIView
+
+from .archive import include_archived_requested
+from .cache import cached_data_async
+from .models import Company
+from .sections import (
+    full_analysis_loaders, build_full_analysis, dashboard_stat_loaders, build_dashboard_stats,
+    recent_analysis_loaders, build_recent_analyses, load_upcoming_tasks
+)
+from .views import CompanyViewSet, DashboardViewSet
+
+
+def _json_response(data, status_code=status.HTTP_200_OK, cache_status=None):
+    response = HttpResponse(JSONRenderer().render(data), status=status_code, content_type='application/json')
+    if cache_status:
+        response['X-Cache'] = cache_status
+    return response
+
+
+def _authenticate(request):
+    """Wrap the request for DRF and run its authenticators and IsAuthenticated"""
+    drf_request = Request(
+        request,
+        authenticators=[auth() for auth in api_settings.DEFAULT_AUTHENTICATION_CLASSES],
+    )
+    drf_request.accepted_renderer = JSONRenderer()
+    drf_request.accepted_media_type = JSONRenderer.media_type
+    try:
+        if not IsAuthenticated().has_permission(drf_request, None):
+            raise exceptions.NotAuthenticated()
+    except exceptions.APIException as exc:
+        authenticate_header = APIView().get_authenticate_header(drf_request)
+        if isinstance(exc, (exceptions.NotAuthenticated, exceptions.AuthenticationFailed)) and not authenticate_header:
+            exc.status_code = status.HTTP_403_FORBIDDEN
+        response = _json_response({'detail': exc.detail}, exc.status_code)
+        if authenticate_header and exc.status_code == status.HTTP_401_UNAUTHORIZED:
+            response['WWW-Authenticate'] = authenticate_header
+        return drf_request, response
+    return drf_request, None
+
+
+def _in_thread(load):
+    """Run a loader on a connection of its own worker thread"""
+    def run():
+        close_old_connections()
+        try:
+            return load()
+        finally:
+            close_old_connections()
+    return sync_to_async(run, thread_sensitive=False)
+
+
+async def load_concurrently(loaders):
+    """Await all loaders at once; {name: result}"""
+    names = list(loaders)
+    results = await asyncio.gather(*(_in_thread(loaders[name])() for name in names))
+    return dict(zip(names, results))
+
+
+async def _handle(request, produce, cached_action):
+    """Authenticate, then serve from the response cache of the sync action"""
+    drf_request, error = await sync_to_async(_authenticate)(request)
+    if error is not None:
+        return error
+    try:
+        data, cache_status = await cached_data_async(
+            drf_request, lambda: produce(drf_request), cached_action.cache_models, cached_action.cache_scope
+        )
+    except Company.DoesNotExist:
+        return _json_response({'detail': 'No Company matches the given query.'}, status.HTTP_404_NOT_FOUND)
+    return _json_response(data, cache_status=cache_status)
+
+
+async def company_full_analysis(request, pk):
+    """Async GET /api/async/companies/{id}/full_analysis/"""
+    async def produce(drf_request):
+        company = await Company.objects.filter(is_active=True).aget(pk=pk)
+        loaders = full_analysis_loaders(company, include_archived=include_archived_requested(drf_request))
+        return build_full_analysis(await load_concurrently(loaders))
+
+    return await _handle(request, produce, CompanyViewSet.full_analysis)
+
+
+async def dashboard_stats(request):
+    """Async GET /api/async/dashboard/stats/"""
+    async def produce(drf_request):
+        results = await load_concurrently(dashboard_stat_loaders())
+        return await sync_to_async(build_dashboard_stats)(results)
+
+    return await _handle(request, produce, DashboardViewSet.stats)
+
+
+async def dashboard_recent_analyses(request):
+    """Async GET /api/async/dashboard/recent_analyses/"""
+    async def produce(drf_request):
+        results = await load_concurrently(recent_analysis_loaders())
+        return await sync_to_async(build_recent_analyses)(results)
+
+    return await _handle(request, produce, DashboardViewSet.recent_analyses)
+
+
+async def dashboard_upcoming_tasks(request):
+    """Async GET /api/async/dashboard/upcoming_tasks/"""
+    async def produce(drf_request):
+        return await sync_to_async(load_upcoming_tasks)(drf_request.user)
+
+    return await _handle(request, produce, DashboardViewSet.upcoming_tasks)
@@ -0,0 +1,161 @@
+"""
+Token authentication without a database query per request.
+
+DRF's ``TokenAuthentication`` loads the token and its user (a join on
+``authtoken_token`` and ``auth_user``) on every request. ``CachedTokenAuthentication``
+keeps the column values of the resolved token and user in a small per-process
+LRU for ``AUTH_TOKEN_CACHE_TIMEOUT`` seconds and builds fresh instances from
+them for every request, so nothing a request caches on its user (permissions,
+profile) reaches another request. Each process entry is tied to a version
+stored in the shared cache, so a cache ``get`` (no SQL) decides whether it is
+still valid. Deleting a token, saving its user (e.g. deactivating them) or
+changing the user's groups or permissions deletes that version from the
+shared cache, which revokes the cached resolution in every process at once.
+
+``EventSource`` cannot send an ``Authorization`` header, and a token in the
+URL ends up in access logs and browser history. The change stream therefore
+takes a *stream ticket* instead: ``issue_stream_ticket`` (``POST
+/api/stream/ticket/``, token-authenticated) returns a random ticket that
+``StreamTicketAuthentication`` accepts once, within ``STREAM_TICKET_SECONDS``.
+"""
+import hashlib
+import secrets
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.db import transaction
+from rest_framework.authentication import BaseAuthentication, TokenAuthentication
+from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import AuthenticationFailed
+
+LOCAL_MAX_ENTRIES = 1024
+
+_local = OrderedDict()
+_local_lock = threading.Lock()
+
+
+def _cache():
+    return caches[getattr(settings, 'API_CACHE_ALIAS', 'default')]
+
+
+def _timeout():
+    return getattr(settings, 'AUTH_TOKEN_CACHE_TIMEOUT', 60)
+
+
+def _version_key(digest):
+    return f'auth-token:{digest}'
+
+
+def _digest(key):
+    # Never keep raw tokens in cache keys
+    return hashlib.sha256(key.encode()).hexdigest()[:32]
+
+
+def _delete_versions(digests):
+    _cache().delete_many([_version_key(digest) for digest in digests])
+
+
+def revoke_token_keys(keys):
+    """Drop the cached resolution of these tokens in every process"""
+    digests = [_digest(key) for key in keys]
+    if digests:
+        _delete_versions(digests)
+        # Again on commit: a request may resolve the token from the
+        # pre-commit state in the meantime
+        transaction.on_commit(lambda: _delete_versions(digests))
+    with _local_lock:
+        for digest in digests:
+            _local.pop(digest, None)
+
+
+def revoke_user_tokens(*users):
+    """``revoke_token_keys`` for every token of these users (instances or ids)"""
+    revoke_token_keys(Token.objects.filter(user__in=users).values_list('key', flat=True))
+
+
+def _values(instance):
+    return tuple(getattr(instance, field.attname) for field in instance._meta.concrete_fields)
+
+
+def _rebuild(model, values, db):
+    return model.from_db(db, [field.attname for field in model._meta.concrete_fields], values)
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """TokenAuthentication that caches the token -> user lookup"""
+
+    def authenticate_credentials(self, key):
+        digest = _digest(key)
+        cache = _cache()
+        version = cache.get(_version_key(digest))
+        now = time.monotonic()
+
+        if version is not None:
+            with _local_lock:
+                entry = _local.get(digest)
+                if entry is not None:
+                    user_values, token_values, db, entry_version, expires_at = entry
+                    if entry_version == version and expires_at > now:
+                        _local.move_to_end(digest)
+                        user = _rebuild(Token._meta.get_field('user').related_model, user_values, db)
+                        token = _rebuild(Token, token_values, db)
+                        token.user = user
+                        return user, token
+        else:
+            # Created before the lookup, so a revoke during it deletes this
+            # version and the entry below is never used
+            version = uuid.uuid4().hex[:12]
+            if not cache.add(_version_key(digest), version, _timeout()):
+                version = cache.get(_version_key(digest), version)
+
+        # Miss: resolve from the database (raises AuthenticationFailed)
+        user, token = super().authenticate_credentials(key)
+
+        with _local_lock:
+            _local[digest] = (_values(user), _values(token), token._state.db, version, now + _timeout())
+            _local.move_to_end(digest)
+            while len(_local) > LOCAL_MAX_ENTRIES:
+                _local.popitem(last=False)
+        return user, token
+
+
+def _ticket_key(ticket):
+    return f'stream-ticket:{_digest(ticket)}'
+
+
+def issue_stream_ticket(user):
+    """A single-use ticket that authenticates ``user`` on the change stream; (ticket, seconds valid)"""
+    ticket = secrets.token_urlsafe(32)
+    timeout = getattr(settings, 'STREAM_TICKET_SECONDS', 30)
+    _cache().set(_ticket_key(ticket), user.pk, timeout)
+    return ticket, timeout
+
+
+def redeem_stream_ticket(ticket):
+    """User id of a valid ticket, which can never be used again; None otherwise"""
+    cache = _cache()
+    key = _ticket_key(ticket)
+    user_id = cache.get(key)
+    # Only one of two concurrent redeems deletes the key
+    if user_id is None or not cache.delete(key):
+        return None
+    return user_id
+
+
+class StreamTicketAuthentication(BaseAuthentication):
+    """Single-use ``?ticket=`` from ``issue_stream_ticket``, for EventSource clients that cannot set headers"""
+
+    def authenticate(self, request):
+        ticket = request.query_params.get('ticket')
+        if not ticket:
+            return None
+        user_id = redeem_stream_ticket(ticket)
+        user = get_user_model()._default_manager.filter(pk=user_id, is_active=True).first() if user_id else None
+        if user is None:
+            raise AuthenticationFailed('Invalid or expired stream ticket.')
+        return user, None
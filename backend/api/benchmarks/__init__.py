@@ -0,0 +1,23 @@
+"""
+Helpers shared by the benchmark commands (``manage.py bench_sqlite``,
+``stress_writes``, ``bench_endpoints``). ``baseline.json`` next to this file
+holds the endpoint baseline.
+"""
+from django.db import connections
+
+from core.sqlite import sqlite_options
+
+
+def use_database(path, profile):
+    """Point the default connection at a scratch database with the given profile"""
+    connections.close_all()
+    settings_dict = connections['default'].settings_dict
+    settings_dict['NAME'] = path
+    settings_dict['OPTIONS'] = sqlite_options(profile)
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(int(len(values) * pct / 100), len(values) - 1)]
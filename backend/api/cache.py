@@ -0,0 +1,216 @@
+"""
+Tag-based response cache for API endpoints.
+
+Every cached response is keyed by the request path, its normalized query
+string, the caller's visibility scope and the current *version* of each model
+tag the endpoint reads. Saving or deleting a row bumps the version of its
+model's tag (see api/signals.py), which changes the key of every response that
+read that model; stale entries are never looked up again and simply expire.
+Invalidation therefore needs no key scanning and works across processes as
+long as the cache backend is shared.
+
+Versions are random tokens rather than counters so concurrent bumps from
+different processes can never collapse into the same value.
+"""
+import functools
+import hashlib
+import uuid
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from rest_framework.response import Response
+
+
+def _cache():
+    return caches[getattr(settings, 'API_CACHE_ALIAS', 'default')]
+
+
+def model_tag(model):
+    return model._meta.label_lower
+
+
+def _version_key(tag):
+    return f'api-cache:tag:{tag}'
+
+
+def tag_versions(tags):
+    """Current version token of each tag, creating missing ones"""
+    cache = _cache()
+    keys = {_version_key(tag): tag for tag in tags}
+    found = cache.get_many(list(keys))
+    versions = {}
+    for key, tag in keys.items():
+        version = found.get(key)
+        if version is None:
+            version = uuid.uuid4().hex[:12]
+            # add() keeps a version another process created in the meantime
+            if not cache.add(key, version, timeout=None):
+                version = cache.get(key, version)
+        versions[tag] = version
+    flush = _transaction_flush()
+    if flush is not None:
+        flush.observed.update(tags)
+    return versions
+
+
+def _bump_tags(tags):
+    _cache().set_many({_version_key(tag): uuid.uuid4().hex[:12] for tag in tags}, timeout=None)
+
+
+class _CommitFlush:
+    """on_commit callback collecting the tags written in one transaction"""
+
+    def __init__(self):
+        self.tags = set()
+        # Tags read through this connection since they were last bumped
+        self.observed = set()
+
+    def __call__(self):
+        _bump_tags(self.tags)
+
+
+def _transaction_flush(create=False):
+    """The flush of the connection's open transaction, if any"""
+    connection = transaction.get_connection()
+    if not connection.in_atomic_block:
+        return None
+    flush = getattr(connection, 'api_cache_flush', None)
+    # A committed or rolled back transaction has dropped its callback
+    if flush is None or not any(entry[1] is flush for entry in connection.run_on_commit):
+        if not create:
+            return None
+        flush = connection.api_cache_flush = _CommitFlush()
+        transaction.on_commit(flush)
+    return flush
+
+
+def bump_model_tags(*models):
+    """
+    Invalidate cached responses that read any of ``models``.
+
+    Outside a transaction the tags are bumped at once. Inside one they are
+    bumped on commit, which discards anything cached from the pre-commit state,
+    and also immediately when the tag is new to the transaction or was read
+    since, so this connection never reads its own stale entries. Bulk writes
+    therefore cost about two cache writes per model rather than one per row.
+    """
+    bump_tags(*(model_tag(model) for model in models))
+
+
+def bump_tags(*tags):
+    """``bump_model_tags`` for tags that are not model labels"""
+    tags = set(tags)
+    flush = _transaction_flush(create=True)
+    if flush is None:
+        _bump_tags(tags)
+        return
+
+    bump_now = (tags - flush.tags) | (tags & flush.observed)
+    flush.tags |= tags
+    if bump_now:
+        flush.observed -= bump_now
+        _bump_tags(bump_now)
+
+
+def request_scope(request, scope):
+    """Visibility scope of the caller: shared by everyone or per user"""
+    if scope == 'user':
+        return f'user:{request.user.pk}'
+    return 'staff' if request.user.is_staff else 'authenticated'
+
+
+def response_cache_key(request, tags, scope):
+    query = sorted((key, sorted(values)) for key, values in request.query_params.lists())
+    versions = tag_versions(tags)
+    raw = '|'.join([
+        request.get_host(),
+        request.path,
+        repr(query),
+        request_scope(request, scope),
+        repr(request.accepted_media_type),
+        ','.join(f'{tag}={versions[tag]}' for tag in sorted(versions)),
+    ])
+    return 'api-cache:response:' + hashlib.sha256(raw.encode()).hexdigest()
+
+
+def cached_response(request, produce, models, scope='global', timeout=None):
+    """Return a cached Response for a GET request, or produce and cache it"""
+    if request.method != 'GET' or not getattr(settings, 'API_CACHE_ENABLED', True):
+        return produce()
+
+    cache = _cache()
+    key = response_cache_key(request, sorted({model_tag(m) for m in models}), scope)
+    hit = cache.get(key)
+    if hit is not None:
+        data, status_code = hit
+        response = Response(data, status=status_code)
+        response['X-Cache'] = 'HIT'
+        return response
+
+    response = produce()
+    if response.status_code == 200 and isinstance(response, Response):
+        if timeout is None:
+            timeout = getattr(settings, 'API_CACHE_TIMEOUT', 300)
+        cache.set(key, (response.data, response.status_code), timeout)
+        response['X-Cache'] = 'MISS'
+    return response
+
+
+def cache_response(models, scope='global'):
+    """Decorator for viewset actions: cache the action's GET responses"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(self, request, *args, **kwargs):
+            return cached_response(request, lambda: func(self, request, *args, **kwargs), models, scope)
+        wrapper.cache_models = tuple(models)
+        wrapper.cache_scope = scope
+        return wrapper
+    return decorator
+
+
+class CachedResponseMixin:
+    """
+    Caches ``list`` and ``retrieve`` responses. ``cache_models`` lists every
+    model the serialized output reads; ``cache_scope`` is 'global' or 'user'.
+    """
+    cache_models = ()
+    cache_scope = 'global'
+
+    def get_cache_models(self):
+        return set(self.cache_models) | {self.get_queryset().model}
+
+    def list(self, request, *args, **kwargs):
+        return cached_response(
+            request, lambda: super(CachedResponseMixin, self).list(request, *args, **kwargs),
+            self.get_cache_models(), self.cache_scope
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        return cached_response(
+            request, lambda: super(CachedResponseMixin, self).retrieve(request, *args, **kwargs),
+            self.get_cache_models(), self.cache_scope
+        )
+
+
+async def cached_data_async(request, produce, models, scope='global', timeout=None):
+    """
+    Async counterpart of ``cached_response`` for views that build plain data.
+    ``produce`` is a coroutine function; returns (data, 'HIT' | 'MISS').
+    """
+    if request.method != 'GET' or not getattr(settings, 'API_CACHE_ENABLED', True):
+        return await produce(), 'MISS'
+
+    cache = _cache()
+    tags = sorted({model_tag(m) for m in models})
+    key = await sync_to_async(response_cache_key)(request, tags, scope)
+    hit = await cache.aget(key)
+    if hit is not None:
+        return hit[0], 'HIT'
+
+    data = await produce()
+    if timeout is None:
+        timeout = getattr(settings, 'API_CACHE_TIMEOUT', 300)
+    await cache.aset(key, (data, 200), timeout)
+    return data, 'MISS'
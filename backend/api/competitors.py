@@ -0,0 +1,176 @@
+"""
+Entity resolution of competitor names and the competitor graph.
+
+``Competitor.name`` and ``CompetitorSentiment.company_name`` are free text.
+``resolve_competitors`` links them to ``Company`` rows
+(``resolved_company``) and stores every resulting "company lists
+competitor" pair as a ``CompetitorEdge``, so both directions of the graph
+are indexed lookups (``/api/companies/{id}/competitors/``).
+
+Matching:
+
+* names are normalized: accents, punctuation, case and legal forms
+  ("Inc.", "Ltd", "PT", "Tbk", ...) are dropped;
+* an exact match of the normalized name (ignoring spaces) wins outright;
+* otherwise candidates are *blocked* on the first letters of each token, and
+  only those are compared with a token-order-insensitive
+  ``difflib.SequenceMatcher`` ratio. The best candidate is accepted above
+  ``COMPETITOR_MATCH_THRESHOLD`` and only if it beats the runner-up by
+  ``AMBIGUITY_MARGIN``; ambiguous names stay unresolved.
+
+Each distinct name is resolved once per pass, and only rows and edges that
+changed are written. The pass runs with ``manage.py resolve_competitors``
+or the ``resolve_competitors`` job, e.g. after imports or company renames.
+"""
+import re
+import unicodedata
+from collections import defaultdict
+from difflib import SequenceMatcher
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Value
+
+from .cache import bump_model_tags
+from .models import Company, Competitor, CompetitorEdge, CompetitorSentiment
+
+LEGAL_FORMS = frozenset(
+    'inc incorporated corp corporation co company ltd limited llc llp plc gmbh ag sa sas srl bv nv '
+    'pt tbk pte oy ab kk'.split()
+)
+BLOCK_PREFIX = 3
+DEFAULT_THRESHOLD = 0.88
+AMBIGUITY_MARGIN = 0.03
+
+_TOKEN = re.compile(r'[a-z0-9]+')
+
+
+def normalize_name(name):
+    """'PT Gojek Indonesia Tbk.' -> 'gojek indonesia'"""
+    text = unicodedata.normalize('NFKD', name or '').encode('ascii', 'ignore').decode().lower()
+    tokens = _TOKEN.findall(text.replace('&', ' and '))
+    kept = [token for token in tokens if token not in LEGAL_FORMS]
+    return ' '.join(kept or tokens)
+
+
+def _sorted_tokens(normalized):
+    return ' '.join(sorted(normalized.split()))
+
+
+def _block_keys(normalized):
+    keys = {token[:BLOCK_PREFIX] for token in normalized.split()}
+    keys.add(normalized.replace(' ', '')[:BLOCK_PREFIX])
+    return keys
+
+
+class CompanyMatcher:
+    """Resolves names against a fixed set of companies"""
+
+    def __init__(self, companies, threshold=None):
+        self.threshold = threshold or getattr(settings, 'COMPETITOR_MATCH_THRESHOLD', DEFAULT_THRESHOLD)
+        self.exact = defaultdict(set)    # normalized name without spaces -> company ids
+        self.blocks = defaultdict(set)   # block key -> candidate indexes
+        self.candidates = []             # (company id, token-sorted normalized name)
+        for company_id, name in companies:
+            normalized = normalize_name(name)
+            if not normalized:
+                continue
+            self.exact[normalized.replace(' ', '')].add(company_id)
+            for key in _block_keys(normalized):
+                self.blocks[key].add(len(self.candidates))
+            self.candidates.append((company_id, _sorted_tokens(normalized)))
+        self._memo = {}
+
+    def match(self, name):
+        """(company id, similarity) of the company ``name`` refers to, or None"""
+        normalized = normalize_name(name)
+        if normalized not in self._memo:
+            self._memo[normalized] = self._match(normalized) if normalized else None
+        return self._memo[normalized]
+
+    def _match(self, normalized):
+        exact = self.exact.get(normalized.replace(' ', ''))
+        if exact:
+            return (next(iter(exact)), 1.0) if len(exact) == 1 else None
+
+        target = _sorted_tokens(normalized)
+        scores = defaultdict(float)
+        indexes = set().union(*(self.blocks.get(key, ()) for key in _block_keys(normalized)))
+        for index in indexes:
+            company_id, candidate = self.candidates[index]
+            scores[company_id] = max(scores[company_id], SequenceMatcher(None, target, candidate).ratio())
+        ranked = sorted(scores.items(), key=lambda item: -item[1])
+        if not ranked or ranked[0][1] < self.threshold:
+            return None
+        if len(ranked) > 1 and ranked[0][1] - ranked[1][1] < AMBIGUITY_MARGIN:
+            return None
+        return ranked[0][0], round(ranked[0][1], 4)
+
+    def stats(self):
+        """(distinct names seen, names resolved)"""
+        return len(self._memo), sum(1 for match in self._memo.values() if match)
+
+
+# Rows with a free-text competitor name: (model, name field, flag of rows that are not competitors)
+SOURCES = (
+    (Competitor, 'name', None),
+    (CompetitorSentiment, 'company_name', 'is_current_company'),
+)
+
+
+def _resolve_rows(model, name_field, skip_field, matcher, edges):
+    fields = ['pk', name_field, 'analysis__company_id', 'resolved_company_id']
+    rows = model.objects.values_list(*fields, skip_field or Value(False))
+    changed = []
+    for pk, name, company_id, resolved_id, skip in rows:
+        match = None if skip else matcher.match(name)
+        # A company never competes with itself
+        if match and match[0] == company_id:
+            match = None
+        new_id = match[0] if match else None
+        if new_id != resolved_id:
+            changed.append(model(pk=pk, resolved_company_id=new_id))
+        if match:
+            edge = edges[(company_id, new_id)]
+            edge[0] += 1
+            edge[1] = max(edge[1], match[1])
+    model.objects.bulk_update(changed, ['resolved_company'], batch_size=500)
+    return len(changed)
+
+
+def _sync_edges(edges):
+    existing = {
+        (company_id, competitor_id): (pk, mentions, similarity)
+        for pk, company_id, competitor_id, mentions, similarity in CompetitorEdge.objects.values_list(
+            'pk', 'company_id', 'competitor_id', 'mentions', 'similarity'
+        )
+    }
+    stale = [pk for key, (pk, *_) in existing.items() if key not in edges]
+    creates, updates = [], []
+    for (company_id, competitor_id), (mentions, similarity) in edges.items():
+        current = existing.get((company_id, competitor_id))
+        if current is None:
+            creates.append(CompetitorEdge(
+                company_id=company_id, competitor_id=competitor_id, mentions=mentions, similarity=similarity
+            ))
+        elif current[1:] != (mentions, similarity):
+            updates.append(CompetitorEdge(pk=current[0], mentions=mentions, similarity=similarity))
+    CompetitorEdge.objects.filter(pk__in=stale).delete()
+    CompetitorEdge.objects.bulk_create(creates, batch_size=500)
+    CompetitorEdge.objects.bulk_update(updates, ['mentions', 'similarity'], batch_size=500)
+    return {'created': len(creates), 'updated': len(updates), 'deleted': len(stale)}
+
+
+def resolve_competitors(threshold=None):
+    """Link competitor names to companies and rebuild the edges; returns counts"""
+    matcher = CompanyMatcher(Company.objects.values_list('id', 'name'), threshold)
+    edges = defaultdict(lambda: [0, 0.0])   # (company, competitor) -> [mentions, best similarity]
+    result = {'relinked': {}}
+    with transaction.atomic():
+        for model, name_field, skip_field in SOURCES:
+            result['relinked'][model._meta.model_name] = _resolve_rows(model, name_field, skip_field, matcher, edges)
+        result['edges'] = _sync_edges(edges)
+    result['names'], result['resolved_names'] = matcher.stats()
+    # bulk writes send no signals
+    bump_model_tags(Competitor, CompetitorSentiment, CompetitorEdge)
+    return result
@@ -0,0 +1,234 @@
+"""
+Streaming exports for companies, leads, investments and analysis data.
+
+Rows are read with ``.iterator(chunk_size=...)`` so the database driver uses a
+server-side cursor where it supports one, and every chunk is encoded and handed
+to the caller before the next one is fetched. Memory use stays flat no matter
+how large the table is.
+"""
+import csv
+import io
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models
+
+from .models import (
+    Company, CompanyTag, Lead, Investment,
+    HighLevelAnalysis, PerceptionAnalysis, MarketAnalysis,
+    KeyIndividualsAnalysis, CompetitiveAnalysis,
+    KeyIndividual, IndividualRisk, PublicMention, Competitor, StrategicRecommendation,
+    SentimentBySource, CompetitorSentiment, RecentMention, KeyTopic, BrandMetric, RiskAlert,
+    RevenueInformation, MarketForce, SalesChannel, IndustryTrend
+)
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:  # Parquet output is optional
+    pyarrow = None
+
+# Dataset names follow the API routes in api/urls.py
+EXPORT_DATASETS = {
+    'companies': Company,
+    'company-tags': CompanyTag,
+    'leads': Lead,
+    'investments': Investment,
+    'high-level-analyses': HighLevelAnalysis,
+    'perception-analyses': PerceptionAnalysis,
+    'market-analyses': MarketAnalysis,
+    'key-individuals-analyses': KeyIndividualsAnalysis,
+    'competitive-analyses': CompetitiveAnalysis,
+    'sentiment-sources': SentimentBySource,
+    'competitor-sentiments': CompetitorSentiment,
+    'recent-mentions': RecentMention,
+    'key-topics': KeyTopic,
+    'brand-metrics': BrandMetric,
+    'risk-alerts': RiskAlert,
+    'revenue-information': RevenueInformation,
+    'market-forces': MarketForce,
+    'sales-channels': SalesChannel,
+    'industry-trends': IndustryTrend,
+    'key-individuals': KeyIndividual,
+    'individual-risks': IndividualRisk,
+    'public-mentions': PublicMention,
+    'competitors': Competitor,
+    'strategic-recommendations': StrategicRecommendation,
+}
+
+EXPORT_FORMATS = {
+    'csv': ('text/csv', 'csv'),
+    'jsonl': ('application/x-ndjson', 'jsonl'),
+    'parquet': ('application/vnd.apache.parquet', 'parquet'),
+}
+
+DEFAULT_CHUNK_SIZE = 2000
+
+
+class ExportError(Exception):
+    """Raised when an export cannot be produced (unknown dataset, format...)"""
+
+
+def get_export_model(dataset):
+    try:
+        return EXPORT_DATASETS[dataset]
+    except KeyError:
+        raise ExportError(f"Unknown dataset '{dataset}'")
+
+
+def export_fields(model):
+    """Concrete columns of a model; foreign keys are exported as their raw id"""
+    return [f for f in model._meta.concrete_fields]
+
+
+def iter_rows(model, chunk_size=DEFAULT_CHUNK_SIZE, queryset=None):
+    """Yield raw value tuples without model instantiation or ordering"""
+    if queryset is None:
+        queryset = model._default_manager.all()
+    columns = [f.attname for f in export_fields(model)]
+    return queryset.order_by().values_list(*columns).iterator(chunk_size=chunk_size)
+
+
+def _chunked(rows, chunk_size):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _csv_value(value):
+    if value is None:
+        return ''
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, cls=DjangoJSONEncoder)
+    return value
+
+
+def iter_csv(model, chunk_size=DEFAULT_CHUNK_SIZE, queryset=None):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow([f.attname for f in export_fields(model)])
+    for chunk in _chunked(iter_rows(model, chunk_size, queryset), chunk_size):
+        writer.writerows([_csv_value(v) for v in row] for row in chunk)
+        yield buffer.getvalue().encode('utf-8')
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode('utf-8')
+
+
+def iter_jsonl(model, chunk_size=DEFAULT_CHUNK_SIZE, queryset=None):
+    columns = [f.attname for f in export_fields(model)]
+    encoder = DjangoJSONEncoder(ensure_ascii=False)
+    for chunk in _chunked(iter_rows(model, chunk_size, queryset), chunk_size):
+        lines = [encoder.encode(dict(zip(columns, row))) for row in chunk]
+        yield ('\n'.join(lines) + '\n').encode('utf-8')
+
+
+def _arrow_type(field):
+    if isinstance(field, models.BooleanField):
+        return pyarrow.bool_()
+    if isinstance(field, (models.IntegerField, models.AutoField)) and not field.is_relation:
+        return pyarrow.int64()
+    if isinstance(field, models.FloatField):
+        return pyarrow.float64()
+    if isinstance(field, models.DecimalField):
+        return pyarrow.decimal128(field.max_digits, field.decimal_places)
+    if isinstance(field, models.DateTimeField):
+        return pyarrow.timestamp('us', tz='UTC')
+    if isinstance(field, models.DateField):
+        return pyarrow.date32()
+    if field.is_relation and isinstance(field.target_field, (models.IntegerField, models.AutoField)):
+        return pyarrow.int64()
+    # UUIDs, text, JSON and everything else are written as strings
+    return pyarrow.string()
+
+
+def _arrow_value(value, arrow_type):
+    if value is None or not pyarrow.types.is_string(arrow_type):
+        return value
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, cls=DjangoJSONEncoder)
+    return str(value)
+
+
+class _DrainableBuffer(io.RawIOBase):
+    """Write-only file object whose contents can be taken out between row groups"""
+
+    def __init__(self):
+        self._parts = []
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._parts.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def drain(self):
+        data = b''.join(self._parts)
+        self._parts = []
+        return data
+
+
+def iter_parquet(model, chunk_size=DEFAULT_CHUNK_SIZE, queryset=None):
+    """Write one Parquet row group per chunk and yield the bytes as they are produced"""
+    if pyarrow is None:
+        raise ExportError('Parquet export requires the pyarrow package')
+
+    fields = export_fields(model)
+    schema = pyarrow.schema([(f.attname, _arrow_type(f)) for f in fields])
+    sink = _DrainableBuffer()
+    writer = pyarrow.parquet.ParquetWriter(sink, schema)
+    try:
+        for chunk in _chunked(iter_rows(model, chunk_size, queryset), chunk_size):
+            columns = [
+                [_arrow_value(row[i], schema.field(i).type) for row in chunk]
+                for i in range(len(fields))
+            ]
+            writer.write_batch(pyarrow.record_batch(columns, schema=schema))
+            data = sink.drain()
+            if data:
+                yield data
+    finally:
+        writer.close()
+    yield sink.drain()
+
+
+EXPORT_WRITERS = {
+    'csv': iter_csv,
+    'jsonl': iter_jsonl,
+    'parquet': iter_parquet,
+}
+
+
+def stream_export(dataset, output_format, chunk_size=DEFAULT_CHUNK_SIZE, queryset=None):
+    """Return an iterator of encoded byte chunks for the requested dataset"""
+    model = get_export_model(dataset)
+    if output_format not in EXPORT_WRITERS:
+        raise ExportError(f"Unknown export format '{output_format}'")
+    if output_format == 'parquet' and pyarrow is None:
+        raise ExportError('Parquet export requires the pyarrow package')
+    return EXPORT_WRITERS[output_format](model, chunk_size, queryset)
+
+
+def write_export(dataset, output_format, fileobj, chunk_size=DEFAULT_CHUNK_SIZE, queryset=None):
+    """Write an export into a binary file object; returns the number of bytes written"""
+    written = 0
+    for data in stream_export(dataset, output_format, chunk_size, queryset):
+        fileobj.write(data)
+        written += len(data)
+    return written
+
+
+def export_filename(dataset, output_format):
+    return f"{dataset}.{EXPORT_FORMATS[output_format][1]}"
@@ -0,0 +1,372 @@
+"""
+Database-backed background jobs.
+
+Jobs are rows in the ``Job`` table. Worker processes started with
+``manage.py run_jobs`` claim queued rows with a conditional UPDATE, so no
+external broker is needed and any number of workers can share the queue.
+Handlers are plain functions registered with ``@job_handler(kind)``; they
+receive a ``JobContext`` for progress reporting and cancellation checks and
+return a JSON-serializable result.
+"""
+import csv
+import logging
+import os
+import socket
+import threading
+import time
+import traceback
+from datetime import timedelta
+from pathlib import Path
+
+from django.apps import apps
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+from django.db.models import F
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import Job
+from .exports import DEFAULT_CHUNK_SIZE, get_export_model, stream_export, export_filename
+from . import archive, competitors, scoring
+
+logger = logging.getLogger(__name__)
+
+JOB_HANDLERS = {}
+
+# Minimum seconds between two progress writes for the same job
+PROGRESS_WRITE_INTERVAL = 0.5
+
+
+class JobCancelled(Exception):
+    """Raised inside a handler when cancellation was requested"""
+
+
+def job_handler(kind):
+    """Register a function as the handler for ``kind`` jobs"""
+    def decorator(func):
+        JOB_HANDLERS[kind] = func
+        return func
+    return decorator
+
+
+def results_dir():
+    return Path(getattr(settings, 'JOB_RESULTS_DIR', Path(settings.BASE_DIR) / 'job_results'))
+
+
+class JobContext:
+    """Handle given to job handlers for progress, cancellation and result files"""
+
+    def __init__(self, job):
+        self.job = job
+        self._last_write = 0.0
+
+    def set_progress(self, current, total=None, message='', force=False):
+        """
+        Record progress. Writes are throttled; every write also checks the
+        cancellation flag, raising JobCancelled when it is set.
+        """
+        now = time.monotonic()
+        if not force and now - self._last_write < PROGRESS_WRITE_INTERVAL:
+            return
+        self._last_write = now
+
+        changes = {
+            'progress_current': current,
+            'progress_message': message[:255],
+            'heartbeat_at': timezone.now(),
+        }
+        if total is not None:
+            changes['progress_total'] = total
+        updated = Job.objects.filter(pk=self.job.pk, cancel_requested=False).update(**changes)
+        if not updated:
+            raise JobCancelled()
+
+    def check_cancelled(self):
+        if Job.objects.filter(pk=self.job.pk, cancel_requested=True).exists():
+            raise JobCancelled()
+
+    def result_path(self, filename):
+        """Absolute path for a result artifact; the directory is created on demand"""
+        directory = results_dir() / str(self.job.pk)
+        directory.mkdir(parents=True, exist_ok=True)
+        self.job.result_file = f"{self.job.pk}/{filename}"
+        return directory / filename
+
+
+def enqueue(kind, params=None, user=None):
+    """Queue a job and return it"""
+    if kind not in JOB_HANDLERS:
+        raise ValueError(f"Unknown job kind '{kind}'")
+    return Job.objects.create(kind=kind, params=params or {}, created_by=user)
+
+
+def remove_upload(params):
+    """Delete the uploaded file of an import job, if it is still there"""
+    try:
+        os.remove(params['file'])
+    except (KeyError, FileNotFoundError):
+        pass
+
+
+def cancel(job):
+    """Cancel a queued job immediately, or ask a running one to stop"""
+    if Job.objects.filter(pk=job.pk, status='queued').update(
+        status='cancelled', cancel_requested=True, finished_at=timezone.now()
+    ):
+        # Never runs, so its handler cannot clean up
+        remove_upload(job.params)
+        return True
+    return bool(Job.objects.filter(pk=job.pk, status='running').update(cancel_requested=True))
+
+
+def claim_next_job(worker_name):
+    """Atomically move the oldest queued job to running; returns None when the queue is empty"""
+    while True:
+        job_id = (
+            Job.objects.filter(status='queued')
+            .order_by('created_at')
+            .values_list('id', flat=True)
+            .first()
+        )
+        if job_id is None:
+            return None
+        now = timezone.now()
+        claimed = Job.objects.filter(pk=job_id, status='queued').update(
+            status='running', worker=worker_name, started_at=now, heartbeat_at=now,
+            attempts=F('attempts') + 1,
+        )
+        if claimed:
+            return Job.objects.get(pk=job_id)
+        # Another worker won the race; try the next one
+
+
+def requeue_stale_jobs(stale_after=None, max_attempts=None):
+    """Return jobs whose worker stopped heartbeating to the queue (or fail them)"""
+    stale_after = stale_after or getattr(settings, 'JOB_STALE_SECONDS', 300)
+    max_attempts = max_attempts or getattr(settings, 'JOB_MAX_ATTEMPTS', 3)
+    cutoff = timezone.now() - timedelta(seconds=stale_after)
+    stale = Job.objects.filter(status='running', heartbeat_at__lt=cutoff)
+    failed = stale.filter(attempts__gte=max_attempts).update(
+        status='failed', error='Worker stopped responding', finished_at=timezone.now()
+    )
+    requeued = stale.filter(attempts__lt=max_attempts).update(status='queued', worker='')
+    return requeued, failed
+
+
+class _Heartbeat(threading.Thread):
+    """Keeps heartbeat_at fresh while a handler runs without reporting progress"""
+
+    def __init__(self, job_id, interval):
+        super().__init__(daemon=True)
+        self.job_id = job_id
+        self.interval = interval
+        self.stopped = threading.Event()
+
+    def run(self):
+        try:
+            while not self.stopped.wait(self.interval):
+                Job.objects.filter(pk=self.job_id, status='running').update(heartbeat_at=timezone.now())
+        finally:
+            connection.close()
+
+
+def run_job(job):
+    """Execute a claimed job and store its outcome"""
+    handler = JOB_HANDLERS.get(job.kind)
+    context = JobContext(job)
+    heartbeat = _Heartbeat(job.pk, getattr(settings, 'JOB_HEARTBEAT_SECONDS', 30))
+    heartbeat.start()
+
+    status, result, error = 'succeeded', {}, ''
+    try:
+        if handler is None:
+            raise ValueError(f"No handler registered for job kind '{job.kind}'")
+        result = handler(context, **job.params) or {}
+    except JobCancelled:
+        status = 'cancelled'
+    except Exception:
+        logger.exception('Job %s (%s) failed', job.pk, job.kind)
+        status, error = 'failed', traceback.format_exc()
+    finally:
+        heartbeat.stopped.set()
+        heartbeat.join()
+
+    changes = {
+        'status': status,
+        'result': result,
+        'error': error,
+        'result_file': job.result_file,
+        'finished_at': timezone.now(),
+    }
+    if status == 'succeeded':
+        changes['progress_current'] = Coalesce(F('progress_total'), F('progress_current'))
+    Job.objects.filter(pk=job.pk).update(**changes)
+    job.refresh_from_db()
+    return job
+
+
+def work(worker_name=None, poll_interval=1.0, once=False, stop_event=None):
+    """Worker loop: claim and run jobs until stopped (or the queue is empty with ``once``)"""
+    worker_name = worker_name or f"{socket.gethostname()}:{os.getpid()}"
+    last_stale_check = 0.0
+    while stop_event is None or not stop_event.is_set():
+        close_old_connections()
+        if time.monotonic() - last_stale_check > 60:
+            requeue_stale_jobs()
+            last_stale_check = time.monotonic()
+
+        job = claim_next_job(worker_name)
+        if job is None:
+            if once:
+                return
+            time.sleep(poll_interval)
+            continue
+        logger.info('Worker %s running job %s (%s)', worker_name, job.pk, job.kind)
+        run_job(job)
+
+
+# =============================
+# Handlers
+# =============================
+
+@job_handler('export')
+def export_job(context, dataset, output_format='csv', chunk_size=DEFAULT_CHUNK_SIZE):
+    """Write a streaming export to a downloadable result file"""
+    model = get_export_model(dataset)
+    total = model._default_manager.count()
+    context.set_progress(0, total, f'Exporting {dataset}', force=True)
+
+    path = context.result_path(export_filename(dataset, output_format))
+    written = 0
+    with open(path, 'wb') as fileobj:
+        for index, data in enumerate(stream_export(dataset, output_format, chunk_size)):
+            fileobj.write(data)
+            written += len(data)
+            context.set_progress(min((index + 1) * chunk_size, total), total)
+    return {'dataset': dataset, 'rows': total, 'bytes': written}
+
+
+def _import_resource_class(model):
+    """Resource used by the admin import for this model, or a default one"""
+    from django.contrib import admin
+    from import_export.resources import modelresource_factory
+
+    model_admin = admin.site._registry.get(model)
+    resource_classes = getattr(model_admin, 'resource_classes', None)
+    if resource_classes:
+        return resource_classes[0]
+    return modelresource_factory(model)
+
+
+@job_handler('import')
+def import_job(context, dataset, file, chunk_size=500):
+    """Import a CSV file in chunks through the model's import-export resource"""
+    try:
+        return _import_file(context, dataset, file, chunk_size)
+    finally:
+        # Succeeded, failed or cancelled: the upload is not needed again
+        remove_upload({'file': file})
+
+
+def _import_file(context, dataset, file, chunk_size):
+    model = get_export_model(dataset)
+    resource = _import_resource_class(model)()
+
+    # Records, not lines: quoted fields may span several lines
+    with open(file, newline='', encoding='utf-8') as fileobj:
+        total = max(sum(1 for _ in csv.reader(fileobj)) - 1, 0)
+    context.set_progress(0, total, f'Importing {dataset}', force=True)
+
+    totals = {}
+    errors = []
+    processed = 0
+    with open(file, newline='', encoding='utf-8') as fileobj:
+        reader = csv.reader(fileobj)
+        headers = next(reader, None)
+        if headers is None:
+            return {'dataset': dataset, 'rows': 0, 'totals': totals, 'errors': errors}
+
+        chunk = []
+        for row in reader:
+            chunk.append(row)
+            if len(chunk) >= chunk_size:
+                processed = _import_chunk(resource, headers, chunk, processed, totals, errors)
+                context.set_progress(processed, total)
+                chunk = []
+        if chunk:
+            processed = _import_chunk(resource, headers, chunk, processed, totals, errors)
+            context.set_progress(processed, total, force=True)
+
+    return {'dataset': dataset, 'rows': processed, 'totals': totals, 'errors': errors[:100]}
+
+
+def _import_chunk(resource, headers, rows, offset, totals, errors):
+    import tablib
+
+    result = resource.import_data(
+        tablib.Dataset(*rows, headers=headers),
+        dry_run=False, raise_errors=False, use_transactions=True,
+    )
+    if result.base_errors:
+        # The whole chunk was rolled back (e.g. a missing id column)
+        errors.extend(f'Rows {offset + 1}-{offset + len(rows)}: {e.error}' for e in result.base_errors)
+        return offset + len(rows)
+    for key, value in result.totals.items():
+        totals[key] = totals.get(key, 0) + value
+    for line, row_errors in result.row_errors():
+        errors.extend(f'Row {offset + line}: {e.error}' for e in row_errors)
+    for invalid in result.invalid_rows:
+        errors.append(f'Row {offset + invalid.number}: {invalid.error_dict}')
+    return offset + len(rows)
+
+
+@job_handler('admin_bulk_update')
+def admin_bulk_update_job(context, model, ids, changes, chunk_size=200):
+    """
+    Apply field changes to many rows. Rows are saved one by one so model
+    signals and auto_now timestamps behave as in a normal edit.
+    """
+    model_class = apps.get_model(model)
+    total = len(ids)
+    context.set_progress(0, total, f'Updating {total} {model_class._meta.verbose_name_plural}', force=True)
+
+    updated = 0
+    for start in range(0, total, chunk_size):
+        with transaction.atomic():
+            for obj in model_class._default_manager.filter(pk__in=ids[start:start + chunk_size]):
+                for field, value in changes.items():
+                    setattr(obj, field, value)
+                obj.save(update_fields=list(changes) + [
+                    f.name for f in model_class._meta.concrete_fields if getattr(f, 'auto_now', False)
+                ])
+                updated += 1
+        context.set_progress(min(start + chunk_size, total), total)
+    return {'model': model, 'updated': updated}
+
+
+@job_handler('archive_rows')
+def archive_rows_job(context, superseded=True, by_age=True):
+    """Move old and superseded analysis child rows to the archive table"""
+    def progress(step, steps, label):
+        context.set_progress(step, steps, f'Archiving {label}')
+
+    counts = archive.archive_rows(superseded=superseded, by_age=by_age, progress=progress)
+    return {'archived': counts, 'total': sum(counts.values())}
+
+
+@job_handler('score_leads')
+def score_leads_job(context, ids=None, workers=1, chunk_size=scoring.DEFAULT_CHUNK_SIZE, force=False):
+    """Recompute ai_match_score of the leads (all, or ``ids``) whose inputs changed"""
+    def progress(done, chunks):
+        context.set_progress(done, chunks, 'Scoring leads')
+
+    return scoring.rescore_leads(lead_ids=ids, workers=workers, chunk_size=chunk_size, force=force, progress=progress)
+
+
+@job_handler('resolve_competitors')
+def resolve_competitors_job(context, threshold=None):
+    """Link competitor names to companies and rebuild the competitor graph"""
+    context.set_progress(0, 1, 'Resolving competitor names', force=True)
+    result = competitors.resolve_competitors(threshold=threshold)
+    context.set_progress(1, 1, force=True)
+    return result
@@ -0,0 +1,54 @@
+from datetime import timedelta
+
+from django.apps import apps
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from api.archive import ARCHIVE_POLICIES, DEFAULT_BATCH_SIZE, archive_horizon, archive_rows
+
+
+class Command(BaseCommand):
+    help = 'Move old and superseded analysis child rows into the archive table'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--horizon-days', type=int,
+            help='Archive dated rows older than this many days (default: ARCHIVE_HORIZON_DAYS)'
+        )
+        parser.add_argument('--no-age', action='store_true', help='Skip the age horizon')
+        parser.add_argument('--no-superseded', action='store_true', help='Skip rows of superseded analyses')
+        parser.add_argument(
+            '--models', nargs='+', metavar='MODEL',
+            help=f"Limit to these models ({', '.join(m.__name__ for m in ARCHIVE_POLICIES)})"
+        )
+        parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE)
+        parser.add_argument('--dry-run', action='store_true', help='Only count eligible rows')
+
+    def handle(self, *args, **options):
+        models = None
+        if options['models']:
+            try:
+                models = [apps.get_model('api', name) for name in options['models']]
+            except LookupError as exc:
+                raise CommandError(str(exc))
+            unknown = [m.__name__ for m in models if m not in ARCHIVE_POLICIES]
+            if unknown:
+                raise CommandError(f"Not archivable: {', '.join(unknown)}")
+
+        horizon = archive_horizon()
+        if options['horizon_days'] is not None:
+            horizon = timezone.now().date() - timedelta(days=options['horizon_days'])
+
+        counts = archive_rows(
+            models=models,
+            horizon=horizon,
+            superseded=not options['no_superseded'],
+            by_age=not options['no_age'],
+            batch_size=options['batch_size'],
+            dry_run=options['dry_run'],
+        )
+
+        verb = 'Would archive' if options['dry_run'] else 'Archived'
+        for label, count in sorted(counts.items()):
+            self.stdout.write(f'{verb} {count} {label} rows')
+        self.stdout.write(self.style.SUCCESS(f'{verb} {sum(counts.values())} rows in total (horizon {horizon})'))
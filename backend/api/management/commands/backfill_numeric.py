@@ -0,0 +1,33 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api import numeric
+
+
+class Command(BaseCommand):
+    help = 'Parse money and count strings into their numeric shadow columns'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--models', nargs='+',
+            help='Model names to backfill (default: every model with shadow columns)'
+        )
+        parser.add_argument('--batch-size', type=int, default=1000, help='Rows per batch (default: 1000)')
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be positive')
+        models = {model.__name__.lower(): model for model in numeric.shadowed_models()}
+        names = [name.lower() for name in options['models'] or models]
+        unknown = sorted(set(names) - set(models))
+        if unknown:
+            raise CommandError(f"Unknown models: {', '.join(unknown)} (choose from {', '.join(sorted(models))})")
+
+        started = time.perf_counter()
+        for name in names:
+            model = models[name]
+            updated = numeric.backfill(model, batch_size=options['batch_size'])
+            self.stdout.write(f'{model.__name__}: {updated} of {model.objects.count()} rows updated')
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(f'Backfilled {len(names)} models in {elapsed:.2f}s'))
@@ -0,0 +1,140 @@
+import logging
+import time
+import uuid
+
+from django.contrib import admin
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, models
+from django.test import Client, RequestFactory
+from django.test.utils import CaptureQueriesContext, override_settings, setup_test_environment, teardown_test_environment
+from django.urls import reverse
+
+from api.management.commands.bench_endpoints import ANCHOR_DATE
+from api.synthetic import BATCH_SIZE, generate_portfolio
+
+
+def _has_unique_fields(model):
+    # Cloned rows would collide
+    opts = model._meta
+    return (
+        any(field.unique and not field.primary_key for field in opts.concrete_fields)
+        or bool(opts.unique_together) or bool(opts.total_unique_constraints)
+    )
+
+
+def pad_table(model, rows):
+    """Clone existing rows of ``model`` until it has ``rows``; returns the final count"""
+    existing = model.objects.count()
+    if not existing or existing >= rows or _has_unique_fields(model):
+        return existing
+    pk = model._meta.pk
+    fields = [field for field in model._meta.concrete_fields if not field.primary_key]
+    templates = list(model.objects.order_by('pk')[:1000])
+    clones = []
+    for index in range(rows - existing):
+        template = templates[index % len(templates)]
+        clone = model(**{field.attname: getattr(template, field.attname) for field in fields})
+        if isinstance(pk, models.UUIDField):
+            clone.pk = uuid.uuid4()
+        clones.append(clone)
+        if len(clones) == BATCH_SIZE:
+            model.objects.bulk_create(clones)
+            clones = []
+    model.objects.bulk_create(clones)
+    return model.objects.count()
+
+
+def measure(client, path, iterations):
+    client.get(path)   # warm up
+    timings = []
+    for _ in range(iterations):
+        with CaptureQueriesContext(connection) as captured:
+            started = time.perf_counter()
+            response = client.get(path)
+            timings.append(time.perf_counter() - started)
+    return {
+        'status': response.status_code,
+        'queries': len(captured),
+        'ms': round(sorted(timings)[len(timings) // 2] * 1000, 1),
+        'kb': round(len(response.content) / 1024),
+    }
+
+
+class Command(BaseCommand):
+    help = 'Query counts and timings of every api admin changelist and add form at a given table size'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=100000, help='Rows per table (default: 100000)')
+        parser.add_argument(
+            '--companies', type=int, default=100,
+            help='Synthetic portfolio the tables are padded from (default: 100)'
+        )
+        parser.add_argument('--iterations', type=int, default=3)
+        parser.add_argument('--models', nargs='+', metavar='MODEL', help='Only these models (e.g. recentmention lead)')
+
+    def handle(self, *args, **options):
+        if options['rows'] < 1 or options['iterations'] < 1:
+            raise CommandError('--rows and --iterations must be at least 1')
+
+        # A throwaway test database, so benchmarks never touch real data
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        request_logger = logging.getLogger('django.request')
+        log_level = request_logger.level
+        request_logger.setLevel(logging.CRITICAL)
+        try:
+            with override_settings(API_CACHE_ENABLED=False, NPLUSONE_MODE='off', DATABASE_ROUTERS=[], DEBUG=False):
+                results = self.run_benchmark(options)
+        finally:
+            request_logger.setLevel(log_level)
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+        self.report(results)
+
+    def run_benchmark(self, options):
+        generate_portfolio(companies=options['companies'], anchor_date=ANCHOR_DATE)
+        user = User.objects.create_user('bench-admin', 'bench@example.com', is_staff=True, is_superuser=True)
+        client = Client(raise_request_exception=False)
+        client.force_login(user)
+
+        wanted = {name.lower() for name in options['models'] or ()}
+        admins = [
+            model for model in admin.site._registry
+            if model._meta.app_label == 'api' and (not wanted or model._meta.model_name in wanted)
+        ]
+        started = time.perf_counter()
+        rows = {model: pad_table(model, options['rows']) for model in admins}
+        if connection.vendor == 'sqlite':
+            # Table statistics for the estimated changelist counts (api/admin_tools.py)
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE')
+        self.stdout.write(f'Padded {len(admins)} tables in {time.perf_counter() - started:.1f}s')
+
+        request = RequestFactory().get('/')
+        request.user = user
+        results = []
+        for model in sorted(admins, key=lambda model: model.__name__):
+            info = model._meta.app_label, model._meta.model_name
+            changelist = measure(client, reverse('admin:%s_%s_changelist' % info), options['iterations'])
+            add_form = (
+                measure(client, reverse('admin:%s_%s_add' % info), options['iterations'])
+                if admin.site._registry[model].has_add_permission(request) else None
+            )
+            results.append((model.__name__, rows[model], changelist, add_form))
+        return results
+
+    def report(self, results):
+        header = (
+            f"{'model':<26}{'rows':>9}{'status':>8}{'queries':>9}{'ms':>9}"
+            f"{'add status':>12}{'add queries':>13}{'add ms':>9}{'add KB':>9}"
+        )
+        self.stdout.write(header)
+        self.stdout.write('-' * len(header))
+        for name, rows, changelist, add_form in results:
+            line = (
+                f"{name:<26}{rows:>9}{changelist['status']:>8}{changelist['queries']:>9}{changelist['ms']:>9.1f}"
+            )
+            if add_form:
+                line += f"{add_form['status']:>12}{add_form['queries']:>13}{add_form['ms']:>9.1f}{add_form['kb']:>9}"
+            self.stdout.write(line)
@@ -0,0 +1,268 @@
+import json
+import logging
+import time
+from datetime import date
+from pathlib import Path
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings, setup_test_environment, teardown_test_environment
+from django.urls import URLResolver, reverse
+
+from api import urls as api_urls
+from api.benchmarks import percentile
+from api.models import Company, UserProfile
+from api.profiling import AllocationProfiler, track_serializer_allocations
+from api.synthetic import generate_portfolio
+
+DEFAULT_BASELINE = Path(__file__).resolve().parents[2] / 'benchmarks' / 'baseline.json'
+# Fixed so the portfolio, and therefore the query counts, match the baseline
+ANCHOR_DATE = date(2025, 1, 1)
+
+# Long-lived or non-GET routes that cannot be timed as a request/response
+SKIPPED_ROUTES = {'change-stream', 'stream-ticket', 'api_token_auth'}
+
+# Lookup values of detail routes whose view has no queryset to take one from
+LOOKUPS = {
+    'export-detail': lambda: 'companies',
+    'async-company-full-analysis': lambda: Company.objects.order_by('pk').values_list('pk', flat=True).first(),
+}
+
+# Latency and memory differences below these are noise, whatever the tolerance
+MIN_LATENCY_DELTA_MS = 2.0
+MIN_MEMORY_DELTA_KB = 256
+
+
+def _iter_patterns(patterns):
+    for pattern in patterns:
+        if isinstance(pattern, URLResolver):
+            yield from _iter_patterns(pattern.url_patterns)
+        else:
+            yield pattern
+
+
+def _accepts_get(callback):
+    actions = getattr(callback, 'actions', None)
+    if actions is not None:
+        return 'get' in actions
+    view_class = getattr(callback, 'view_class', None)
+    if view_class is not None:
+        return hasattr(view_class, 'get')
+    return True
+
+
+def _lookup_value(name, callback):
+    if name in LOOKUPS:
+        return LOOKUPS[name]()
+    queryset = getattr(getattr(callback, 'cls', None), 'queryset', None)
+    if queryset is None:
+        return None
+    return queryset.order_by('pk').values_list('pk', flat=True).first()
+
+
+def discover_routes():
+    """[(name, path)] of every GET route in api/urls.py; path is None if it has no object to use"""
+    routes = []
+    for pattern in _iter_patterns(api_urls.urlpatterns):
+        kwargs = list(pattern.pattern.regex.groupindex)
+        # The router's format-suffix duplicates time the same view
+        if not pattern.name or 'format' in kwargs or pattern.name in SKIPPED_ROUTES:
+            continue
+        if not _accepts_get(pattern.callback):
+            continue
+        path = reverse(pattern.name) if not kwargs else None
+        if kwargs:
+            value = _lookup_value(pattern.name, pattern.callback)
+            if value is not None:
+                path = reverse(pattern.name, kwargs={kwargs[0]: value})
+        routes.append((pattern.name, path))
+    return routes
+
+
+def _request(client, path):
+    response = client.get(path)
+    if response.streaming:
+        # Streaming responses do their work while being consumed
+        b''.join(response.streaming_content)
+    return response
+
+
+def measure(client, path, iterations):
+    # Queries are counted on this thread's connection; the async views'
+    # worker threads use their own and are not included
+    _request(client, path)   # warm up
+    latencies, queries = [], 0
+    for _ in range(iterations):
+        with CaptureQueriesContext(connection) as captured:
+            started = time.perf_counter()
+            response = _request(client, path)
+            latencies.append(time.perf_counter() - started)
+        queries = len(captured)
+    return {
+        'path': path,
+        'status': response.status_code,
+        'queries': queries,
+        'p50_ms': round(percentile(latencies, 50) * 1000, 2),
+        'p95_ms': round(percentile(latencies, 95) * 1000, 2),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 2),
+    }
+
+
+def measure_memory(client, path):
+    """Peak/retained memory of one request, per serializer and top project sites"""
+    with AllocationProfiler() as profiler:
+        _request(client, path)
+    report = profiler.report
+    return {
+        'peak_kb': report['peak_kb'],
+        'retained_kb': report['retained_kb'],
+        'serializers_peak_kb': {entry['serializer']: entry['peak_kb'] for entry in report['serializers']},
+        'top_sites': [f"{entry['site']} ({entry['kb']} KB)" for entry in report['top_project_sites'][:3]],
+    }
+
+
+def compare(results, baseline, tolerance):
+    """[(route, message)] of regressions against the baseline"""
+    regressions = []
+    for name, result in results.items():
+        before = baseline.get(name)
+        if before is None or result.get('skipped'):
+            continue
+        if result['status'] != before['status']:
+            regressions.append((name, f"status {before['status']} -> {result['status']}"))
+        if result['queries'] > before['queries']:
+            regressions.append((name, f"queries {before['queries']} -> {result['queries']}"))
+        # p50: the tail of a few dozen requests is mostly GC and scheduler noise
+        limit = before['p50_ms'] * (1 + tolerance)
+        if result['p50_ms'] > limit and result['p50_ms'] - before['p50_ms'] > MIN_LATENCY_DELTA_MS:
+            regressions.append((name, f"p50 {before['p50_ms']:.1f}ms -> {result['p50_ms']:.1f}ms"))
+        if 'peak_kb' in result and 'peak_kb' in before:
+            limit = before['peak_kb'] * (1 + tolerance)
+            if result['peak_kb'] > limit and result['peak_kb'] - before['peak_kb'] > MIN_MEMORY_DELTA_KB:
+                regressions.append((name, f"peak memory {before['peak_kb']:.0f}KB -> {result['peak_kb']:.0f}KB"))
+    return regressions
+
+
+class Command(BaseCommand):
+    help = 'Time every GET route of the API against a synthetic portfolio and compare with a baseline'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--companies', type=int, default=50)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--iterations', type=int, default=20)
+        parser.add_argument('--routes', nargs='+', metavar='NAME', help='Only time these route names')
+        parser.add_argument('--baseline', default=str(DEFAULT_BASELINE))
+        parser.add_argument('--write-baseline', action='store_true', help='Save the results as the new baseline')
+        parser.add_argument(
+            '--tolerance', type=float, default=0.5,
+            help='Allowed p50 slowdown over the baseline as a fraction (default 0.5 = +50%%)'
+        )
+        parser.add_argument('--with-cache', action='store_true', help='Keep the API response cache enabled')
+        parser.add_argument(
+            '--memory', action='store_true',
+            help='Also run each route once under tracemalloc (peak memory, per serializer, top sites)'
+        )
+        parser.add_argument('--fail-on-regression', action='store_true')
+
+    def handle(self, *args, **options):
+        if options['iterations'] < 1:
+            raise CommandError('--iterations must be at least 1')
+
+        # A throwaway test database, so benchmarks never touch real data
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        request_logger = logging.getLogger('django.request')
+        log_level = request_logger.level
+        # Routes that error are reported in the table, not as tracebacks
+        request_logger.setLevel(logging.CRITICAL)
+        try:
+            with override_settings(
+                API_CACHE_ENABLED=options['with_cache'], NPLUSONE_MODE='off', DATABASE_ROUTERS=[]
+            ):
+                results = self.run_benchmark(options)
+        finally:
+            request_logger.setLevel(log_level)
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+        meta = {
+            'companies': options['companies'],
+            'seed': options['seed'],
+            'iterations': options['iterations'],
+            'with_cache': options['with_cache'],
+        }
+        self.report(results)
+
+        baseline_path = Path(options['baseline'])
+        if options['write_baseline']:
+            baseline_path.parent.mkdir(parents=True, exist_ok=True)
+            baseline_path.write_text(json.dumps({'meta': meta, 'routes': results}, indent=2, sort_keys=True) + '\n')
+            self.stdout.write(self.style.SUCCESS(f'Baseline written to {baseline_path}'))
+            return
+
+        if not baseline_path.is_file():
+            self.stdout.write(f'No baseline at {baseline_path}; run with --write-baseline to create one')
+            return
+        baseline = json.loads(baseline_path.read_text())
+        if baseline.get('meta') != meta:
+            self.stdout.write(self.style.WARNING(
+                f"Baseline was recorded with {baseline.get('meta')}, this run used {meta}"
+            ))
+        regressions = compare(results, baseline.get('routes', {}), options['tolerance'])
+        if not regressions:
+            self.stdout.write(self.style.SUCCESS('No regressions against the baseline'))
+            return
+        for name, message in regressions:
+            self.stdout.write(self.style.ERROR(f'REGRESSION {name}: {message}'))
+        if options['fail_on_regression']:
+            raise CommandError(f'{len(regressions)} regression(s) against the baseline')
+
+    def run_benchmark(self, options):
+        counts = generate_portfolio(companies=options['companies'], seed=options['seed'], anchor_date=ANCHOR_DATE)
+        self.stdout.write(f'Synthetic portfolio: {sum(counts.values())} rows')
+
+        user = User.objects.create_user('bench-admin', 'bench@example.com', is_staff=True, is_superuser=True)
+        UserProfile.objects.create(user=user)
+        client = Client(raise_request_exception=False)
+        client.force_login(user)
+        track_serializer_allocations()
+
+        results = {}
+        for name, path in discover_routes():
+            if options['routes'] and name not in options['routes']:
+                continue
+            if path is None:
+                results[name] = {'skipped': 'no object to request'}
+                continue
+            results[name] = measure(client, path, options['iterations'])
+            if options['memory']:
+                results[name].update(measure_memory(client, path))
+        return results
+
+    def report(self, results):
+        header = f"{'route':<44}{'status':>7}{'queries':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}"
+        self.stdout.write(header)
+        self.stdout.write('-' * len(header))
+        for name, result in sorted(results.items()):
+            if result.get('skipped'):
+                self.stdout.write(f"{name:<44}  skipped: {result['skipped']}")
+                continue
+            self.stdout.write(
+                f"{name:<44}{result['status']:>7}{result['queries']:>9}"
+                f"{result['p50_ms']:>9.1f}{result['p95_ms']:>9.1f}{result['p99_ms']:>9.1f}"
+            )
+
+        measured = {name: result for name, result in sorted(results.items()) if 'peak_kb' in result}
+        if not measured:
+            return
+        self.stdout.write('')
+        header = f"{'route':<44}{'peak KB':>10}{'kept KB':>10}  largest serializer / top site"
+        self.stdout.write(header)
+        self.stdout.write('-' * len(header))
+        for name, result in measured.items():
+            serializers = result['serializers_peak_kb']
+            largest = max(serializers, key=serializers.get) if serializers else None
+            detail = f'{largest} {serializers[largest]:.0f} KB' if largest else (result['top_sites'] or ['-'])[0]
+            self.stdout.write(f"{name:<44}{result['peak_kb']:>10.0f}{result['retained_kb']:>10.0f}  {detail}")
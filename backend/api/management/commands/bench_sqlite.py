@@ -0,0 +1,150 @@
+import multiprocessing
+import os
+import random
+import statistics
+import tempfile
+import time
+from datetime import date
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, transaction, OperationalError
+from django.db.models import Sum
+
+from core.sqlite import SQLITE_PROFILES
+from api.benchmarks import percentile, use_database
+from api.models import Company, Lead, Investment
+
+
+def _seed(companies, leads_per_company):
+    statuses = [choice for choice, _ in Lead.STATUS_CHOICES]
+    company_rows = Company.objects.bulk_create([
+        Company(
+            name=f'Bench Company {i}', description='Benchmark company', industry='Technology',
+            stage='seed', founded_year=2015 + i % 10, headquarters='Jakarta',
+        )
+        for i in range(companies)
+    ])
+    Lead.objects.bulk_create([
+        Lead(company=company, status=statuses[j % len(statuses)])
+        for company in company_rows
+        for j in range(leads_per_company)
+    ])
+
+
+def _read(rng, lead_ids):
+    # Dashboard-style aggregate plus a page of leads with their companies
+    Lead.objects.filter(status__in=['new', 'contacted', 'qualified', 'under_review']).count()
+    Investment.objects.filter(status__in=['proposed', 'approved']).aggregate(total=Sum('amount'))
+    list(Lead.objects.select_related('company').order_by('-created_at')[:20])
+
+
+def _write(rng, lead_ids):
+    statuses = [choice for choice, _ in Lead.STATUS_CHOICES]
+    # Read-then-write transaction, the pattern of update_status and admin edits
+    with transaction.atomic():
+        lead = Lead.objects.get(pk=rng.choice(lead_ids))
+        lead.status = rng.choice(statuses)
+        lead.save()
+        if lead.status == 'invested':
+            Investment.objects.create(
+                company_id=lead.company_id, lead=lead, amount=rng.randint(1, 100) * 10000,
+                investment_date=date.today(), status='proposed',
+            )
+
+
+def _worker(path, profile, duration, write_ratio, seed, results):
+    use_database(path, profile)
+    rng = random.Random(seed)
+    lead_ids = list(Lead.objects.values_list('id', flat=True))
+    stats = {'reads': 0, 'writes': 0, 'lock_errors': 0, 'other_errors': 0, 'latencies': []}
+
+    deadline = time.monotonic() + duration
+    while time.monotonic() < deadline:
+        is_write = rng.random() < write_ratio
+        started = time.perf_counter()
+        try:
+            (_write if is_write else _read)(rng, lead_ids)
+        except OperationalError as exc:
+            key = 'lock_errors' if 'locked' in str(exc) or 'busy' in str(exc) else 'other_errors'
+            stats[key] += 1
+            continue
+        stats['latencies'].append(time.perf_counter() - started)
+        stats['writes' if is_write else 'reads'] += 1
+
+    connections.close_all()
+    results.put(stats)
+
+
+class Command(BaseCommand):
+    help = 'Multi-process SQLite read/write benchmark comparing connection profiles'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=8)
+        parser.add_argument('--duration', type=float, default=10.0, help='Seconds per profile')
+        parser.add_argument('--write-ratio', type=float, default=0.2)
+        parser.add_argument('--companies', type=int, default=200)
+        parser.add_argument('--leads-per-company', type=int, default=10)
+        parser.add_argument(
+            '--profiles', nargs='+', default=['default', 'production'], choices=sorted(SQLITE_PROFILES)
+        )
+
+    def handle(self, *args, **options):
+        if connections['default'].vendor != 'sqlite':
+            raise CommandError('bench_sqlite only runs against the SQLite backend')
+
+        context = multiprocessing.get_context('fork')
+        rows = []
+        with tempfile.TemporaryDirectory() as directory:
+            for profile in options['profiles']:
+                path = os.path.join(directory, f'bench-{profile}.sqlite3')
+                use_database(path, profile)
+                call_command('migrate', verbosity=0)
+                _seed(options['companies'], options['leads_per_company'])
+                connections.close_all()
+
+                results = context.Queue()
+                processes = [
+                    context.Process(
+                        target=_worker,
+                        args=(path, profile, options['duration'], options['write_ratio'], index, results),
+                    )
+                    for index in range(options['processes'])
+                ]
+                for process in processes:
+                    process.start()
+                stats = [results.get() for _ in processes]
+                for process in processes:
+                    process.join()
+
+                latencies = [value for s in stats for value in s['latencies']]
+                reads = sum(s['reads'] for s in stats)
+                writes = sum(s['writes'] for s in stats)
+                lock_errors = sum(s['lock_errors'] for s in stats)
+                attempts = reads + writes + lock_errors + sum(s['other_errors'] for s in stats)
+                rows.append({
+                    'profile': profile,
+                    'ops_per_sec': (reads + writes) / options['duration'],
+                    'reads_per_sec': reads / options['duration'],
+                    'writes_per_sec': writes / options['duration'],
+                    'p50_ms': percentile(latencies, 50) * 1000,
+                    'p95_ms': percentile(latencies, 95) * 1000,
+                    'p99_ms': percentile(latencies, 99) * 1000,
+                    'mean_ms': statistics.fmean(latencies) * 1000 if latencies else 0.0,
+                    'lock_errors': lock_errors,
+                    'lock_error_rate': lock_errors / attempts if attempts else 0.0,
+                })
+
+        self.stdout.write(
+            f"{options['processes']} processes, {options['duration']}s per profile, "
+            f"{options['write_ratio']:.0%} writes\n"
+        )
+        header = f"{'profile':<12}{'ops/s':>10}{'reads/s':>10}{'writes/s':>10}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'locked':>9}{'lock %':>9}"
+        self.stdout.write(header)
+        self.stdout.write('-' * len(header))
+        for row in rows:
+            self.stdout.write(
+                f"{row['profile']:<12}{row['ops_per_sec']:>10.1f}{row['reads_per_sec']:>10.1f}"
+                f"{row['writes_per_sec']:>10.1f}{row['p50_ms']:>9.1f}{row['p95_ms']:>9.1f}"
+                f"{row['p99_ms']:>9.1f}{row['lock_errors']:>9}{row['lock_error_rate']:>9.2%}"
+            )
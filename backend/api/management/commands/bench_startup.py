@@ -0,0 +1,114 @@
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core.profiles import SERVER_PROFILES
+
+# Runs in a fresh interpreter per profile: what a gunicorn worker does before
+# and on its first request. The request is unauthenticated, so it needs no
+# database and stops at the permission check.
+CHILD = '''
+import json, os, resource, sys, time
+started = time.perf_counter()
+from django.core.wsgi import get_wsgi_application
+from django.urls import get_resolver
+application = get_wsgi_application()
+get_resolver().url_patterns
+loaded = time.perf_counter()
+from wsgiref.util import setup_testing_defaults
+environ = {'PATH_INFO': '/api/companies/', 'HTTP_HOST': 'localhost', 'HTTP_ACCEPT': 'application/json'}
+setup_testing_defaults(environ)
+statuses = []
+b''.join(application(environ, lambda status, headers, exc_info=None: statuses.append(status)))
+served = time.perf_counter()
+from django.apps import apps
+if apps.is_installed('django.contrib.admin'):
+    from django.contrib import admin
+    registrations = len(admin.site._registry)
+else:
+    registrations = 0
+try:
+    # Resident now (pages), what the worker keeps between requests
+    with open('/proc/self/statm') as statm:
+        rss = int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 1024
+except OSError:
+    # Peak instead; ru_maxrss is in bytes on macOS, KiB elsewhere
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / (1024 if sys.platform == 'darwin' else 1)
+print(json.dumps({
+    'startup_ms': (loaded - started) * 1000,
+    'first_request_ms': (served - loaded) * 1000,
+    'status': statuses[0].split()[0],
+    'rss_mb': rss / 1024,
+    'modules': len(sys.modules),
+    'apps': len(apps.get_app_configs()),
+    'admin_models': registrations,
+}))
+'''
+
+
+def run_child(profile):
+    env = {
+        **os.environ,
+        'SERVER_PROFILE': profile,
+        'DJANGO_SETTINGS_MODULE': os.environ.get('DJANGO_SETTINGS_MODULE', 'core.settings'),
+        'PYTHONDONTWRITEBYTECODE': '1',
+    }
+    process = subprocess.run(
+        [sys.executable, '-c', CHILD], cwd=settings.BASE_DIR, env=env, capture_output=True, text=True
+    )
+    if process.returncode:
+        raise CommandError(f'SERVER_PROFILE={profile} failed to start:\n{process.stderr.strip()}')
+    return json.loads(process.stdout.strip().splitlines()[-1])
+
+
+class Command(BaseCommand):
+    help = (
+        'Startup time, first request and resident memory after it (current RSS from /proc/self/statm, '
+        'or peak ru_maxrss without /proc) of a worker in each server profile (core/profiles.py)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--profiles', nargs='+', choices=sorted(SERVER_PROFILES), default=list(SERVER_PROFILES),
+            help='Profiles to compare (default: all)'
+        )
+        parser.add_argument('--runs', type=int, default=5, help='Fresh interpreters per profile (default: 5)')
+
+    def handle(self, *args, **options):
+        if options['runs'] < 1:
+            raise CommandError('--runs must be at least 1')
+        results = {}
+        for profile in options['profiles']:
+            runs = [run_child(profile) for _ in range(options['runs'])]
+            # Medians; the counts are the same in every run
+            results[profile] = {
+                key: statistics.median(run[key] for run in runs) if isinstance(runs[0][key], float) else runs[0][key]
+                for key in runs[0]
+            }
+        self.report(results)
+
+    def report(self, results):
+        header = (
+            f"{'profile':<10}{'apps':>6}{'admin models':>14}{'modules':>9}"
+            f"{'startup ms':>12}{'1st request ms':>16}{'status':>8}{'RSS MB':>9}"
+        )
+        self.stdout.write(header)
+        self.stdout.write('-' * len(header))
+        for profile, result in results.items():
+            self.stdout.write(
+                f"{profile:<10}{result['apps']:>6}{result['admin_models']:>14}{result['modules']:>9}"
+                f"{result['startup_ms']:>12.1f}{result['first_request_ms']:>16.1f}{result['status']:>8}"
+                f"{result['rss_mb']:>9.1f}"
+            )
+        if 'full' in results and 'api' in results:
+            full, api = results['full'], results['api']
+            self.stdout.write(self.style.SUCCESS(
+                f"api vs full: startup {api['startup_ms'] - full['startup_ms']:+.1f} ms, "
+                f"first request {api['first_request_ms'] - full['first_request_ms']:+.1f} ms, "
+                f"RSS {api['rss_mb'] - full['rss_mb']:+.1f} MB, {api['modules'] - full['modules']:+d} modules"
+            ))
@@ -0,0 +1,19 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from api.similarity import DEFAULT_BATCH_SIZE, refresh_vectors
+
+
+class Command(BaseCommand):
+    help = 'Compute the similar-company vectors of every company whose inputs changed'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help='Recompute every vector, changed or not')
+        parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        written = refresh_vectors(force=options['force'], batch_size=options['batch_size'])
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(f'Wrote {written} company vectors in {elapsed:.2f}s'))
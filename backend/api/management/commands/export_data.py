@@ -0,0 +1,37 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.exports import (
+    EXPORT_DATASETS, EXPORT_FORMATS, DEFAULT_CHUNK_SIZE, ExportError,
+    write_export, export_filename
+)
+
+
+class Command(BaseCommand):
+    help = 'Stream a table to CSV, JSONL or Parquet with constant memory'
+
+    def add_arguments(self, parser):
+        parser.add_argument('dataset', choices=sorted(EXPORT_DATASETS))
+        parser.add_argument('--output-format', choices=list(EXPORT_FORMATS), default='csv')
+        parser.add_argument(
+            '--output', '-o',
+            help="Destination file ('-' for stdout). Defaults to <dataset>.<ext> in the current directory."
+        )
+        parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        dataset = options['dataset']
+        output_format = options['output_format']
+        output = options['output'] or export_filename(dataset, output_format)
+
+        try:
+            if output == '-':
+                write_export(dataset, output_format, sys.stdout.buffer, options['chunk_size'])
+                return
+            with open(output, 'wb') as fileobj:
+                written = write_export(dataset, output_format, fileobj, options['chunk_size'])
+        except ExportError as exc:
+            raise CommandError(str(exc))
+
+        self.stdout.write(self.style.SUCCESS(f'Exported {dataset} to {output} ({written} bytes)'))
@@ -0,0 +1,40 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.synthetic import generate_portfolio
+
+
+class Command(BaseCommand):
+    help = 'Create a deterministic synthetic portfolio (companies, leads, investments and analyses)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--companies', type=int, default=100)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--anchor-date', help='YYYY-MM-DD that generated dates count back from (default: today)'
+        )
+        parser.add_argument(
+            '--superseded-ratio', type=float, default=0.2,
+            help='Share of analyses that also get an older, superseded version'
+        )
+
+    def handle(self, *args, **options):
+        anchor_date = None
+        if options['anchor_date']:
+            try:
+                anchor_date = date.fromisoformat(options['anchor_date'])
+            except ValueError:
+                raise CommandError('--anchor-date must be YYYY-MM-DD')
+
+        def progress(model_name, count):
+            self.stdout.write(f'{model_name}: {count}')
+
+        counts = generate_portfolio(
+            companies=options['companies'],
+            seed=options['seed'],
+            anchor_date=anchor_date,
+            superseded_ratio=options['superseded_ratio'],
+            progress=progress,
+        )
+        self.stdout.write(self.style.SUCCESS(f'Created {sum(counts.values())} rows'))
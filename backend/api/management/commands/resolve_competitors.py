@@ -0,0 +1,34 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.competitors import resolve_competitors
+
+
+class Command(BaseCommand):
+    help = 'Link free-text competitor names to companies and rebuild the competitor graph'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--threshold', type=float,
+            help='Minimum name similarity, 0-1 (default: COMPETITOR_MATCH_THRESHOLD)'
+        )
+
+    def handle(self, *args, **options):
+        threshold = options['threshold']
+        if threshold is not None and not 0 < threshold <= 1:
+            raise CommandError('--threshold must be in (0, 1]')
+
+        started = time.perf_counter()
+        result = resolve_competitors(threshold=threshold)
+        elapsed = time.perf_counter() - started
+        edges = result['edges']
+        self.stdout.write(
+            f"Resolved {result['resolved_names']} of {result['names']} distinct names; "
+            f"relinked {result['relinked']['competitor']} competitor and "
+            f"{result['relinked']['competitorsentiment']} competitor-sentiment rows"
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"Edges: {edges['created']} created, {edges['updated']} updated, {edges['deleted']} deleted "
+            f"in {elapsed:.2f}s"
+        ))
@@ -0,0 +1,26 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.models import Company
+from api.rollup import DEFAULT_BATCH_SIZE, refresh_company_scores
+
+
+class Command(BaseCommand):
+    help = 'Recompute Company.ai_score and ai_confidence from the latest completed analyses'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=DEFAULT_BATCH_SIZE,
+            help=f'Companies per batch (default: {DEFAULT_BATCH_SIZE})'
+        )
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be positive')
+        started = time.perf_counter()
+        changed = refresh_company_scores(batch_size=options['batch_size'])
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Updated the scores of {changed} of {Company.objects.count()} companies in {elapsed:.2f}s'
+        ))
@@ -0,0 +1,49 @@
+import multiprocessing
+import signal
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from api.jobs import work
+
+
+def _worker(index, poll_interval, stop_event):
+    # Connections inherited from the parent process must not be shared
+    connections.close_all()
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    work(poll_interval=poll_interval, stop_event=stop_event)
+
+
+class Command(BaseCommand):
+    help = 'Run background job workers (no external broker required)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=2, help='Number of worker processes')
+        parser.add_argument('--poll-interval', type=float, default=1.0, help='Seconds to wait when the queue is empty')
+        parser.add_argument('--once', action='store_true', help='Drain the queue in this process and exit')
+
+    def handle(self, *args, **options):
+        if options['once']:
+            work(once=True)
+            return
+
+        connections.close_all()
+        stop_event = multiprocessing.Event()
+        processes = [
+            multiprocessing.Process(
+                target=_worker, args=(index, options['poll_interval'], stop_event), daemon=False
+            )
+            for index in range(options['workers'])
+        ]
+        for process in processes:
+            process.start()
+        self.stdout.write(f"Started {len(processes)} job worker(s)")
+
+        def shutdown(signum, frame):
+            stop_event.set()
+
+        signal.signal(signal.SIGTERM, shutdown)
+        signal.signal(signal.SIGINT, shutdown)
+        for process in processes:
+            process.join()
+        self.stdout.write('Job workers stopped')
@@ -0,0 +1,34 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.scoring import DEFAULT_CHUNK_SIZE, rescore_leads
+
+
+class Command(BaseCommand):
+    help = 'Recompute Lead.ai_match_score for the leads whose scoring inputs changed'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=1, help='Processes scoring chunks in parallel')
+        parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE)
+        parser.add_argument('--force', action='store_true', help='Rescore every lead, changed or not')
+
+    def handle(self, *args, **options):
+        if options['workers'] < 1 or options['chunk_size'] < 1:
+            raise CommandError('--workers and --chunk-size must be at least 1')
+
+        def progress(done, chunks):
+            if options['verbosity'] > 1:
+                self.stdout.write(f'chunk {done}/{chunks}')
+
+        started = time.perf_counter()
+        result = rescore_leads(
+            workers=options['workers'],
+            chunk_size=options['chunk_size'],
+            force=options['force'],
+            progress=progress,
+        )
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Rescored {result['rescored']} of {result['scanned']} leads in {elapsed:.2f}s"
+        ))
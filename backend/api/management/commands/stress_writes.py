@@ -0,0 +1,348 @@
+import multiprocessing
+import os
+import random
+import tempfile
+import time
+import uuid
+from datetime import date
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DatabaseError, connections, transaction
+from django.db.models import Count
+
+from core.sqlite import SQLITE_PROFILES
+from api.admin import LeadResource
+from api.benchmarks import percentile, use_database
+from api.models import ChangeEvent, Company, Lead, Investment
+from api.sections import (
+    ANALYSIS_SECTIONS, build_dashboard_stats, dashboard_stat_loaders, run_loaders
+)
+from api.serializers import CompanyListSerializer, LeadSerializer
+from api.synthetic import CHILD_COUNTS, PortfolioGenerator, ensure_users, generate_portfolio
+
+WRITE_OPS = ('lead_status', 'investment', 'analysis', 'import')
+READ_OPS = ('dashboard', 'company_list', 'lead_list')
+DEFAULT_WEIGHTS = {'lead_status': 60, 'investment': 15, 'analysis': 15, 'import': 10}
+
+
+class _State:
+    """What a worker needs to pick rows, loaded once after the fork"""
+
+    def __init__(self, import_rows):
+        self.lead_ids = list(Lead.objects.values_list('id', flat=True))
+        self.companies = list(Company.objects.only('id', 'name'))
+        self.users = list(User.objects.filter(username__startswith='synthetic-analyst-'))
+        self.statuses = [choice for choice, _ in Lead.STATUS_CHOICES]
+        self.import_rows = import_rows
+
+
+# Write operations: each runs in its own transaction, the way the view or
+# admin action it imitates does, and returns (change events it publishes,
+# extra result). Rows are written with save() one at a time, like the app.
+
+def _lead_status(rng, state):
+    # LeadViewSet.update_status
+    lead = Lead.objects.get(pk=rng.choice(state.lead_ids))
+    new_status = rng.choice(state.statuses)
+    changed = lead.status != new_status
+    lead.status = new_status
+    lead.save()
+    return int(changed), None
+
+
+def _investment(rng, state):
+    # InvestmentViewSet.create
+    company = rng.choice(state.companies)
+    Investment.objects.create(
+        company=company, amount=rng.randint(1, 100) * 10000, investment_date=date.today(),
+        status='proposed', created_by=rng.choice(state.users),
+    )
+    return 1, None
+
+
+def _analysis(rng, state):
+    # Admin add form: the analysis, then each inline child row
+    generator = PortfolioGenerator(rng.getrandbits(64), date.today())
+    model = rng.choice(list(CHILD_COUNTS))
+    analysis = generator.analysis(model, rng.choice(state.companies), state.users)
+    for rows in generator.rows.values():
+        for row in rows:
+            row.save(force_insert=True)
+    return 1 + int(analysis.is_completed), (model._meta.label, analysis.pk)
+
+
+def _import(rng, state):
+    # Admin import of a CSV of new leads (saves row by row)
+    import tablib
+
+    rows = [
+        (str(uuid.uuid4()), rng.choice(state.companies).name, 'new', 'medium', 'Import', 'Stress import',
+         rng.randint(0, 100))
+        for _ in range(state.import_rows)
+    ]
+    dataset = tablib.Dataset(
+        *rows, headers=['id', 'company', 'status', 'priority', 'source', 'notes', 'ai_match_score']
+    )
+    result = LeadResource().import_data(dataset, dry_run=False, raise_errors=False, use_transactions=True)
+    errors = [error.error for error in result.base_errors]
+    errors += [error.error for _, row_errors in result.row_errors() for error in row_errors]
+    if errors:
+        # The import rolled back; surface the cause (often a lock error)
+        raise errors[0]
+    created = result.totals['new']
+    return created, ('import', created, result.totals['invalid'])
+
+
+WRITERS = {'lead_status': _lead_status, 'investment': _investment, 'analysis': _analysis, 'import': _import}
+
+
+def _dashboard(rng, state):
+    build_dashboard_stats(run_loaders(dashboard_stat_loaders()))
+
+
+def _company_list(rng, state):
+    CompanyListSerializer(Company.objects.filter(is_active=True).order_by('-updated_at')[:20], many=True).data
+
+
+def _lead_list(rng, state):
+    LeadSerializer(Lead.objects.order_by('-created_at')[:20], many=True).data
+
+
+READERS = {'dashboard': _dashboard, 'company_list': _company_list, 'lead_list': _lead_list}
+
+
+def _error_kind(exc):
+    if not isinstance(exc, DatabaseError):
+        return 'other_errors'
+    message = str(exc).lower()
+    if 'deadlock' in message:
+        return 'deadlocks'
+    if 'locked' in message or 'busy' in message or 'lock wait' in message:
+        return 'lock_errors'
+    return 'other_errors'
+
+
+def _new_stats():
+    return {'ok': 0, 'lock_errors': 0, 'deadlocks': 0, 'other_errors': 0, 'latencies': []}
+
+
+def _worker(path, profile, duration, ops, weights, seed, import_rows, results):
+    use_database(path, profile)
+    rng = random.Random(seed)
+    state = _State(import_rows)
+    stats = {op: _new_stats() for op in ops}
+    outcome = {
+        'events': 0,           # change events of fully completed writes
+        'events_at_risk': 0,   # of writes that committed but failed afterwards
+        'created': {'investment': 0, 'import': 0},
+        'analyses': [],
+        'import_row_errors': 0,
+        'post_commit_errors': 0,
+        'errors': [],
+    }
+
+    deadline = time.monotonic() + duration
+    while time.monotonic() < deadline:
+        op = rng.choices(ops, weights)[0]
+        op_stats = stats[op]
+        committed = []
+        started = time.perf_counter()
+        try:
+            if op in READERS:
+                READERS[op](rng, state)
+            else:
+                with transaction.atomic():
+                    # Registered first, so it runs before the change-event publishers
+                    transaction.on_commit(lambda: committed.append(True))
+                    events, extra = WRITERS[op](rng, state)
+        except Exception as exc:
+            kind = _error_kind(exc)
+            op_stats[kind] += 1
+            if kind == 'other_errors' and len(outcome['errors']) < 5:
+                outcome['errors'].append(f'{op}: {exc}')
+            if committed:
+                # Data is in, but some of its change events may not be
+                outcome['post_commit_errors'] += 1
+                outcome['events_at_risk'] += _expected_events(op, import_rows)
+            continue
+        op_stats['latencies'].append(time.perf_counter() - started)
+        op_stats['ok'] += 1
+        if op in WRITERS:
+            outcome['events'] += events
+            if op == 'investment':
+                outcome['created']['investment'] += 1
+            elif op == 'analysis':
+                outcome['analyses'].append(extra)
+            elif op == 'import':
+                outcome['created']['import'] += extra[1]
+                outcome['import_row_errors'] += extra[2]
+
+    connections.close_all()
+    results.put((stats, outcome))
+
+
+def _expected_events(op, import_rows):
+    # Upper bound of events one operation publishes
+    return {'lead_status': 1, 'investment': 1, 'analysis': 2, 'import': import_rows}[op]
+
+
+def _parse_weights(values):
+    weights = dict(DEFAULT_WEIGHTS)
+    for value in values or ():
+        op, _, weight = value.partition('=')
+        if op not in WRITERS or not weight.isdigit():
+            raise CommandError(f"--weight expects OP=N with OP one of {', '.join(WRITE_OPS)}")
+        weights[op] = int(weight)
+    weights = {op: weight for op, weight in weights.items() if weight}
+    if not weights:
+        raise CommandError('At least one write operation needs a weight above 0')
+    return weights
+
+
+def check_invariants(initial, outcomes, analysis_ids):
+    """[(invariant, expected, actual, ok)] after all workers finished"""
+    created_investments = sum(o['created']['investment'] for o in outcomes)
+    created_leads = sum(o['created']['import'] for o in outcomes)
+    events = sum(o['events'] for o in outcomes)
+    events_at_risk = sum(o['events_at_risk'] for o in outcomes)
+
+    checks = [
+        ('investments', initial['investments'] + created_investments, Investment.objects.count()),
+        ('leads', initial['leads'] + created_leads, Lead.objects.count()),
+    ]
+    analyses = {model: 0 for _, model, *_ in ANALYSIS_SECTIONS}
+    for label, _ in analysis_ids:
+        analyses[next(m for m in analyses if m._meta.label == label)] += 1
+    for model, created in analyses.items():
+        checks.append((f'{model.__name__} rows', initial[model._meta.label] + created, model.objects.count()))
+
+    # Every committed analysis has all of its children (no partial writes)
+    for model, children in CHILD_COUNTS.items():
+        ids = [pk for label, pk in analysis_ids if label == model._meta.label]
+        for child_model, count in children:
+            per_analysis = dict(
+                child_model.objects.filter(analysis_id__in=ids)
+                .values_list('analysis_id').annotate(n=Count('id'))
+            )
+            incomplete = sum(1 for pk in ids if per_analysis.get(pk, 0) != count)
+            checks.append((f'{model.__name__} with {count} {child_model.__name__}', len(ids), len(ids) - incomplete))
+
+    result = [(name, expected, actual, expected == actual) for name, expected, actual in checks]
+    published = ChangeEvent.objects.count() - initial['events']
+    result.append((
+        'change events published',
+        events if not events_at_risk else f'{events}..{events + events_at_risk}',
+        published,
+        events <= published <= events + events_at_risk,
+    ))
+    return result
+
+
+class Command(BaseCommand):
+    help = 'Concurrent multi-process write stress test with readers, error counts and invariant checks'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--writers', type=int, default=6, help='Writer processes')
+        parser.add_argument('--readers', type=int, default=2, help='Dashboard and list reader processes')
+        parser.add_argument('--duration', type=float, default=10.0, help='Seconds')
+        parser.add_argument('--companies', type=int, default=100)
+        parser.add_argument('--import-rows', type=int, default=50, help='Leads per admin-style import')
+        parser.add_argument(
+            '--weight', action='append', metavar='OP=N',
+            help=f"Relative weight of a write operation ({', '.join(WRITE_OPS)}); repeatable"
+        )
+        parser.add_argument('--profile', default='production', choices=sorted(SQLITE_PROFILES))
+        parser.add_argument('--fail-on-violation', action='store_true')
+
+    def handle(self, *args, **options):
+        if connections['default'].vendor != 'sqlite':
+            raise CommandError('stress_writes only runs against the SQLite backend')
+        weights = _parse_weights(options['weight'])
+
+        context = multiprocessing.get_context('fork')
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'stress.sqlite3')
+            use_database(path, options['profile'])
+            call_command('migrate', verbosity=0)
+            ensure_users()
+            generate_portfolio(companies=options['companies'], seed=0)
+            initial = {
+                'investments': Investment.objects.count(),
+                'leads': Lead.objects.count(),
+                'events': ChangeEvent.objects.count(),
+            }
+            initial.update({model._meta.label: model.objects.count() for _, model, *_ in ANALYSIS_SECTIONS})
+            connections.close_all()
+
+            results = context.Queue()
+            workers = [
+                (list(weights), list(weights.values())) for _ in range(options['writers'])
+            ] + [
+                (list(READ_OPS), [1] * len(READ_OPS)) for _ in range(options['readers'])
+            ]
+            processes = [
+                context.Process(
+                    target=_worker,
+                    args=(path, options['profile'], options['duration'], ops, op_weights, index,
+                          options['import_rows'], results),
+                )
+                for index, (ops, op_weights) in enumerate(workers)
+            ]
+            for process in processes:
+                process.start()
+            collected = [results.get() for _ in processes]
+            for process in processes:
+                process.join()
+
+            use_database(path, options['profile'])
+            outcomes = [outcome for _, outcome in collected]
+            analysis_ids = [entry for outcome in outcomes for entry in outcome['analyses']]
+            invariants = check_invariants(initial, outcomes, analysis_ids)
+            connections.close_all()
+
+        self.report(options, collected, outcomes, invariants)
+        violations = [row for row in invariants if not row[3]]
+        if violations and options['fail_on_violation']:
+            raise CommandError(f'{len(violations)} invariant violation(s)')
+
+    def report(self, options, collected, outcomes, invariants):
+        duration = options['duration']
+        self.stdout.write(
+            f"{options['writers']} writers + {options['readers']} readers, {duration}s, "
+            f"profile {options['profile']}\n"
+        )
+        header = (
+            f"{'operation':<14}{'ok':>8}{'ops/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}"
+            f"{'locked':>8}{'deadlk':>8}{'other':>8}"
+        )
+        self.stdout.write(header)
+        self.stdout.write('-' * len(header))
+        for op in WRITE_OPS + READ_OPS:
+            merged = _new_stats()
+            for stats, _ in collected:
+                for key, value in stats.get(op, {}).items():
+                    merged[key] += value
+            if not merged['ok'] and not merged['latencies'] and not any(
+                merged[key] for key in ('lock_errors', 'deadlocks', 'other_errors')
+            ):
+                continue
+            latencies = merged['latencies']
+            self.stdout.write(
+                f"{op:<14}{merged['ok']:>8}{merged['ok'] / duration:>9.1f}"
+                f"{percentile(latencies, 50) * 1000:>9.1f}{percentile(latencies, 95) * 1000:>9.1f}"
+                f"{percentile(latencies, 99) * 1000:>9.1f}{merged['lock_errors']:>8}"
+                f"{merged['deadlocks']:>8}{merged['other_errors']:>8}"
+            )
+
+        post_commit = sum(o['post_commit_errors'] for o in outcomes)
+        row_errors = sum(o['import_row_errors'] for o in outcomes)
+        self.stdout.write(f'\nErrors after commit: {post_commit}, import row errors: {row_errors}')
+        for error in [e for o in outcomes for e in o['errors']][:5]:
+            self.stdout.write(f'  {error}')
+
+        self.stdout.write('\nInvariants')
+        for name, expected, actual, ok in invariants:
+            style = self.style.SUCCESS if ok else self.style.ERROR
+            self.stdout.write(style(f"  {'OK  ' if ok else 'FAIL'} {name}: expected {expected}, got {actual}"))
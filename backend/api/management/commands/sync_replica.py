@@ -0,0 +1,26 @@
+import sqlite3
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = 'Copy the primary SQLite database into the local read replica file'
+
+    def handle(self, *args, **options):
+        replica = settings.DATABASES.get('replica')
+        primary = settings.DATABASES['default']
+        if replica is None:
+            raise CommandError('No replica database configured (set SQLITE_REPLICA_PATH)')
+        if 'sqlite3' not in primary['ENGINE'] or 'sqlite3' not in replica['ENGINE']:
+            raise CommandError('sync_replica only copies between SQLite files')
+
+        source = sqlite3.connect(str(primary['NAME']))
+        target = sqlite3.connect(str(replica['NAME']))
+        try:
+            # The online backup API copies a consistent snapshot while writers keep going
+            source.backup(target)
+        finally:
+            target.close()
+            source.close()
+        self.stdout.write(self.style.SUCCESS(f"Replica {replica['NAME']} refreshed from {primary['NAME']}"))
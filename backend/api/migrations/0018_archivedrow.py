@@ -0,0 +1,33 @@
+# Generated by Django 5.2.6 on 2026-10-19 12:54
+
+import django.core.serializers.json
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0017_job'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedRow',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('model', models.CharField(help_text="Model label of the original row (e.g., 'api.RecentMention')", max_length=100)),
+                ('original_id', models.CharField(max_length=64)),
+                ('analysis_id', models.UUIDField(help_text='Parent analysis of the original row')),
+                ('company_id', models.UUIDField(blank=True, null=True)),
+                ('row_date', models.DateField(blank=True, help_text='Date the archive horizon was applied to', null=True)),
+                ('data', models.JSONField(encoder=django.core.serializers.json.DjangoJSONEncoder, help_text='Column values of the original row')),
+                ('reason', models.CharField(choices=[('age', 'Older than the archive horizon'), ('superseded', 'Belongs to a superseded analysis')], max_length=20)),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Archived Row',
+                'verbose_name_plural': 'Archived Rows',
+                'indexes': [models.Index(fields=['analysis_id', 'model'], name='api_archive_analysi_e47afb_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.6 on 2026-10-19 13:03
+
+import django.core.serializers.json
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0018_archivedrow'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChangeEvent',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('event', models.CharField(help_text="Event type (e.g., 'analysis.completed')", max_length=50)),
+                ('company_id', models.UUIDField(blank=True, null=True)),
+                ('user_ids', models.JSONField(blank=True, default=list, help_text='Users the event concerns beyond company watchers')),
+                ('payload', models.JSONField(default=dict, encoder=django.core.serializers.json.DjangoJSONEncoder)),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+            ],
+            options={
+                'verbose_name': 'Change Event',
+                'verbose_name_plural': 'Change Events',
+            },
+        ),
+        migrations.AddField(
+            model_name='userprofile',
+            name='watched_companies',
+            field=models.ManyToManyField(blank=True, help_text="Companies whose changes are pushed to this user's change stream", related_name='watchers', to='api.company'),
+        ),
+    ]
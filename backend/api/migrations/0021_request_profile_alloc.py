@@ -0,0 +1,23 @@
+# Generated by Django 5.2.6 on 2026-10-19 13:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0020_request_profile'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='requestprofile',
+            name='data',
+            field=models.BinaryField(help_text='Folded stacks (flamegraph.pl / speedscope), a pstats dump or a JSON report'),
+        ),
+        migrations.AlterField(
+            model_name='requestprofile',
+            name='mode',
+            field=models.CharField(choices=[('sample', 'Sampling (folded stacks)'), ('cprofile', 'cProfile (pstats)'), ('alloc', 'Allocations (tracemalloc report)')], max_length=20),
+        ),
+    ]
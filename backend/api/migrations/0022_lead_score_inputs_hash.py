@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-19 13:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0021_request_profile_alloc'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='lead',
+            name='score_inputs_hash',
+            field=models.CharField(blank=True, editable=False, max_length=16),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.6 on 2026-10-19 13:24
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0022_lead_score_inputs_hash'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CompanyVector',
+            fields=[
+                ('company', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='vector', serialize=False, to='api.company')),
+                ('vector', models.BinaryField(help_text='Unit-length float32 feature vector')),
+                ('inputs_hash', models.CharField(max_length=16)),
+                ('updated_at', models.DateTimeField(auto_now=True, db_index=True)),
+            ],
+            options={
+                'verbose_name': 'Company Vector',
+                'verbose_name_plural': 'Company Vectors',
+            },
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.2.6 on 2026-10-19 13:28
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0023_company_vector'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='competitor',
+            name='resolved_company',
+            field=models.ForeignKey(blank=True, editable=False, help_text='Company the name was resolved to (see api/competitors.py)', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='api.company'),
+        ),
+        migrations.AddField(
+            model_name='competitorsentiment',
+            name='resolved_company',
+            field=models.ForeignKey(blank=True, editable=False, help_text='Company the name was resolved to (see api/competitors.py)', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='api.company'),
+        ),
+        migrations.CreateModel(
+            name='CompetitorEdge',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('mentions', models.IntegerField(default=1, help_text='Competitor and competitor-sentiment rows behind the edge')),
+                ('similarity', models.FloatField(help_text='Best name-match similarity of those rows (1.0: exact)')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('company', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='competitor_edges', to='api.company')),
+                ('competitor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='listed_by_edges', to='api.company')),
+            ],
+            options={
+                'verbose_name': 'Competitor Edge',
+                'verbose_name_plural': 'Competitor Edges',
+                'indexes': [models.Index(fields=['competitor', 'company'], name='api_competi_competi_5a1195_idx')],
+                'constraints': [models.UniqueConstraint(fields=('company', 'competitor'), name='unique_competitor_edge')],
+            },
+        ),
+    ]
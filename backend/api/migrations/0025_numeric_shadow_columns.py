@@ -0,0 +1,133 @@
+# Generated by Django 5.2.6 on 2026-10-19 13:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0024_competitor_resolution'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='competitor',
+            name='employees_currency',
+            field=models.CharField(blank=True, editable=False, max_length=3),
+        ),
+        migrations.AddField(
+            model_name='competitor',
+            name='employees_unit',
+            field=models.CharField(blank=True, editable=False, max_length=20),
+        ),
+        migrations.AddField(
+            model_name='competitor',
+            name='employees_value',
+            field=models.DecimalField(blank=True, db_index=True, decimal_places=4, editable=False, max_digits=24, null=True),
+        ),
+        migrations.AddField(
+            model_name='competitor',
+            name='funding_currency',
+            field=models.CharField(blank=True, editable=False, max_length=3),
+        ),
+        migrations.AddField(
+            model_name='competitor',
+            name='funding_unit',
+            field=models.CharField(blank=True, editable=False, max_length=20),
+        ),
+        migrations.AddField(
+            model_name='competitor',
+            name='funding_value',
+            field=models.DecimalField(blank=True, db_index=True, decimal_places=4, editable=False, max_digits=24, null=True),
+        ),
+        migrations.AddField(
+            model_name='competitor',
+            name='market_share_currency',
+            field=models.CharField(blank=True, editable=False, max_length=3),
+        ),
+        migrations.AddField(
+            model_name='competitor',
+            name='market_share_unit',
+            field=models.CharField(blank=True, editable=False, max_length=20),
+        ),
+        migrations.AddField(
+            model_name='competitor',
+            name='market_share_value',
+            field=models.DecimalField(blank=True, db_index=True, decimal_places=4, editable=False, max_digits=24, null=True),
+        ),
+        migrations.AddField(
+            model_name='competitor',
+            name='revenue_currency',
+            field=models.CharField(blank=True, editable=False, max_length=3),
+        ),
+        migrations.AddField(
+            model_name='competitor',
+            name='revenue_unit',
+            field=models.CharField(blank=True, editable=False, max_length=20),
+        ),
+        migrations.AddField(
+            model_name='competitor',
+            name='revenue_value',
+            field=models.DecimalField(blank=True, db_index=True, decimal_places=4, editable=False, max_digits=24, null=True),
+        ),
+        migrations.AddField(
+            model_name='marketanalysis',
+            name='market_size_currency',
+            field=models.CharField(blank=True, editable=False, max_length=3),
+        ),
+        migrations.AddField(
+            model_name='marketanalysis',
+            name='market_size_unit',
+            field=models.CharField(blank=True, editable=False, max_length=20),
+        ),
+        migrations.AddField(
+            model_name='marketanalysis',
+            name='market_size_value',
+            field=models.DecimalField(blank=True, db_index=True, decimal_places=4, editable=False, max_digits=24, null=True),
+        ),
+        migrations.AddField(
+            model_name='revenueinformation',
+            name='revenue_figure_currency',
+            field=models.CharField(blank=True, editable=False, max_length=3),
+        ),
+        migrations.AddField(
+            model_name='revenueinformation',
+            name='revenue_figure_unit',
+            field=models.CharField(blank=True, editable=False, max_length=20),
+        ),
+        migrations.AddField(
+            model_name='revenueinformation',
+            name='revenue_figure_value',
+            field=models.DecimalField(blank=True, db_index=True, decimal_places=4, editable=False, max_digits=24, null=True),
+        ),
+        migrations.AddField(
+            model_name='saleschannel',
+            name='installs_count_currency',
+            field=models.CharField(blank=True, editable=False, max_length=3),
+        ),
+        migrations.AddField(
+            model_name='saleschannel',
+            name='installs_count_unit',
+            field=models.CharField(blank=True, editable=False, max_length=20),
+        ),
+        migrations.AddField(
+            model_name='saleschannel',
+            name='installs_count_value',
+            field=models.DecimalField(blank=True, db_index=True, decimal_places=4, editable=False, max_digits=24, null=True),
+        ),
+        migrations.AddField(
+            model_name='saleschannel',
+            name='revenue_amount_currency',
+            field=models.CharField(blank=True, editable=False, max_length=3),
+        ),
+        migrations.AddField(
+            model_name='saleschannel',
+            name='revenue_amount_unit',
+            field=models.CharField(blank=True, editable=False, max_length=20),
+        ),
+        migrations.AddField(
+            model_name='saleschannel',
+            name='revenue_amount_value',
+            field=models.DecimalField(blank=True, db_index=True, decimal_places=4, editable=False, max_digits=24, null=True),
+        ),
+    ]
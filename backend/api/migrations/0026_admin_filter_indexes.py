@@ -0,0 +1,69 @@
+# Generated by Django 5.2.6 on 2026-10-19 13:49
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0025_numeric_shadow_columns'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='brandmetric',
+            name='current_score',
+            field=models.IntegerField(db_index=True, help_text='Current score for this metric (0-100)', validators=[django.core.validators.MinValueValidator(0), django.core.validators.MaxValueValidator(100)]),
+        ),
+        migrations.AlterField(
+            model_name='competitiveanalysis',
+            name='created_at',
+            field=models.DateTimeField(auto_now_add=True, db_index=True),
+        ),
+        migrations.AlterField(
+            model_name='highlevelanalysis',
+            name='created_at',
+            field=models.DateTimeField(auto_now_add=True, db_index=True),
+        ),
+        migrations.AlterField(
+            model_name='keyindividualsanalysis',
+            name='created_at',
+            field=models.DateTimeField(auto_now_add=True, db_index=True),
+        ),
+        migrations.AlterField(
+            model_name='keytopic',
+            name='sentiment_score',
+            field=models.IntegerField(db_index=True, help_text='Sentiment score for this topic (0-100)', validators=[django.core.validators.MinValueValidator(0), django.core.validators.MaxValueValidator(100)]),
+        ),
+        migrations.AlterField(
+            model_name='lead',
+            name='created_at',
+            field=models.DateTimeField(auto_now_add=True, db_index=True),
+        ),
+        migrations.AlterField(
+            model_name='marketanalysis',
+            name='created_at',
+            field=models.DateTimeField(auto_now_add=True, db_index=True),
+        ),
+        migrations.AlterField(
+            model_name='perceptionanalysis',
+            name='created_at',
+            field=models.DateTimeField(auto_now_add=True, db_index=True),
+        ),
+        migrations.AlterField(
+            model_name='publicmention',
+            name='date',
+            field=models.DateField(blank=True, db_index=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='recentmention',
+            name='date',
+            field=models.DateField(db_index=True, help_text='Publication date'),
+        ),
+        migrations.AlterField(
+            model_name='revenueinformation',
+            name='date',
+            field=models.DateField(db_index=True, help_text='Date of publication or report'),
+        ),
+    ]
@@ -1,9 +1,25 @@
 from django.db import models
 from django.contrib.auth.models import User
 from django.contrib.contenttypes.fields import GenericForeignKey
+from django.core.serializers.json import DjangoJSONEncoder
 from django.core.validators import MinValueValidator, MaxValueValidator
 import uuid
 
+
+def shadow_numeric_columns(model, *field_names):
+    """
+    Add indexed ``<field>_value``/``_unit``/``_currency`` columns for display
+    strings such as "$50M"; api/numeric.py fills them on save.
+    """
+    model.numeric_shadow_fields = field_names
+    for name in field_names:
+        model.add_to_class(f'{name}_value', models.DecimalField(
+            max_digits=24, decimal_places=4, null=True, blank=True, editable=False, db_index=True
+        ))
+        model.add_to_class(f'{name}_unit', models.CharField(max_length=20, blank=True, editable=False))
+        model.add_to_class(f'{name}_currency', models.CharField(max_length=3, blank=True, editable=False))
+
+
 class Company(models.Model):
     """Model representing a company for investment analysis"""
     
@@ -85,7 +101,7 @@ class Analysis(models.Model):
     
     # Metadata
     analyst = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
-    created_at = models.DateTimeField(auto_now_add=True)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
     updated_at = models.DateTimeField(auto_now=True)
     is_completed = models.BooleanField(default=False)
     
@@ -164,9 +180,11 @@ class Lead(models.Model):
         validators=[MinValueValidator(0), MaxValueValidator(100)],
         null=True, blank=True
     )
+    # Hash of the inputs ai_match_score was computed from (api/scoring.py)
+    score_inputs_hash = models.CharField(max_length=16, blank=True, editable=False)
     
     # Metadata
-    created_at = models.DateTimeField(auto_now_add=True)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
     updated_at = models.DateTimeField(auto_now=True)
     
     class Meta:
@@ -222,6 +240,10 @@ class UserProfile(models.Model):
     # Preferences
     preferred_industries = models.JSONField(default=list)
     notification_preferences = models.JSONField(default=dict)
+    watched_companies = models.ManyToManyField(
+        Company, blank=True, related_name='watchers',
+        help_text="Companies whose changes are pushed to this user's change stream"
+    )
     
     # Metadata
     created_at = models.DateTimeField(auto_now_add=True)
@@ -339,6 +361,10 @@ class CompetitorSentiment(models.Model):
     
     # Competitor information
     company_name = models.CharField(max_length=255, help_text="Competitor company name")
+    resolved_company = models.ForeignKey(
+        Company, on_delete=models.SET_NULL, null=True, blank=True, related_name='+', editable=False,
+        help_text="Company the name was resolved to (see api/competitors.py)"
+    )
     
     # Sentiment metrics
     positive_percentage = models.IntegerField(
@@ -388,7 +414,7 @@ class RecentMention(models.Model):
     # Mention details
     title = models.CharField(max_length=500, help_text="Title of the article/mention")
     source = models.CharField(max_length=255, help_text="Source (e.g., 'TechCrunch', 'LinkedIn', 'Twitter')")
-    date = models.DateField(help_text="Publication date")
+    date = models.DateField(db_index=True, help_text="Publication date")
     url = models.URLField(blank=True, help_text="Link to the original article/post")
     
     # Content
@@ -473,7 +499,7 @@ class KeyTopic(models.Model):
     
     # Sentiment metrics
     sentiment_score = models.IntegerField(
-        validators=[MinValueValidator(0), MaxValueValidator(100)],
+        validators=[MinValueValidator(0), MaxValueValidator(100)], db_index=True,
         help_text="Sentiment score for this topic (0-100)"
     )
     mentions_count = models.IntegerField(
@@ -531,7 +557,7 @@ class BrandMetric(models.Model):
     
     # Score and benchmark
     current_score = models.IntegerField(
-        validators=[MinValueValidator(0), MaxValueValidator(100)],
+        validators=[MinValueValidator(0), MaxValueValidator(100)], db_index=True,
         help_text="Current score for this metric (0-100)"
     )
     industry_benchmark = models.IntegerField(
@@ -574,11 +600,15 @@ class BrandMetric(models.Model):
     @property
     def benchmark_difference(self):
         """Calculate difference from benchmark"""
+        if self.current_score is None or self.industry_benchmark is None:
+            return None
         return self.current_score - self.industry_benchmark
     
     @property
     def is_above_benchmark(self):
         """Check if score is above benchmark"""
+        if self.current_score is None or self.industry_benchmark is None:
+            return None
         return self.current_score > self.industry_benchmark
 
 
@@ -684,6 +714,9 @@ class MarketAnalysis(Analysis):
         ordering = ['-created_at']
 
 
+shadow_numeric_columns(MarketAnalysis, 'market_size')
+
+
 # Structured models for Market Analysis
 
 class RevenueInformation(models.Model):
@@ -701,7 +734,7 @@ class RevenueInformation(models.Model):
     # Information details
     title = models.CharField(max_length=500, help_text="Title describing the revenue information")
     source = models.CharField(max_length=255, help_text="Source (e.g., 'Annual Report', 'TechCrunch', 'Investor Deck')")
-    date = models.DateField(help_text="Date of publication or report")
+    date = models.DateField(db_index=True, help_text="Date of publication or report")
     url = models.URLField(blank=True, help_text="Link to the original source")
     
     # Revenue data
@@ -765,6 +798,9 @@ class RevenueInformation(models.Model):
             return self.date.strftime("%b %d, %Y")
 
 
+shadow_numeric_columns(RevenueInformation, 'revenue_figure')
+
+
 class MarketForce(models.Model):
     """Porter's Five Forces style market dynamics for a market analysis"""
 
@@ -827,6 +863,9 @@ class SalesChannel(models.Model):
         return self.platform_name
 
 
+shadow_numeric_columns(SalesChannel, 'installs_count', 'revenue_amount')
+
+
 class IndustryTrend(models.Model):
     """Structured industry trend items for the Industry Trends tab"""
 
@@ -948,7 +987,7 @@ class PublicMention(models.Model):
     title = models.CharField(max_length=255)
     person = models.CharField(max_length=255, blank=True)
     source = models.CharField(max_length=255, blank=True)
-    date = models.DateField(null=True, blank=True)
+    date = models.DateField(null=True, blank=True, db_index=True)
     summary = models.TextField(blank=True)
     sentiment = models.CharField(max_length=50, blank=True)
     url = models.URLField(blank=True)
@@ -971,6 +1010,10 @@ class Competitor(models.Model):
     
     # Basic Information
     name = models.CharField(max_length=255, help_text="Competitor company name")
+    resolved_company = models.ForeignKey(
+        Company, on_delete=models.SET_NULL, null=True, blank=True, related_name='+', editable=False,
+        help_text="Company the name was resolved to (see api/competitors.py)"
+    )
     position = models.CharField(max_length=255, blank=True, help_text="Market position description")
     logo = models.CharField(max_length=10, default='📊', help_text="Emoji or icon representation")
     
@@ -1012,6 +1055,9 @@ class Competitor(models.Model):
         return f"{self.name} ({self.score}/100)"
 
 
+shadow_numeric_columns(Competitor, 'funding', 'revenue', 'market_share', 'employees')
+
+
 class StrategicRecommendation(models.Model):
     """Represents a strategic recommendation category for competitive analysis"""
     
@@ -1047,4 +1093,180 @@ class StrategicRecommendation(models.Model):
         verbose_name_plural = "Strategic Recommendations"
     
     def __str__(self):
-        return f"{self.category} ({self.get_priority_display()} Priority)"
\ No newline at end of file
+        return f"{self.category} ({self.get_priority_display()} Priority)"
+
+class Job(models.Model):
+    """Background job executed by the local worker pool (see api/jobs.py)"""
+
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('succeeded', 'Succeeded'),
+        ('failed', 'Failed'),
+        ('cancelled', 'Cancelled'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    kind = models.CharField(max_length=50, help_text="Registered job handler name (e.g., 'export', 'import')")
+    params = models.JSONField(default=dict, blank=True, help_text="Keyword arguments passed to the handler")
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='queued')
+
+    # Progress reporting
+    progress_current = models.IntegerField(default=0)
+    progress_total = models.IntegerField(null=True, blank=True)
+    progress_message = models.CharField(max_length=255, blank=True)
+
+    # Outcome
+    result = models.JSONField(default=dict, blank=True)
+    result_file = models.CharField(max_length=500, blank=True, help_text="Result artifact path relative to JOB_RESULTS_DIR")
+    error = models.TextField(blank=True)
+
+    # Worker bookkeeping
+    cancel_requested = models.BooleanField(default=False)
+    attempts = models.IntegerField(default=0)
+    worker = models.CharField(max_length=100, blank=True)
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+
+    # Metadata
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'created_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} ({self.get_status_display()})"
+
+    @property
+    def is_finished(self):
+        return self.status in ('succeeded', 'failed', 'cancelled')
+
+    @property
+    def progress_percentage(self):
+        """Progress as 0-100, or None when the total is unknown"""
+        if not self.progress_total:
+            return 100.0 if self.status == 'succeeded' else None
+        return round(min(self.progress_current / self.progress_total, 1.0) * 100, 1)
+
+
+class ArchivedRow(models.Model):
+    """Compact cold-storage copy of a child row moved out of its hot table (see api/archive.py)"""
+
+    REASON_CHOICES = [
+        ('age', 'Older than the archive horizon'),
+        ('superseded', 'Belongs to a superseded analysis'),
+    ]
+
+    model = models.CharField(max_length=100, help_text="Model label of the original row (e.g., 'api.RecentMention')")
+    original_id = models.CharField(max_length=64)
+    analysis_id = models.UUIDField(help_text="Parent analysis of the original row")
+    company_id = models.UUIDField(null=True, blank=True)
+    row_date = models.DateField(null=True, blank=True, help_text="Date the archive horizon was applied to")
+    data = models.JSONField(encoder=DjangoJSONEncoder, help_text="Column values of the original row")
+    reason = models.CharField(max_length=20, choices=REASON_CHOICES)
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = "Archived Row"
+        verbose_name_plural = "Archived Rows"
+        indexes = [
+            models.Index(fields=['analysis_id', 'model']),
+        ]
+
+    def __str__(self):
+        return f"{self.model} #{self.original_id}"
+
+
+class ChangeEvent(models.Model):
+    """Change notification published to the SSE stream (see api/stream.py)"""
+
+    id = models.BigAutoField(primary_key=True)
+    event = models.CharField(max_length=50, help_text="Event type (e.g., 'analysis.completed')")
+    company_id = models.UUIDField(null=True, blank=True)
+    user_ids = models.JSONField(default=list, blank=True, help_text="Users the event concerns beyond company watchers")
+    payload = models.JSONField(encoder=DjangoJSONEncoder, default=dict)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        verbose_name = "Change Event"
+        verbose_name_plural = "Change Events"
+
+    def __str__(self):
+        return f"{self.event} #{self.pk}"
+
+
+class RequestProfile(models.Model):
+    """Profile of one staff request captured on demand (see api/profiling.py)"""
+
+    MODE_CHOICES = [
+        ('sample', 'Sampling (folded stacks)'),
+        ('cprofile', 'cProfile (pstats)'),
+        ('alloc', 'Allocations (tracemalloc report)'),
+    ]
+    FILE_EXTENSIONS = {'sample': 'folded', 'cprofile': 'prof', 'alloc': 'json'}
+
+    user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
+    method = models.CharField(max_length=10)
+    path = models.CharField(max_length=500)
+    view = models.CharField(max_length=200, blank=True)
+    status_code = models.IntegerField()
+    duration_ms = models.FloatField()
+    mode = models.CharField(max_length=20, choices=MODE_CHOICES)
+    data = models.BinaryField(help_text="Folded stacks (flamegraph.pl / speedscope), a pstats dump or a JSON report")
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        verbose_name = "Request Profile"
+        verbose_name_plural = "Request Profiles"
+
+    def __str__(self):
+        return f"{self.method} {self.path} ({self.duration_ms:.0f} ms)"
+
+    @property
+    def filename(self):
+        return f"profile-{self.pk}.{self.FILE_EXTENSIONS[self.mode]}"
+
+
+class CompanyVector(models.Model):
+    """Feature vector of a company for similar-company search (see api/similarity.py)"""
+
+    company = models.OneToOneField(Company, on_delete=models.CASCADE, primary_key=True, related_name='vector')
+    vector = models.BinaryField(help_text="Unit-length float32 feature vector")
+    inputs_hash = models.CharField(max_length=16)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    class Meta:
+        verbose_name = "Company Vector"
+        verbose_name_plural = "Company Vectors"
+
+    def __str__(self):
+        return f"Vector of {self.company_id}"
+
+
+class CompetitorEdge(models.Model):
+    """Precomputed "company lists competitor" edge between two resolved companies (see api/competitors.py)"""
+
+    company = models.ForeignKey(Company, on_delete=models.CASCADE, related_name='competitor_edges')
+    competitor = models.ForeignKey(Company, on_delete=models.CASCADE, related_name='listed_by_edges')
+    mentions = models.IntegerField(default=1, help_text="Competitor and competitor-sentiment rows behind the edge")
+    similarity = models.FloatField(help_text="Best name-match similarity of those rows (1.0: exact)")
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Competitor Edge"
+        verbose_name_plural = "Competitor Edges"
+        constraints = [
+            models.UniqueConstraint(fields=['company', 'competitor'], name='unique_competitor_edge'),
+        ]
+        indexes = [
+            models.Index(fields=['competitor', 'company']),
+        ]
+
+    def __str__(self):
+        return f"{self.company_id} -> {self.competitor_id}"
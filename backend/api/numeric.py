@@ -0,0 +1,181 @@
+"""
+Numeric shadow columns for figures stored as display strings.
+
+Fields such as ``Competitor.funding`` ("$50M") or ``SalesChannel.installs_count``
+("120K") are free text. Every such field ``x`` (listed in the model's
+``numeric_shadow_fields``, see ``shadow_numeric_columns`` in models.py) has
+three indexed shadow columns filled by ``parse_figure``:
+
+* ``x_value``: the number, scaled ("$1.2B" -> 1200000000); the midpoint for
+  ranges ("100-500" -> 300); NULL when the text has no number
+* ``x_unit``: "%" for percentages, otherwise the first word after the number
+  ("$10M ARR" -> "arr"), or ""
+* ``x_currency``: ISO code from a symbol or code ("€", "Rp", "SGD"), or ""
+
+The columns are filled on every save (pre_save receiver, api/signals.py) so
+that sorting and range filters run in SQL (``/api/competitors/``,
+``/api/sales-channels/``). Rows written with ``bulk_create``, ``update()`` or
+``save(update_fields=...)``, and rows from before the columns existed, are
+filled with ``manage.py backfill_numeric``.
+"""
+import re
+from decimal import Decimal, InvalidOperation
+from typing import NamedTuple, Optional
+
+from django.apps import apps
+
+from .cache import bump_model_tags
+
+# Longest symbols first: "US$" before "$"
+CURRENCY_SYMBOLS = (
+    ('US$', 'USD'), ('S$', 'SGD'), ('A$', 'AUD'), ('C$', 'CAD'), ('HK$', 'HKD'), ('RM', 'MYR'), ('Rp', 'IDR'),
+    ('$', 'USD'), ('€', 'EUR'), ('£', 'GBP'), ('¥', 'JPY'), ('₹', 'INR'),
+)
+CURRENCY_CODES = frozenset('usd eur gbp jpy cny inr idr sgd myr aud cad hkd chf krw'.split())
+
+SCALES = {
+    'k': 3, 'thousand': 3, 'rb': 3, 'ribu': 3,
+    'm': 6, 'mm': 6, 'mn': 6, 'mio': 6, 'million': 6, 'jt': 6, 'juta': 6,
+    'b': 9, 'bn': 9, 'billion': 9, 'miliar': 9, 'milyar': 9,
+    't': 12, 'tn': 12, 'trillion': 12, 'triliun': 12,
+}
+
+_NUMBER = r'(\d[\d.,]*)\s*([a-z]+)?'
+_FIGURE = re.compile(_NUMBER + r'(?:\s*(?:-|–|to|sampai)\s*\D{0,4}?' + _NUMBER + r')?', re.IGNORECASE)
+_WORD = re.compile(r'[a-z]+')
+
+VALUE_DIGITS = 24
+VALUE_PLACES = 4
+_MAX_VALUE = Decimal(10) ** (VALUE_DIGITS - VALUE_PLACES)
+_QUANTUM = Decimal(1).scaleb(-VALUE_PLACES)
+UNIT_LENGTH = 20
+
+
+class Figure(NamedTuple):
+    value: Optional[Decimal]
+    unit: str
+    currency: str
+
+
+EMPTY = Figure(None, '', '')
+
+
+def _number(text):
+    """'1,200' -> 1200, '1.5' -> 1.5, '1.200.000' -> 1200000, '1,5' -> 1.5"""
+    text = text.rstrip('.,')
+    if ',' in text and '.' in text:
+        # The last separator is the decimal point
+        decimal_mark = ',' if text.rfind(',') > text.rfind('.') else '.'
+        thousands = '.' if decimal_mark == ',' else ','
+        text = text.replace(thousands, '').replace(decimal_mark, '.')
+    elif ',' in text:
+        groups = text.split(',')
+        text = ''.join(groups) if all(len(group) == 3 for group in groups[1:]) else text.replace(',', '.', 1).replace(',', '')
+    elif text.count('.') > 1:
+        text = text.replace('.', '')
+    try:
+        return Decimal(text)
+    except InvalidOperation:
+        return None
+
+
+def _scaled(number, scale):
+    if number is None:
+        return None
+    return number.scaleb(SCALES.get((scale or '').lower(), 0))
+
+
+def _currency(text):
+    for symbol, code in CURRENCY_SYMBOLS:
+        if symbol in text:
+            return code, text.replace(symbol, ' ')
+    for word in _WORD.findall(text.lower()):
+        if word in CURRENCY_CODES:
+            return word.upper(), re.sub(rf'\b{word}\b', ' ', text, flags=re.IGNORECASE)
+    return '', text
+
+
+def parse_figure(text):
+    """Figure(value, unit, currency) of a display string such as '$10M ARR'"""
+    if not text or not text.strip():
+        return EMPTY
+    currency, rest = _currency(text.strip())
+    match = _FIGURE.search(rest)
+    if match is None:
+        return Figure(None, '', currency)
+
+    first, first_scale, second, second_scale = match.groups()
+    # A scale word that is not a scale is the unit ("120 installs")
+    trailing = ''
+    if first_scale and first_scale.lower() not in SCALES:
+        trailing, first_scale = first_scale, None
+    if second_scale and second_scale.lower() not in SCALES:
+        trailing, second_scale = second_scale, None
+    low = _scaled(_number(first), first_scale or second_scale)
+    value = low
+    if second is not None:
+        high = _scaled(_number(second), second_scale)
+        if low is not None and high is not None:
+            value = (low + high) / 2
+
+    if '%' in rest[match.end():match.end() + 2] or '%' in rest[match.start():match.end()]:
+        unit = '%'
+    else:
+        words = _WORD.findall((trailing + ' ' + rest[match.end():]).lower())
+        unit = next((word for word in words if word not in SCALES), '')
+    if value is not None:
+        value = value.quantize(_QUANTUM) if abs(value) < _MAX_VALUE else None
+    return Figure(value, unit[:UNIT_LENGTH], currency)
+
+
+def shadow_columns(field_name):
+    return f'{field_name}_value', f'{field_name}_unit', f'{field_name}_currency'
+
+
+def shadowed_models():
+    """Models with numeric shadow columns"""
+    return [model for model in apps.get_app_config('api').get_models() if getattr(model, 'numeric_shadow_fields', ())]
+
+
+def fill_shadow_columns(instance):
+    """Set the shadow columns of ``instance`` from its display strings"""
+    for field_name in instance.numeric_shadow_fields:
+        figure = parse_figure(getattr(instance, field_name))
+        for column, value in zip(shadow_columns(field_name), figure):
+            setattr(instance, column, value)
+    return instance
+
+
+def fill_on_save(sender, instance, **kwargs):
+    """pre_save receiver"""
+    fill_shadow_columns(instance)
+
+
+def backfill(model, batch_size=1000):
+    """Reparse every row of ``model``; writes only the rows whose columns changed"""
+    fields = list(model.numeric_shadow_fields)
+    columns = [column for field_name in fields for column in shadow_columns(field_name)]
+    updated = 0
+    last_pk = None
+    while True:
+        queryset = model.objects.order_by('pk')
+        if last_pk is not None:
+            queryset = queryset.filter(pk__gt=last_pk)
+        rows = list(queryset.values_list('pk', *fields, *columns)[:batch_size])
+        if not rows:
+            break
+        last_pk = rows[-1][0]
+        changed = []
+        for row in rows:
+            values = [value for text in row[1:len(fields) + 1] for value in parse_figure(text)]
+            if values != list(row[len(fields) + 1:]):
+                instance = model(pk=row[0])
+                for column, value in zip(columns, values):
+                    setattr(instance, column, value)
+                changed.append(instance)
+        model.objects.bulk_update(changed, columns)
+        updated += len(changed)
+    if updated:
+        # bulk writes send no signals
+        bump_model_tags(model)
+    return updated
@@ -0,0 +1,121 @@
+"""
+``select_related`` / ``prefetch_related`` inferred from a serializer's fields.
+
+``optimize_queryset(queryset, serializer_class)`` walks the fields the
+serializer reads and adds the joins and prefetches they need:
+
+* a dotted ``source`` (``company.name``, ``analyst.username``) follows
+  forward foreign keys and one-to-ones with ``select_related``; a
+  many-valued step on the way becomes a ``prefetch_related``;
+* a nested serializer without ``many`` is a ``select_related`` of its
+  source, and its own fields are followed below it;
+* a nested ``many=True`` serializer, or a ``many=True`` related field, is a
+  ``Prefetch`` whose queryset is optimized the same way for the child.
+
+``SerializerMethodField`` and model properties cannot be inferred; a view
+adds what they read in ``get_queryset`` as before. ``OptimizedQuerySetMixin``
+applies the optimization to a viewset's queryset with the serializer of the
+current action, so a serializer field added later never adds an N+1.
+"""
+import functools
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Prefetch
+from rest_framework import serializers
+
+# Prefetch of a many=True primary key field: only the keys are read
+PK_ONLY = 'pk'
+
+
+def _relation(model, name):
+    try:
+        field = model._meta.get_field(name)
+    except FieldDoesNotExist:
+        return None
+    # "company_id" is the column, not the relation
+    return field if field.is_relation and field.name == name else None
+
+
+def _follow(model, attrs):
+    """(select path, prefetch path or None, model reached) of a chain of attribute names"""
+    path = []
+    for name in attrs:
+        field = _relation(model, name)
+        if field is None:
+            break
+        path.append(name)
+        if field.many_to_many or field.one_to_many:
+            return path[:-1], path, field.related_model
+        model = field.related_model
+    return path, None, model
+
+
+@functools.lru_cache(maxsize=None)
+def query_plan(model, serializer_class):
+    """(select_related paths, [(prefetch path, related model, child)]); child is a serializer class, PK_ONLY or None"""
+    selects, prefetches = set(), []
+    for field in serializer_class().fields.values():
+        if field.write_only or field.source == '*':
+            continue
+        attrs = field.source_attrs
+        select, prefetch, related = _follow(model, attrs)
+
+        if isinstance(field, serializers.ListSerializer) and isinstance(field.child, serializers.ModelSerializer):
+            if prefetch is None and select:
+                # Only a many-valued relation can be serialized with many=True
+                continue
+            if prefetch:
+                prefetches.append(('__'.join(prefetch), related, type(field.child)))
+            continue
+        if isinstance(field, serializers.ManyRelatedField):
+            if prefetch:
+                pk_only = getattr(field.child_relation, 'use_pk_only_optimization', lambda: False)()
+                prefetches.append(('__'.join(prefetch), related, PK_ONLY if pk_only else None))
+            continue
+        if prefetch:
+            prefetches.append(('__'.join(prefetch), related, None))
+            continue
+        if isinstance(field, serializers.RelatedField) and len(select) == len(attrs):
+            # Primary key fields read the <fk>_id column, anything else the related row
+            if getattr(field, 'use_pk_only_optimization', lambda: False)():
+                select = select[:-1]
+        if isinstance(field, serializers.ModelSerializer) and select and len(select) == len(attrs):
+            nested_selects, nested_prefetches = query_plan(related, type(field))
+            prefix = '__'.join(select)
+            selects.update(f'{prefix}__{path}' for path in nested_selects)
+            prefetches.extend((f'{prefix}__{path}', model_, child) for path, model_, child in nested_prefetches)
+        if select:
+            selects.add('__'.join(select))
+    # Shorter paths are implied by longer ones
+    selects = {path for path in selects if not any(other.startswith(f'{path}__') for other in selects)}
+    return tuple(sorted(selects)), tuple(prefetches)
+
+
+def optimize_queryset(queryset, serializer_class):
+    """``queryset`` with the joins and prefetches ``serializer_class`` needs"""
+    selects, prefetches = query_plan(queryset.model, serializer_class)
+    if selects:
+        queryset = queryset.select_related(*selects)
+    lookups = []
+    for path, related, child in prefetches:
+        if child is None:
+            lookups.append(path)
+        elif child == PK_ONLY:
+            lookups.append(Prefetch(path, queryset=related._default_manager.only('pk')))
+        else:
+            lookups.append(Prefetch(path, queryset=optimize_queryset(related._default_manager.all(), child)))
+    if lookups:
+        queryset = queryset.prefetch_related(*lookups)
+    return queryset
+
+
+class OptimizedQuerySetMixin:
+    """Optimizes get_queryset() for the serializer of the current action"""
+    # Actions that respond with get_serializer_class(); the others only look rows up
+    optimized_actions = ('list', 'retrieve', 'update', 'partial_update')
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action not in self.optimized_actions:
+            return queryset
+        return optimize_queryset(queryset, self.get_serializer_class())
@@ -0,0 +1,242 @@
+"""
+Portfolio analytics over every Investment row (``/api/portfolio/analytics/``).
+
+All rows are loaded with one ``values_list`` query into NumPy arrays and
+every figure is computed with vectorized group-bys (``np.unique`` codes and
+``np.bincount``) instead of per-row Python, so the whole portfolio costs about
+as much as one page of ``/api/investments/``. Amounts are never added across
+currencies: every money figure is a ``{currency: amount}`` mapping.
+
+* exposure: committed capital (``EXPOSURE_STATUSES``) by industry, stage and
+  currency
+* deployed: capital deployed per month (``DEPLOYED_STATUSES``) and cumulative
+* ownership: capital invested and implied stake per company from
+  ``equity_percentage`` of the positions still held, and the post-money
+  valuation (in its currency) the latest priced round implies
+* step_ups: valuation step-up between consecutive rounds of each company and
+  currency, over the rounds that were deployed or are held (not ``proposed``)
+* status_mix: count and amount per status
+
+The view caches the result by the Investment and Company tag versions
+(api/cache.py), so it is recomputed only after one of them changes.
+"""
+import numpy as np
+
+from .models import Investment
+
+EXPOSURE_STATUSES = ('approved', 'completed')
+DEPLOYED_STATUSES = ('completed', 'exited')
+HELD_STATUSES = ('approved', 'completed')
+STEP_UP_STATUSES = tuple(dict.fromkeys(DEPLOYED_STATUSES + HELD_STATUSES))
+
+FIELDS = (
+    'company_id', 'company__name', 'company__industry', 'company__stage',
+    'currency', 'status', 'amount', 'equity_percentage', 'valuation', 'investment_date',
+)
+
+
+def _money(values, currencies):
+    """{currency: amount} for a row of per-currency sums"""
+    return {currency: round(float(value), 2) for currency, value in zip(currencies, values) if value}
+
+
+def _float_column(values):
+    # NULL -> NaN, Decimal -> float
+    return np.array([np.nan if value is None else float(value) for value in values], dtype=np.float64)
+
+
+class _Columns:
+    """The investment rows as NumPy arrays; text columns as (labels, codes)"""
+
+    def __init__(self, rows):
+        (company_ids, names, industries, stages, currencies, statuses,
+         amounts, equity, valuations, dates) = zip(*rows)
+        self.size = len(rows)
+        self.company_labels, self.company = np.unique(np.array([str(pk) for pk in company_ids]), return_inverse=True)
+        company_names = dict(zip((str(pk) for pk in company_ids), names))
+        self.company_names = [company_names[pk] for pk in self.company_labels]
+        self.industry_labels, self.industry = np.unique(np.array(industries), return_inverse=True)
+        self.stage_labels, self.stage = np.unique(np.array(stages), return_inverse=True)
+        self.currency_labels, self.currency = np.unique(np.array(currencies), return_inverse=True)
+        self.status_labels, self.status = np.unique(np.array(statuses), return_inverse=True)
+        self.currencies = [str(label) for label in self.currency_labels]
+        self.amount = _float_column(amounts)
+        self.equity = _float_column(equity)
+        self.valuation = _float_column(valuations)
+        self.date = np.array(dates, dtype='datetime64[D]')
+
+    def status_mask(self, statuses):
+        return np.isin(self.status_labels[self.status], statuses)
+
+    def sum_by(self, codes, groups, mask, weights=None):
+        """[groups, currencies] sums of ``weights`` (row count if None) over masked rows"""
+        currencies = len(self.currency_labels)
+        index = codes[mask] * currencies + self.currency[mask]
+        data = None if weights is None else weights[mask]
+        return np.bincount(index, weights=data, minlength=groups * currencies).reshape(groups, currencies)
+
+
+def _exposure(cols):
+    mask = cols.status_mask(EXPOSURE_STATUSES)
+    currencies = cols.currencies
+    totals = np.bincount(cols.currency[mask], weights=cols.amount[mask], minlength=len(currencies))
+
+    def breakdown(codes, labels):
+        amounts = cols.sum_by(codes, len(labels), mask, cols.amount)
+        counts = cols.sum_by(codes, len(labels), mask).sum(axis=1)
+        order = np.argsort(-amounts.sum(axis=1), kind='stable')
+        return [
+            {
+                'name': str(labels[group]),
+                'count': int(counts[group]),
+                'amount': _money(amounts[group], currencies),
+                'share': {
+                    currency: round(float(amount / total), 4)
+                    for currency, amount, total in zip(currencies, amounts[group], totals) if amount and total
+                },
+            }
+            for group in order if counts[group]
+        ]
+
+    return {
+        'statuses': list(EXPOSURE_STATUSES),
+        'total': _money(totals, currencies),
+        'by_industry': breakdown(cols.industry, cols.industry_labels),
+        'by_stage': breakdown(cols.stage, cols.stage_labels),
+        'by_currency': breakdown(cols.currency, cols.currency_labels),
+    }
+
+
+def _deployed(cols):
+    mask = cols.status_mask(DEPLOYED_STATUSES)
+    if not mask.any():
+        return {'statuses': list(DEPLOYED_STATUSES), 'months': []}
+    currencies = cols.currencies
+    month_labels, month = np.unique(cols.date[mask].astype('datetime64[M]'), return_inverse=True)
+    codes = np.zeros(cols.size, dtype=np.int64)
+    codes[mask] = month
+    amounts = cols.sum_by(codes, len(month_labels), mask, cols.amount)
+    cumulative = np.cumsum(amounts, axis=0)
+    return {
+        'statuses': list(DEPLOYED_STATUSES),
+        'months': [
+            {
+                'month': str(label),
+                'amount': _money(amounts[index], currencies),
+                'cumulative': _money(cumulative[index], currencies),
+            }
+            for index, label in enumerate(month_labels)
+        ],
+    }
+
+
+def _ownership(cols):
+    held = cols.status_mask(HELD_STATUSES)
+    # Held rounds without equity_percentage count as invested, not towards the stake
+    with_equity = held & ~np.isnan(cols.equity)
+    companies = len(cols.company_labels)
+    stake = np.bincount(cols.company[with_equity], weights=cols.equity[with_equity], minlength=companies)
+    invested = cols.sum_by(cols.company, companies, held, cols.amount)
+    rounds = np.bincount(cols.company[held], minlength=companies)
+
+    # Latest priced held round per company: sort by (company, date), take each group's last row
+    priced = np.flatnonzero(with_equity & (cols.equity > 0))
+    priced = priced[np.lexsort((cols.date[priced], cols.company[priced]))]
+    is_last = np.append(cols.company[priced][1:] != cols.company[priced][:-1], True)
+    latest = priced[is_last]
+    implied = np.zeros((companies, len(cols.currency_labels)))
+    implied[cols.company[latest], cols.currency[latest]] = cols.amount[latest] / (cols.equity[latest] / 100)
+
+    order = np.argsort(-stake, kind='stable')
+    return [
+        {
+            'company_id': str(cols.company_labels[index]),
+            'company_name': cols.company_names[index],
+            'ownership_percentage': round(float(min(stake[index], 100.0)), 2),
+            'invested': _money(invested[index], cols.currencies),
+            'rounds': int(rounds[index]),
+            'implied_valuation': _money(implied[index], cols.currencies) or None,
+        }
+        for index in order if rounds[index]
+    ]
+
+
+def _step_ups(cols):
+    mask = cols.status_mask(STEP_UP_STATUSES) & ~np.isnan(cols.valuation) & (cols.valuation > 0)
+    # Valuations are only comparable within one currency: group by (company, currency)
+    currencies = len(cols.currency_labels)
+    groups = cols.company * currencies + cols.currency
+    rows = np.flatnonzero(mask)
+    rows = rows[np.lexsort((cols.date[rows], groups[rows]))]
+    if rows.size < 2:
+        return []
+    group = groups[rows]
+    valuation = cols.valuation[rows]
+    # A step-up is a round following an earlier round of the same group
+    same = group[1:] == group[:-1]
+    ratios = valuation[1:] / valuation[:-1]
+
+    starts = np.flatnonzero(np.append(True, ~same))
+    ends = np.append(starts[1:], rows.size) - 1
+    counts = ends - starts + 1
+    multi = counts > 1
+    step_rows = np.flatnonzero(same)
+    step_sum = np.bincount(
+        group[1:][step_rows], weights=np.log(ratios[step_rows]), minlength=len(cols.company_labels) * currencies
+    )
+
+    result = []
+    for start, end, count in zip(starts[multi], ends[multi], counts[multi]):
+        index, currency = divmod(group[start], currencies)
+        result.append({
+            'company_id': str(cols.company_labels[index]),
+            'company_name': cols.company_names[index],
+            'currency': cols.currencies[currency],
+            'rounds': int(count),
+            'first_valuation': round(float(valuation[start]), 2),
+            'latest_valuation': round(float(valuation[end]), 2),
+            'latest_step_up': round(float(ratios[end - 1]), 3),
+            'total_step_up': round(float(valuation[end] / valuation[start]), 3),
+            'average_step_up': round(float(np.exp(step_sum[group[start]] / (count - 1))), 3),
+        })
+    return sorted(result, key=lambda entry: -entry['total_step_up'])
+
+
+def _status_mix(cols):
+    currencies = cols.currencies
+    everything = np.ones(cols.size, dtype=bool)
+    amounts = cols.sum_by(cols.status, len(cols.status_labels), everything, cols.amount)
+    counts = np.bincount(cols.status, minlength=len(cols.status_labels))
+    return [
+        {
+            'status': str(label),
+            'count': int(counts[index]),
+            'share': round(float(counts[index] / cols.size), 4),
+            'amount': _money(amounts[index], currencies),
+        }
+        for index, label in enumerate(cols.status_labels)
+    ]
+
+
+def portfolio_analytics(queryset=None):
+    """Every portfolio figure, from a single query"""
+    queryset = Investment.objects.all() if queryset is None else queryset
+    rows = list(queryset.order_by().values_list(*FIELDS))
+    if not rows:
+        return {
+            'investments': 0,
+            'exposure': {'statuses': list(EXPOSURE_STATUSES), 'total': {}, 'by_industry': [], 'by_stage': [], 'by_currency': []},
+            'deployed': {'statuses': list(DEPLOYED_STATUSES), 'months': []},
+            'ownership': [],
+            'step_ups': [],
+            'status_mix': [],
+        }
+    cols = _Columns(rows)
+    return {
+        'investments': cols.size,
+        'exposure': _exposure(cols),
+        'deployed': _deployed(cols),
+        'ownership': _ownership(cols),
+        'step_ups': _step_ups(cols),
+        'status_mix': _status_mix(cols),
+    }
@@ -0,0 +1,324 @@
+"""
+On-demand profiling of single requests for staff users.
+
+A staff user (session or token) adds ``?_profile=sample`` or an
+``X-Profile: sample`` header to any request to run it under a profiler:
+
+* ``sample`` (also ``1``/``true``): a background thread samples the request
+  thread's stack every ``PROFILER_SAMPLE_INTERVAL`` seconds and records them
+  as folded stacks, the input of flamegraph.pl, speedscope and similar tools.
+  Overhead is low, so it is safe on production-sized data.
+* ``cprofile``: deterministic cProfile; the download is a pstats dump for
+  ``python -m pstats`` or snakeviz. Exact call counts, larger overhead.
+* ``alloc``: tracemalloc. The JSON report has the request's peak and
+  retained memory, the same per serializer ``.data`` call (e.g. the
+  ``PerceptionAnalysisSerializer(many=True)`` section of full_analysis or a
+  list endpoint's page) and the top allocation sites, by line and by the
+  innermost project frame. tracemalloc is process-wide, so figures are only
+  exact in single-threaded workers. ``bench_endpoints --memory`` uses it too.
+
+The response is returned as usual with ``X-Profile-Id`` and
+``X-Profile-Url`` headers; the profile is stored as a ``RequestProfile`` and
+downloaded from that URL or from the admin. Only the last ``PROFILER_KEEP``
+profiles are kept. Work done while a streaming response is consumed, and
+the worker threads of the async views, are not included.
+"""
+import cProfile
+import json
+import marshal
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+
+from django.conf import settings
+from django.urls import reverse
+from rest_framework import exceptions, serializers
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+
+from core.metrics import view_name
+
+from .models import RequestProfile
+
+PROFILE_PARAM = '_profile'
+PROFILE_HEADER = 'HTTP_X_PROFILE'
+
+_PROJECT_ROOT = str(Path(settings.BASE_DIR))
+_THIS_FILE = str(Path(__file__).resolve())
+# Middleware and instrumentation wrap every request; they are never the culprit
+_CORE_DIR = str(Path(settings.BASE_DIR) / 'core')
+
+_allocation_profiler = ContextVar('allocation_profiler', default=None)
+
+
+def _short_path(filename):
+    if 'site-packages' in filename:
+        return filename.split('site-packages', 1)[1].lstrip('/\\')
+    if filename.startswith(_PROJECT_ROOT):
+        return filename[len(_PROJECT_ROOT):].lstrip('/\\')
+    return filename
+
+
+def _frame_label(code):
+    return f'{code.co_name} ({_short_path(code.co_filename)}:{code.co_firstlineno})'
+
+
+class StackSampler:
+    """Samples one thread's stack from a background thread into folded stacks"""
+
+    mode = 'sample'
+
+    def __init__(self, interval=None):
+        self.interval = interval or getattr(settings, 'PROFILER_SAMPLE_INTERVAL', 0.005)
+        self.stacks = Counter()
+        self._target = None
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='request-profiler', daemon=True)
+
+    def __enter__(self):
+        self._target = threading.get_ident()
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self._target)
+            stack = []
+            while frame is not None:
+                stack.append(_frame_label(frame.f_code))
+                frame = frame.f_back
+            if stack:
+                self.stacks[';'.join(reversed(stack))] += 1
+
+    def dump(self):
+        return ''.join(f'{stack} {count}\n' for stack, count in self.stacks.most_common()).encode()
+
+
+class DeterministicProfiler:
+    """cProfile of the request thread, dumped in the pstats file format"""
+
+    mode = 'cprofile'
+
+    def __init__(self):
+        self.profile = cProfile.Profile()
+
+    def __enter__(self):
+        self.profile.enable()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.profile.disable()
+
+    def dump(self):
+        # What Profile.dump_stats writes, without the temporary file
+        self.profile.create_stats()
+        return marshal.dumps(self.profile.stats)
+
+
+def _kb(size):
+    return round(size / 1024, 1)
+
+
+def _serializer_label(serializer):
+    if isinstance(serializer, serializers.ListSerializer):
+        return f'{type(serializer.child).__name__}(many=True)'
+    return type(serializer).__name__
+
+
+def _project_site(traceback):
+    # Frames are ordered oldest first; the innermost project frame is the culprit
+    for frame in reversed(traceback):
+        filename = frame.filename
+        if (filename.startswith(_PROJECT_ROOT) and filename != _THIS_FILE
+                and not filename.startswith(_CORE_DIR) and 'site-packages' not in filename):
+            return f'{_short_path(filename)}:{frame.lineno}'
+    return 'outside the project'
+
+
+class AllocationProfiler:
+    """tracemalloc peak/retained memory of a block, per serializer and by site"""
+
+    mode = 'alloc'
+
+    def __init__(self, frames=None, top=15):
+        self.frames = frames or getattr(settings, 'PROFILER_TRACEMALLOC_FRAMES', 32)
+        self.top = top
+        self.depth = 0
+        self.base = 0
+        self.peak = 0
+        self.serializers = {}   # label -> [calls, peak bytes, retained bytes]
+        self.report = None
+
+    def __enter__(self):
+        self._started = not tracemalloc.is_tracing()
+        if self._started:
+            tracemalloc.start(self.frames)
+        self.base = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        self._token = _allocation_profiler.set(self)
+        return self
+
+    def __exit__(self, *exc_info):
+        _allocation_profiler.reset(self._token)
+        current, peak = tracemalloc.get_traced_memory()
+        self.peak = max(self.peak, peak)
+        snapshot = tracemalloc.take_snapshot().filter_traces([
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, _THIS_FILE),
+        ])
+        if self._started:
+            tracemalloc.stop()
+        self.report = self._build_report(current, snapshot)
+
+    @contextmanager
+    def measure(self, label):
+        """Attribute the allocations of the block to ``label``"""
+        before, peak = tracemalloc.get_traced_memory()
+        # reset_peak() is global: keep the request peak seen so far
+        self.peak = max(self.peak, peak)
+        tracemalloc.reset_peak()
+        try:
+            yield
+        finally:
+            after, block_peak = tracemalloc.get_traced_memory()
+            self.peak = max(self.peak, block_peak)
+            entry = self.serializers.setdefault(label, [0, 0, 0])
+            entry[0] += 1
+            entry[1] = max(entry[1], block_peak - before)
+            entry[2] += after - before
+
+    def _build_report(self, current, snapshot):
+        sites = Counter()
+        for trace in snapshot.traces:
+            sites[_project_site(trace.traceback)] += trace.size
+        return {
+            'peak_kb': _kb(self.peak - self.base),
+            'retained_kb': _kb(current - self.base),
+            'serializers': [
+                {'serializer': label, 'calls': calls, 'peak_kb': _kb(peak), 'retained_kb': _kb(retained)}
+                for label, (calls, peak, retained) in sorted(self.serializers.items(), key=lambda i: -i[1][1])
+            ],
+            'top_lines': [
+                {'site': f'{_short_path(stat.traceback[-1].filename)}:{stat.traceback[-1].lineno}',
+                 'kb': _kb(stat.size), 'blocks': stat.count}
+                for stat in snapshot.statistics('lineno')[:self.top]
+            ],
+            'top_project_sites': [
+                {'site': site, 'kb': _kb(size)} for site, size in sites.most_common(self.top)
+            ],
+        }
+
+    def dump(self):
+        return json.dumps(self.report, indent=2).encode()
+
+
+def _tracked_data(prop):
+    def data(self):
+        profiler = _allocation_profiler.get()
+        if profiler is None or profiler.depth:
+            return prop.fget(self)
+        profiler.depth += 1
+        try:
+            with profiler.measure(_serializer_label(self)):
+                return prop.fget(self)
+        finally:
+            profiler.depth -= 1
+    return property(data)
+
+
+def track_serializer_allocations():
+    """Wrap serializer ``.data`` so AllocationProfiler can attribute memory to it"""
+    for cls in (serializers.Serializer, serializers.ListSerializer):
+        # Marked on the class: other wrappers (core/metrics.py) may sit on top of ours
+        if not cls.__dict__.get('_allocation_tracked', False):
+            cls.data = _tracked_data(cls.__dict__['data'])
+            cls._allocation_tracked = True
+
+
+PROFILERS = {'sample': StackSampler, 'cprofile': DeterministicProfiler, 'alloc': AllocationProfiler}
+
+
+def requested_mode(request):
+    """Profiler mode asked for by the request, or None"""
+    value = request.GET.get(PROFILE_PARAM) or request.META.get(PROFILE_HEADER)
+    if not value:
+        return None
+    value = value.lower()
+    if value in ('1', 'true', 'yes'):
+        return 'sample'
+    return value if value in PROFILERS else None
+
+
+def _staff_user(request):
+    user = getattr(request, 'user', None)
+    if user is None or not user.is_authenticated:
+        # Token clients: authenticate the way the API view will
+        drf_request = Request(
+            request, authenticators=[auth() for auth in api_settings.DEFAULT_AUTHENTICATION_CLASSES]
+        )
+        try:
+            user = drf_request.user
+        except exceptions.APIException:
+            return None
+    return user if user.is_authenticated and user.is_staff else None
+
+
+def store_profile(request, response, user, mode, data, duration):
+    """Save a profile and drop the ones beyond PROFILER_KEEP"""
+    profile = RequestProfile.objects.create(
+        user=user,
+        method=request.method,
+        path=request.get_full_path()[:500],
+        view=getattr(request, '_profile_view', '')[:200],
+        status_code=response.status_code,
+        duration_ms=duration * 1000,
+        mode=mode,
+        data=data,
+    )
+    keep = getattr(settings, 'PROFILER_KEEP', 50)
+    stale = list(RequestProfile.objects.order_by('-created_at', '-id').values_list('id', flat=True)[keep:])
+    if stale:
+        RequestProfile.objects.filter(id__in=stale).delete()
+    return profile
+
+
+class RequestProfilerMiddleware:
+    """Profile requests that ask for it when they come from a staff user"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        track_serializer_allocations()
+
+    def __call__(self, request):
+        mode = requested_mode(request)
+        if mode is None or not getattr(settings, 'PROFILER_ENABLED', True):
+            return self.get_response(request)
+        user = _staff_user(request)
+        if user is None:
+            return self.get_response(request)
+
+        started = time.perf_counter()
+        with PROFILERS[mode]() as profiler:
+            response = self.get_response(request)
+        duration = time.perf_counter() - started
+
+        profile = store_profile(request, response, user, mode, profiler.dump(), duration)
+        response['X-Profile-Id'] = str(profile.pk)
+        response['X-Profile-Url'] = reverse('requestprofile-download', args=[profile.pk])
+        if mode == 'alloc':
+            response['X-Profile-Peak-KB'] = str(profiler.report['peak_kb'])
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if requested_mode(request):
+            request._profile_view = view_name(view_func, request)
+        return None
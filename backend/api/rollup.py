@@ -0,0 +1,93 @@
+"""
+``Company.ai_score`` / ``ai_confidence`` rolled up from the company's analyses.
+
+For each analysis type the latest *completed* analysis with an
+``overall_score`` counts (superseded and in-progress ones do not). With the
+per-type weights of ``COMPANY_SCORE_WEIGHTS``:
+
+* ``ai_score`` is the weighted mean of their ``overall_score``, over the
+  types the company has (NULL when it has none);
+* ``ai_confidence`` is the weighted mean of their ``confidence_score`` over
+  *all* types, a missing type counting as 0, so a company scored from one
+  analysis is less certain than one scored from five.
+
+Saving or deleting an analysis recomputes its company (signal receivers
+below), so the ``ai_score`` ordering and ``min_score``/``max_score`` filters
+of ``/api/companies/`` match the analyses. Bulk writes send no signals; run
+``manage.py rollup_company_scores`` after them, or after changing the weights.
+"""
+from django.conf import settings
+
+from .cache import bump_model_tags
+from .models import Company
+from .sections import ANALYSIS_SECTIONS
+
+# Response key of ANALYSIS_SECTIONS -> weight
+DEFAULT_WEIGHTS = {
+    'high_level_analyses': 0.30,
+    'perception_analyses': 0.15,
+    'market_analyses': 0.20,
+    'key_individuals_analyses': 0.15,
+    'competitive_analyses': 0.20,
+}
+DEFAULT_BATCH_SIZE = 1000
+
+
+def weights():
+    configured = getattr(settings, 'COMPANY_SCORE_WEIGHTS', None) or DEFAULT_WEIGHTS
+    return {key: float(configured.get(key, 0)) for key, *_ in ANALYSIS_SECTIONS}
+
+
+def _latest_scores(company_ids=None):
+    """{company_id: {section key: (overall_score, confidence_score)}} of the latest completed analyses"""
+    latest = {}
+    for key, model, *_ in ANALYSIS_SECTIONS:
+        rows = model.objects.filter(is_completed=True, overall_score__isnull=False)
+        if company_ids is not None:
+            rows = rows.filter(company_id__in=company_ids)
+        rows = rows.order_by('company_id', '-created_at', '-updated_at').values_list(
+            'company_id', 'overall_score', 'confidence_score'
+        )
+        for company_id, score, confidence in rows:
+            latest.setdefault(company_id, {}).setdefault(key, (score, confidence))
+    return latest
+
+
+def rollup(scores, type_weights):
+    """(ai_score, ai_confidence) of one company's {section key: (overall, confidence)}"""
+    present = {key: weight for key, weight in type_weights.items() if key in scores and weight > 0}
+    if not present:
+        return None, None
+    total = sum(present.values())
+    ai_score = round(sum(weight * scores[key][0] for key, weight in present.items()) / total)
+    confidence = sum(weight * (scores[key][1] or 0) for key, weight in present.items())
+    ai_confidence = round(confidence / sum(type_weights.values()), 4)
+    return ai_score, ai_confidence
+
+
+def refresh_company_scores(company_ids=None, batch_size=DEFAULT_BATCH_SIZE):
+    """Recompute the scores (of all companies if ``company_ids`` is None); returns the number changed"""
+    type_weights = weights()
+    if company_ids is None:
+        company_ids = list(Company.objects.order_by('id').values_list('id', flat=True))
+    changed = []
+    for start in range(0, len(company_ids), batch_size):
+        batch = company_ids[start:start + batch_size]
+        latest = _latest_scores(batch)
+        for company_id, ai_score, ai_confidence in Company.objects.filter(id__in=batch).values_list(
+            'id', 'ai_score', 'ai_confidence'
+        ):
+            new = rollup(latest.get(company_id, {}), type_weights)
+            if new != (ai_score, ai_confidence):
+                changed.append(Company(pk=company_id, ai_score=new[0], ai_confidence=new[1]))
+    # Not save(): updated_at stays the time the company itself was edited
+    Company.objects.bulk_update(changed, ['ai_score', 'ai_confidence'], batch_size=batch_size)
+    if changed:
+        # bulk writes send no signals
+        bump_model_tags(Company)
+    return len(changed)
+
+
+def analysis_changed(sender, instance, **kwargs):
+    """post_save/post_delete receiver of every analysis model"""
+    refresh_company_scores([instance.company_id])
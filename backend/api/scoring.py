@@ -0,0 +1,277 @@
+"""
+Batch lead scoring: recomputes ``Lead.ai_match_score`` for every lead.
+
+Each lead gets a feature vector (all in 0..1) from its company (stage,
+funding, headcount, tags), its analyses, and how well the company matches the
+assignee's ``UserProfile.preferred_industries``. The analyses count once: as
+``Company.ai_score`` and ``ai_confidence``, their weighted rollup
+(api/rollup.py), or the mean of the latest overall scores when the company has
+no rollup yet. The score is the weighted
+sum of the features (``WEIGHTS``) stretched to 0..100 (``CALIBRATION``),
+computed with NumPy for a whole chunk of leads at once.
+
+Recomputes are incremental: a hash of the rounded feature vector (plus
+``SCORING_VERSION``) is stored in ``Lead.score_inputs_hash`` and only leads
+whose hash changed are written. Leads are split into chunks of ids that are
+loaded, scored and written independently, so chunks run in a process pool
+(``workers``); in-memory databases, which a forked process cannot see, are
+scored in this process. Run with ``manage.py score_leads`` or the
+``score_leads`` background job.
+
+Changes to scoring inputs (a company, its tags or analyses, an assignee's
+``preferred_industries``) queue a ``score_leads`` job for the affected leads
+when their transaction commits (``schedule_rescore``, receivers below). Bulk
+writes send no signals; run ``score_leads`` after them.
+"""
+import hashlib
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from django.db import connection, connections, transaction
+from django.db.models import Q
+
+from .cache import bump_model_tags
+from .models import Company, CompanyTag, Lead, UserProfile
+from .sections import ANALYSIS_SECTIONS
+
+# Bump when features or weights change, so every lead is rescored once
+SCORING_VERSION = 2
+
+FEATURES = ('analysis', 'confidence', 'coverage', 'stage', 'traction', 'team', 'tags', 'preference')
+WEIGHTS = np.array([0.30, 0.05, 0.05, 0.15, 0.15, 0.05, 0.05, 0.20])
+
+STAGE_FIT = {'pre-seed': 0.4, 'seed': 0.6, 'series-a': 0.8, 'series-b': 0.9, 'series-c': 0.7}
+NEUTRAL = 0.5
+# Weighted sums of real inputs rarely leave this band; it is stretched to 0..100
+CALIBRATION = (0.35, 0.80)
+# Features are rounded before hashing so float noise never triggers a rescore
+HASH_DECIMALS = 4
+
+DEFAULT_CHUNK_SIZE = 2000
+
+
+def _latest_analysis_scores(company_ids):
+    """{company_id: [latest overall_score of each analysis type it has]}"""
+    scores = {}
+    for _, model, *_ in ANALYSIS_SECTIONS:
+        latest = {}
+        rows = (
+            model.objects.filter(company_id__in=company_ids, overall_score__isnull=False)
+            .order_by('company_id', '-created_at')
+            .values_list('company_id', 'overall_score')
+        )
+        for company_id, score in rows:
+            latest.setdefault(company_id, score)
+        for company_id, score in latest.items():
+            scores.setdefault(company_id, []).append(score)
+    return scores
+
+
+def _preference_match(industry, tags, preferences):
+    if not preferences:
+        return NEUTRAL
+    wanted = {str(value).strip().lower() for value in preferences}
+    if industry.lower() in wanted or wanted & tags:
+        return 1.0
+    return 0.0
+
+
+def build_features(leads):
+    """(features[leads, FEATURES], lead ids) for (id, company_id, assigned_to_id) rows"""
+    company_ids = {company_id for _, company_id, _ in leads}
+    companies = {
+        row[0]: row[1:] for row in Company.objects.filter(id__in=company_ids).values_list(
+            'id', 'industry', 'stage', 'ai_score', 'ai_confidence', 'funding_raised', 'employees_min', 'employees_max'
+        )
+    }
+    tags = {}
+    for company_id, name in CompanyTag.objects.filter(company_id__in=company_ids).values_list('company_id', 'name'):
+        tags.setdefault(company_id, set()).add(name.lower())
+    analysis_scores = _latest_analysis_scores(company_ids)
+    preferences = dict(
+        UserProfile.objects.filter(user_id__in={user_id for *_, user_id in leads if user_id})
+        .values_list('user_id', 'preferred_industries')
+    )
+
+    size = len(leads)
+    raw = np.full((size, 7), np.nan)   # ai_score, confidence, analysis mean, coverage, funding, employees, tags
+    stage = np.full(size, NEUTRAL)
+    preference = np.full(size, NEUTRAL)
+    for index, (_, company_id, user_id) in enumerate(leads):
+        industry, stage_name, ai_score, confidence, funding, employees_min, employees_max = companies[company_id]
+        company_tags = tags.get(company_id, set())
+        scores = analysis_scores.get(company_id, ())
+        raw[index] = (
+            np.nan if ai_score is None else ai_score,
+            np.nan if confidence is None else confidence,
+            sum(scores) / len(scores) if scores else np.nan,
+            len(scores),
+            np.nan if funding is None else float(funding),
+            employees_max or employees_min or np.nan,
+            len(company_tags),
+        )
+        stage[index] = STAGE_FIT.get(stage_name, NEUTRAL)
+        preference[index] = _preference_match(industry, company_tags, preferences.get(user_id))
+
+    # Missing company score: fall back to the analyses' mean, then to neutral
+    analysis = np.where(np.isnan(raw[:, 0]), raw[:, 2], raw[:, 0]) / 100
+    features = np.column_stack([
+        analysis,
+        raw[:, 1],
+        raw[:, 3] / len(ANALYSIS_SECTIONS),
+        stage,
+        np.log10(raw[:, 4] + 1) / 9,          # 1e9 raised -> 1.0
+        np.log10(raw[:, 5] + 1) / 4,          # 10k employees -> 1.0
+        np.minimum(raw[:, 6] / 5, 1.0),
+        preference,
+    ])
+    features = np.clip(np.nan_to_num(features, nan=NEUTRAL), 0.0, 1.0)
+    return features, [lead_id for lead_id, _, _ in leads]
+
+
+def score(features):
+    """ai_match_score (0..100) of each feature row"""
+    low, high = CALIBRATION
+    scaled = (features @ WEIGHTS - low) / (high - low)
+    return np.clip(np.rint(scaled * 100), 0, 100).astype(np.int64)
+
+
+def input_hashes(features):
+    rounded = np.round(features, HASH_DECIMALS)
+    prefix = SCORING_VERSION.to_bytes(2, 'little') + np.array(CALIBRATION).tobytes()
+    return [hashlib.blake2b(prefix + row.tobytes(), digest_size=8).hexdigest() for row in rounded]
+
+
+def score_chunk(lead_ids, force=False):
+    """Score one chunk of leads; returns (scanned, rescored)"""
+    leads = list(
+        Lead.objects.filter(id__in=lead_ids).values_list('id', 'company_id', 'assigned_to_id', 'score_inputs_hash')
+    )
+    if not leads:
+        return 0, 0
+    features, ids = build_features([row[:3] for row in leads])
+    hashes = input_hashes(features)
+    changed = [index for index, row in enumerate(leads) if force or row[3] != hashes[index]]
+    if not changed:
+        return len(leads), 0
+
+    scores = score(features[changed])
+    updates = [
+        Lead(id=ids[index], ai_match_score=int(value), score_inputs_hash=hashes[index])
+        for index, value in zip(changed, scores)
+    ]
+    with transaction.atomic():
+        Lead.objects.bulk_update(updates, ['ai_match_score', 'score_inputs_hash'], batch_size=500)
+    return len(leads), len(updates)
+
+
+def _init_worker():
+    # Connections inherited from the parent process must not be shared
+    connections.close_all()
+
+
+def _score_chunk_in_worker(args):
+    lead_ids, force = args
+    return score_chunk(lead_ids, force)
+
+
+def _can_fork():
+    settings_dict = connection.settings_dict
+    return not (connection.vendor == 'sqlite' and connection.creation.is_in_memory_db(settings_dict['NAME']))
+
+
+def rescore_leads(lead_ids=None, workers=1, chunk_size=DEFAULT_CHUNK_SIZE, force=False, progress=None):
+    """Rescore the leads (all if ``lead_ids`` is None) whose inputs changed; returns {'scanned', 'rescored'}"""
+    queryset = Lead.objects.all() if lead_ids is None else Lead.objects.filter(id__in=lead_ids)
+    lead_ids = list(queryset.order_by('id').values_list('id', flat=True))
+    chunks = [lead_ids[start:start + chunk_size] for start in range(0, len(lead_ids), chunk_size)]
+    workers = max(1, min(workers, len(chunks)))
+    scanned = rescored = 0
+
+    if workers == 1 or not _can_fork():
+        results = (score_chunk(chunk, force) for chunk in chunks)
+        for done, (chunk_scanned, chunk_rescored) in enumerate(results, 1):
+            scanned += chunk_scanned
+            rescored += chunk_rescored
+            if progress:
+                progress(done, len(chunks))
+    else:
+        connections.close_all()
+        context = multiprocessing.get_context('fork')
+        with ProcessPoolExecutor(workers, mp_context=context, initializer=_init_worker) as pool:
+            results = pool.map(_score_chunk_in_worker, [(chunk, force) for chunk in chunks])
+            for done, (chunk_scanned, chunk_rescored) in enumerate(results, 1):
+                scanned += chunk_scanned
+                rescored += chunk_rescored
+                if progress:
+                    progress(done, len(chunks))
+
+    if rescored:
+        # bulk_update sends no signals
+        bump_model_tags(Lead)
+    return {'scanned': scanned, 'rescored': rescored}
+
+
+# Company fields build_features reads
+SCORED_COMPANY_FIELDS = frozenset({
+    'industry', 'stage', 'ai_score', 'ai_confidence', 'funding_raised', 'employees_min', 'employees_max',
+})
+
+
+class _PendingRescore:
+    """on_commit callback queueing one score_leads job for the changes of a transaction"""
+
+    def __init__(self):
+        self.company_ids = set()
+        self.user_ids = set()
+
+    def __call__(self):
+        from .jobs import enqueue  # jobs imports this module
+
+        lead_ids = Lead.objects.filter(
+            Q(company_id__in=self.company_ids) | Q(assigned_to_id__in=self.user_ids)
+        ).order_by('id').values_list('id', flat=True)
+        ids = [str(pk) for pk in lead_ids]
+        if ids:
+            enqueue('score_leads', {'ids': ids})
+
+
+def schedule_rescore(company_ids=(), user_ids=()):
+    """Rescore the leads of ``company_ids`` and those assigned to ``user_ids`` once the transaction commits"""
+    conn = transaction.get_connection()
+    pending = getattr(conn, 'scoring_rescore', None)
+    # A committed or rolled back transaction has dropped its callback
+    fresh = (
+        not conn.in_atomic_block or pending is None
+        or not any(entry[1] is pending for entry in conn.run_on_commit)
+    )
+    if fresh:
+        pending = _PendingRescore()
+    pending.company_ids.update(company_ids)
+    pending.user_ids.update(user_ids)
+    if fresh:
+        conn.scoring_rescore = pending
+        # Outside a transaction this runs at once
+        transaction.on_commit(pending)
+
+
+def _touches(update_fields, fields):
+    return update_fields is None or not fields.isdisjoint(update_fields)
+
+
+def company_changed(sender, instance, created, update_fields=None, **kwargs):
+    """post_save receiver of Company; a new company has no leads yet"""
+    if not created and _touches(update_fields, SCORED_COMPANY_FIELDS):
+        schedule_rescore(company_ids=[instance.pk])
+
+
+def company_inputs_changed(sender, instance, **kwargs):
+    """post_save/post_delete receiver of CompanyTag and every analysis model"""
+    schedule_rescore(company_ids=[instance.company_id])
+
+
+def preferences_changed(sender, instance, update_fields=None, **kwargs):
+    """post_save receiver of UserProfile"""
+    if _touches(update_fields, {'preferred_industries'}):
+        schedule_rescore(user_ids=[instance.user_id])
@@ -0,0 +1,186 @@
+"""
+Independent sections of the composite read endpoints.
+
+``full_analysis`` and the dashboard actions are each made of several queries
+that do not depend on one another. They are split into loader callables here
+so the sync views can run them one after another while the async views
+(api/async_views.py) run them concurrently. Every loader evaluates its
+querysets (and serializes where it can), so no lazy query is left to run
+after it returns.
+"""
+from collections import Counter
+from datetime import datetime, timedelta
+
+from django.db.models import Avg, Sum
+
+from .archive import merge_archived
+from .optimizer import optimize_queryset
+from .models import (
+    Company, Lead, Investment,
+    HighLevelAnalysis, PerceptionAnalysis, MarketAnalysis,
+    KeyIndividualsAnalysis, CompetitiveAnalysis
+)
+from .serializers import (
+    CompanySerializer, LeadSerializer, InvestmentSerializer, DashboardStatsSerializer,
+    HighLevelAnalysisSerializer, HighLevelAnalysisListSerializer,
+    PerceptionAnalysisSerializer, PerceptionAnalysisListSerializer,
+    MarketAnalysisSerializer, MarketAnalysisListSerializer,
+    KeyIndividualsAnalysisSerializer, KeyIndividualsAnalysisListSerializer,
+    CompetitiveAnalysisSerializer, CompetitiveAnalysisListSerializer
+)
+
+# Response key, model, detail serializer, list serializer
+ANALYSIS_SECTIONS = (
+    ('high_level_analyses', HighLevelAnalysis, HighLevelAnalysisSerializer, HighLevelAnalysisListSerializer),
+    ('perception_analyses', PerceptionAnalysis, PerceptionAnalysisSerializer, PerceptionAnalysisListSerializer),
+    ('market_analyses', MarketAnalysis, MarketAnalysisSerializer, MarketAnalysisListSerializer),
+    ('key_individuals_analyses', KeyIndividualsAnalysis, KeyIndividualsAnalysisSerializer, KeyIndividualsAnalysisListSerializer),
+    ('competitive_analyses', CompetitiveAnalysis, CompetitiveAnalysisSerializer, CompetitiveAnalysisListSerializer),
+)
+
+
+# Full analysis
+
+def _load_analyses(company, model, serializer_class, include_archived):
+    analyses = list(optimize_queryset(model.objects.filter(company=company), serializer_class).order_by('-created_at'))
+    data = serializer_class(analyses, many=True).data
+    if include_archived:
+        merge_archived(data, serializer_class)
+    scores = [(a.overall_score or 0, a.confidence_score or 0) for a in analyses]
+    return data, scores
+
+
+def _load_leads(company):
+    leads = list(Lead.objects.filter(company=company).select_related('company', 'assigned_to').order_by('-created_at'))
+    return LeadSerializer(leads, many=True).data, dict(Counter(lead.status for lead in leads))
+
+
+def _load_investments(company):
+    investments = list(
+        Investment.objects.filter(company=company).select_related('company', 'created_by').order_by('-investment_date')
+    )
+    return InvestmentSerializer(investments, many=True).data, sum(i.amount for i in investments) or 0
+
+
+def full_analysis_loaders(company, include_archived=False):
+    """{section: callable} for every part of a company's full analysis"""
+    loaders = {
+        'company': lambda: CompanySerializer(company).data,
+        'leads': lambda: _load_leads(company),
+        'investments': lambda: _load_investments(company),
+    }
+    for key, model, serializer_class, _ in ANALYSIS_SECTIONS:
+        loaders[key] = (
+            lambda model=model, serializer_class=serializer_class:
+            _load_analyses(company, model, serializer_class, include_archived)
+        )
+    return loaders
+
+
+def build_full_analysis(results):
+    """Assemble the full_analysis response from the loader results"""
+    scores = [score for key, *_ in ANALYSIS_SECTIONS for score in results[key][1]]
+    leads, lead_status_breakdown = results['leads']
+    investments, total_investment = results['investments']
+    data = {'company': results['company']}
+    for key, *_ in ANALYSIS_SECTIONS:
+        data[key] = results[key][0]
+    data['leads'] = leads
+    data['investments'] = investments
+    data['metrics_summary'] = {
+        'total_analyses': len(scores),
+        'avg_score': sum(s for s, _ in scores) / len(scores) if scores else 0,
+        'avg_confidence': sum(c for _, c in scores) / len(scores) if scores else 0,
+        'total_investment': total_investment,
+        'lead_status_breakdown': lead_status_breakdown,
+    }
+    return data
+
+
+# Dashboard
+
+def dashboard_stat_loaders():
+    """{name: callable} for each query behind the dashboard statistics"""
+    month_start = datetime.now().replace(day=1)
+    week_ago = datetime.now() - timedelta(days=7)
+    loaders = {
+        'active_prospects': lambda: Lead.objects.filter(
+            status__in=['new', 'contacted', 'qualified', 'under_review']
+        ).count(),
+        'investment_pipeline': lambda: Investment.objects.filter(
+            status__in=['proposed', 'approved']
+        ).aggregate(total=Sum('amount'))['total'] or 0,
+        'total_leads': lambda: Lead.objects.count(),
+        'successful_investments': lambda: Investment.objects.filter(
+            status__in=['completed', 'exited']
+        ).count(),
+        'new_companies': lambda: Company.objects.filter(created_at__gte=week_ago).count(),
+        'avg_match_score': lambda: Lead.objects.filter(
+            ai_match_score__isnull=False
+        ).aggregate(avg=Avg('ai_match_score'))['avg'] or 0,
+        'hot_leads': lambda: Lead.objects.filter(
+            priority__in=['high', 'critical'], ai_match_score__gte=80
+        ).count(),
+    }
+    for key, model, *_ in ANALYSIS_SECTIONS:
+        loaders[f'{key}_completed'] = (
+            lambda model=model: model.objects.filter(created_at__gte=month_start, is_completed=True).count()
+        )
+    return loaders
+
+
+def build_dashboard_stats(results):
+    total_leads = results['total_leads']
+    success_rate = (results['successful_investments'] / total_leads * 100) if total_leads > 0 else 0
+    stats_data = {
+        'active_prospects': results['active_prospects'],
+        'investment_pipeline': results['investment_pipeline'],
+        'analysis_completed': sum(results[f'{key}_completed'] for key, *_ in ANALYSIS_SECTIONS),
+        'success_rate': round(success_rate, 1),
+        'new_companies_this_week': results['new_companies'],
+        'avg_match_score': round(results['avg_match_score'], 1),
+        'hot_leads': results['hot_leads'],
+    }
+    return DashboardStatsSerializer(stats_data).data
+
+
+def recent_analysis_loaders(per_type=2):
+    """{section: callable} returning the newest analyses of each type"""
+    return {
+        key: (
+            lambda model=model: list(
+                model.objects.select_related('company', 'analyst').order_by('-created_at')[:per_type]
+            )
+        )
+        for key, model, *_ in ANALYSIS_SECTIONS
+    }
+
+
+def build_recent_analyses(results, limit=5):
+    list_serializers = {model: list_serializer for _, model, _, list_serializer in ANALYSIS_SECTIONS}
+    all_recent = [analysis for analyses in results.values() for analysis in analyses]
+    all_recent.sort(key=lambda x: x.created_at, reverse=True)
+    return [list_serializers[type(analysis)](analysis).data for analysis in all_recent[:limit]]
+
+
+def load_upcoming_tasks(user):
+    upcoming_leads = Lead.objects.filter(
+        status__in=['new', 'contacted'],
+        assigned_to=user
+    ).select_related('company').order_by('created_at')[:5]
+
+    tasks = []
+    for lead in upcoming_leads:
+        tasks.append({
+            'id': lead.id,
+            'task': f'Follow up with {lead.company.name}',
+            'priority': lead.priority.title(),
+            'due_date': 'Today' if lead.created_at.date() == datetime.now().date() else 'This week',
+            'type': 'follow_up'
+        })
+    return tasks
+
+
+def run_loaders(loaders):
+    """Run loaders one after another (the sync views)"""
+    return {name: load() for name, load in loaders.items()}
@@ -0,0 +1,262 @@
+"""
+Time-bucketed sentiment series of ``RecentMention`` rows.
+
+``sentiment_series`` returns, per day, week (ISO, starting Monday) or month
+bucket, the number of mentions and their average ``sentiment_score``, both
+overall and per source, the count per sentiment label, and a rolling
+mention-weighted average over the last ``window`` buckets. It serves one
+company (``/api/companies/{id}/sentiment/``) or the whole portfolio
+(``/api/portfolio/sentiment/``).
+
+Buckets are aggregated with one grouped query over the requested range.
+Archived mentions (api/archive.py) are included, so archiving never changes
+history. Each closed bucket (one that ends before today) is cached without
+a timeout and never recomputed: a later request queries only the buckets
+missing from the cache plus the current, still-open one.
+
+Mention writes delete the cached buckets that contain the old and new date
+(signal receivers below). Bulk writes send no signals and must call
+``invalidate_all``, which bumps the epoch that is part of every bucket key.
+"""
+from collections import defaultdict
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncDay, TruncMonth, TruncWeek
+from django.utils import timezone
+
+from .cache import bump_tags, tag_versions
+from .models import ArchivedRow, PerceptionAnalysis, RecentMention
+
+GRANULARITIES = {'day': TruncDay, 'week': TruncWeek, 'month': TruncMonth}
+DEFAULT_GRANULARITY = 'week'
+# Buckets returned when no start date is given, and rolling window, per granularity
+DEFAULT_SPANS = {'day': 90, 'week': 26, 'month': 12}
+DEFAULT_WINDOWS = {'day': 7, 'week': 4, 'month': 3}
+MAX_BUCKETS = 500
+MAX_WINDOW = 52
+
+EPOCH_TAG = 'sentiment-series'
+
+
+def _cache():
+    return caches[getattr(settings, 'API_CACHE_ALIAS', 'default')]
+
+
+def bucket_start(day, granularity):
+    if granularity == 'week':
+        return day - timedelta(days=day.weekday())
+    if granularity == 'month':
+        return day.replace(day=1)
+    return day
+
+
+def next_bucket(start, granularity):
+    if granularity == 'week':
+        return start + timedelta(days=7)
+    if granularity == 'month':
+        return (start.replace(day=28) + timedelta(days=4)).replace(day=1)
+    return start + timedelta(days=1)
+
+
+def previous_bucket(start, granularity):
+    return bucket_start(start - timedelta(days=1), granularity)
+
+
+def _buckets(first, last, granularity):
+    """Bucket starts from the bucket of ``first`` to the one of ``last``"""
+    current, last = bucket_start(first, granularity), bucket_start(last, granularity)
+    starts = []
+    while current <= last:
+        starts.append(current)
+        current = next_bucket(current, granularity)
+    return starts
+
+
+def _bucket_key(epoch, company_id, granularity, start):
+    scope = company_id or 'portfolio'
+    return f'sentiment-series:{epoch}:{scope}:{granularity}:{start.isoformat()}'
+
+
+def _epoch():
+    return tag_versions([EPOCH_TAG])[EPOCH_TAG]
+
+
+def invalidate_all():
+    """Drop every cached bucket (after bulk writes that send no signals)"""
+    bump_tags(EPOCH_TAG)
+
+
+def _empty_bucket():
+    return {'mentions': 0, 'score_sum': 0, 'sources': {}, 'labels': {}}
+
+
+def _add(bucket, source, label, mentions, score_sum):
+    bucket['mentions'] += mentions
+    bucket['score_sum'] += score_sum
+    totals = bucket['sources'].setdefault(source, [0, 0])
+    totals[0] += mentions
+    totals[1] += score_sum
+    bucket['labels'][label] = bucket['labels'].get(label, 0) + mentions
+
+
+def _aggregate(company_id, granularity, first, end):
+    """Raw totals of the buckets between ``first`` and ``end`` (exclusive)"""
+    buckets = defaultdict(_empty_bucket)
+    mentions = RecentMention.objects.filter(date__gte=first, date__lt=end)
+    archived = ArchivedRow.objects.filter(model=RecentMention._meta.label, row_date__gte=first, row_date__lt=end)
+    if company_id:
+        mentions = mentions.filter(analysis__company_id=company_id)
+        archived = archived.filter(company_id=company_id)
+
+    rows = (
+        mentions.annotate(bucket=GRANULARITIES[granularity]('date'))
+        .values('bucket', 'source', 'sentiment_label')
+        .annotate(mentions=Count('id'), score_sum=Sum('sentiment_score'))
+        .order_by()
+    )
+    for row in rows:
+        _add(buckets[row['bucket']], row['source'], row['sentiment_label'], row['mentions'], row['score_sum'])
+    for data, row_date in archived.values_list('data', 'row_date'):
+        _add(buckets[bucket_start(row_date, granularity)], data['source'], data['sentiment_label'], 1,
+             data['sentiment_score'])
+    return buckets
+
+
+def _average(score_sum, mentions):
+    return round(score_sum / mentions, 2) if mentions else None
+
+
+def _render(start, bucket, window_buckets):
+    window_mentions = sum(entry['mentions'] for entry in window_buckets)
+    window_scores = sum(entry['score_sum'] for entry in window_buckets)
+    return {
+        'bucket': start.isoformat(),
+        'mentions': bucket['mentions'],
+        'avg_sentiment': _average(bucket['score_sum'], bucket['mentions']),
+        'rolling_avg_sentiment': _average(window_scores, window_mentions),
+        'rolling_mentions': round(window_mentions / len(window_buckets), 2),
+        'by_source': [
+            {'source': source, 'mentions': mentions, 'avg_sentiment': _average(score_sum, mentions)}
+            for source, (mentions, score_sum) in sorted(bucket['sources'].items(), key=lambda item: (-item[1][0], item[0]))
+        ],
+        'by_label': dict(sorted(bucket['labels'].items(), key=lambda item: (-item[1], item[0]))),
+    }
+
+
+def sentiment_series(company_id=None, granularity=DEFAULT_GRANULARITY, start=None, end=None, window=None):
+    """Sentiment buckets of one company (all companies if None) from ``start`` to ``end``"""
+    today = timezone.localdate()
+    end = end or today
+    window = window or DEFAULT_WINDOWS[granularity]
+    if start is None:
+        starts = [bucket_start(end, granularity)]
+        while len(starts) < DEFAULT_SPANS[granularity]:
+            starts.insert(0, previous_bucket(starts[0], granularity))
+    else:
+        starts = _buckets(start, end, granularity)
+    # Earlier buckets feed the rolling average of the first ones
+    leading = []
+    for _ in range(window - 1):
+        leading.insert(0, previous_bucket((leading or starts)[0], granularity))
+    all_starts = leading + starts
+
+    use_cache = getattr(settings, 'API_CACHE_ENABLED', True)
+    cache = _cache()
+    epoch = _epoch() if use_cache else None
+    closed = [s for s in all_starts if next_bucket(s, granularity) <= today]
+    keys = {s: _bucket_key(epoch, company_id, granularity, s) for s in closed}
+    cached = cache.get_many(list(keys.values())) if use_cache else {}
+    buckets = {s: cached[key] for s, key in keys.items() if key in cached}
+
+    missing = [s for s in all_starts if s not in buckets]
+    if missing:
+        fresh = _aggregate(company_id, granularity, missing[0], next_bucket(missing[-1], granularity))
+        for s in missing:
+            buckets[s] = fresh.get(s) or _empty_bucket()
+        if use_cache:
+            cache.set_many({keys[s]: buckets[s] for s in missing if s in keys}, timeout=None)
+
+    series = []
+    for index, s in enumerate(starts):
+        position = len(leading) + index
+        window_buckets = [buckets[w] for w in all_starts[max(position - window + 1, 0):position + 1]]
+        series.append(_render(s, buckets[s], window_buckets))
+
+    mentions = sum(buckets[s]['mentions'] for s in starts)
+    score_sum = sum(buckets[s]['score_sum'] for s in starts)
+    return {
+        'company': company_id,
+        'granularity': granularity,
+        'window': window,
+        'start': starts[0].isoformat(),
+        'end': end.isoformat(),
+        'mentions': mentions,
+        'avg_sentiment': _average(score_sum, mentions),
+        'buckets': series,
+    }
+
+
+def _date_param(query_params, name):
+    value = query_params.get(name)
+    if not value:
+        return None
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f'{name} must be YYYY-MM-DD')
+
+
+def series_params(query_params):
+    """sentiment_series keyword arguments from ?granularity=&start=&end=&window="""
+    granularity = query_params.get('granularity', DEFAULT_GRANULARITY)
+    if granularity not in GRANULARITIES:
+        raise ValueError(f"granularity must be one of {', '.join(GRANULARITIES)}")
+    start = _date_param(query_params, 'start')
+    end = _date_param(query_params, 'end')
+    if start and end and start > end:
+        raise ValueError('start must not be after end')
+    if start and len(_buckets(start, end or timezone.localdate(), granularity)) > MAX_BUCKETS:
+        raise ValueError(f'At most {MAX_BUCKETS} buckets per request')
+    window = query_params.get('window')
+    if window is not None:
+        try:
+            window = int(window)
+        except ValueError:
+            raise ValueError('window must be an integer')
+        if not 1 <= window <= MAX_WINDOW:
+            raise ValueError(f'window must be between 1 and {MAX_WINDOW}')
+    return {'granularity': granularity, 'start': start, 'end': end, 'window': window}
+
+
+# Signal receivers
+
+def _delete_buckets(company_id, days):
+    epoch = _epoch()
+    keys = [
+        _bucket_key(epoch, scope, granularity, bucket_start(day, granularity))
+        for granularity in GRANULARITIES for scope in (None, company_id) for day in days
+    ]
+    _cache().delete_many(keys)
+
+
+def stash_mention_date(sender, instance, **kwargs):
+    """pre_save: remember the stored date of an updated mention"""
+    if instance.pk is not None:
+        instance._sentiment_old_date = (
+            RecentMention.objects.filter(pk=instance.pk).values_list('date', flat=True).first()
+        )
+
+
+def mention_changed(sender, instance, **kwargs):
+    """post_save/post_delete: drop the cached buckets of the mention's dates"""
+    days = {instance.date, getattr(instance, '_sentiment_old_date', None)} - {None}
+    company_id = (
+        PerceptionAnalysis.objects.filter(pk=instance.analysis_id).values_list('company_id', flat=True).first()
+    )
+    _delete_buckets(company_id, days)
+    # Again on commit: a request may have cached the old totals in the meantime
+    transaction.on_commit(lambda: _delete_buckets(company_id, days))
@@ -6,7 +6,7 @@ from .models import (
     KeyIndividualsAnalysis, CompetitiveAnalysis,
     KeyIndividual, IndividualRisk, PublicMention, Competitor, StrategicRecommendation,
     SentimentBySource, CompetitorSentiment, RecentMention, KeyTopic, BrandMetric, RiskAlert,
-    RevenueInformation, MarketForce, SalesChannel, IndustryTrend
+    RevenueInformation, MarketForce, SalesChannel, IndustryTrend, Job, RequestProfile
 )
 
 class CompanyTagSerializer(serializers.ModelSerializer):
@@ -26,7 +26,8 @@ class CompanySerializer(serializers.ModelSerializer):
             'funding_raised', 'funding_currency', 'ai_score', 'ai_confidence',
             'created_at', 'updated_at', 'is_active', 'tags'
         ]
-        read_only_fields = ['id', 'created_at', 'updated_at']
+        # ai_score/ai_confidence are rolled up from the analyses (api/rollup.py)
+        read_only_fields = ['id', 'ai_score', 'ai_confidence', 'created_at', 'updated_at']
 
 class CompanyListSerializer(serializers.ModelSerializer):
     """Simplified serializer for company lists"""
@@ -76,6 +77,16 @@ class CompetitorSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ['id', 'created_at', 'updated_at']
 
+class CompetitorListSerializer(CompetitorSerializer):
+    """Competitor rows across analyses, with their parsed figures"""
+    company_id = serializers.UUIDField(source='analysis.company_id', read_only=True)
+    
+    class Meta(CompetitorSerializer.Meta):
+        fields = ['analysis', 'company_id'] + CompetitorSerializer.Meta.fields + [
+            'funding_value', 'funding_currency', 'revenue_value', 'revenue_currency', 'revenue_unit',
+            'market_share_value', 'employees_value'
+        ]
+
 class StrategicRecommendationSerializer(serializers.ModelSerializer):
     class Meta:
         model = StrategicRecommendation
@@ -181,6 +192,15 @@ class SalesChannelSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ['id', 'created_at', 'updated_at']
 
+class SalesChannelListSerializer(SalesChannelSerializer):
+    """Sales channel rows across analyses, with their parsed figures"""
+    company_id = serializers.UUIDField(source='analysis.company_id', read_only=True)
+    
+    class Meta(SalesChannelSerializer.Meta):
+        fields = ['analysis', 'company_id'] + SalesChannelSerializer.Meta.fields + [
+            'installs_count_value', 'revenue_amount_value', 'revenue_amount_currency'
+        ]
+
 class IndustryTrendSerializer(serializers.ModelSerializer):
     class Meta:
         model = IndustryTrend
@@ -384,7 +404,7 @@ class UserProfileSerializer(serializers.ModelSerializer):
         fields = [
             'id', 'user', 'username', 'email', 'first_name', 'last_name',
             'role', 'preferred_industries', 'notification_preferences',
-            'created_at', 'updated_at'
+            'watched_companies', 'created_at', 'updated_at'
         ]
         read_only_fields = ['id', 'created_at', 'updated_at']
 
@@ -410,3 +430,42 @@ class CompanyAnalysisSerializer(serializers.Serializer):
     leads = LeadSerializer(many=True)
     investments = InvestmentSerializer(many=True)
     metrics_summary = serializers.DictField()
+
+class JobSerializer(serializers.ModelSerializer):
+    progress_percentage = serializers.ReadOnlyField()
+    created_by_name = serializers.CharField(source='created_by.username', read_only=True)
+    download_url = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Job
+        fields = [
+            'id', 'kind', 'params', 'status', 'progress_current', 'progress_total',
+            'progress_percentage', 'progress_message', 'result', 'error',
+            'cancel_requested', 'download_url', 'created_by', 'created_by_name',
+            'created_at', 'started_at', 'finished_at'
+        ]
+        read_only_fields = fields
+
+    def get_download_url(self, obj):
+        if not obj.result_file or obj.status != 'succeeded':
+            return None
+        request = self.context.get('request')
+        url = f'/api/jobs/{obj.pk}/download/'
+        return request.build_absolute_uri(url) if request else url
+
+class RequestProfileSerializer(serializers.ModelSerializer):
+    user_name = serializers.CharField(source='user.username', read_only=True, default=None)
+    download_url = serializers.SerializerMethodField()
+
+    class Meta:
+        model = RequestProfile
+        fields = [
+            'id', 'user', 'user_name', 'method', 'path', 'view', 'status_code',
+            'duration_ms', 'mode', 'download_url', 'created_at'
+        ]
+        read_only_fields = fields
+
+    def get_download_url(self, obj):
+        request = self.context.get('request')
+        url = f'/api/request-profiles/{obj.pk}/download/'
+        return request.build_absolute_uri(url) if request else url
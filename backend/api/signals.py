@@ -0,0 +1,95 @@
+"""
+Model signal receivers. Connected from ApiConfig.ready().
+"""
+from django.apps import apps
+from django.contrib.auth.models import User
+from django.db.models.signals import post_init, pre_save, post_save, post_delete, m2m_changed
+from rest_framework.authtoken.models import Token
+
+from .authentication import revoke_token_keys, revoke_user_tokens
+from .cache import bump_model_tags
+from . import numeric, rollup, scoring, sentiment, similarity, stream
+from .models import Company, CompanyTag, Lead, Investment, RecentMention, UserProfile
+from .sections import ANALYSIS_SECTIONS
+
+
+def invalidate_response_cache(sender, **kwargs):
+    bump_model_tags(sender)
+
+
+def invalidate_response_cache_m2m(sender, instance, model, **kwargs):
+    if kwargs.get('action', '').startswith('post_'):
+        bump_model_tags(type(instance), model)
+
+
+def revoke_cached_token(sender, instance, **kwargs):
+    revoke_token_keys([instance.key])
+
+
+def revoke_cached_user_tokens(sender, instance, **kwargs):
+    # Any change (deactivation, permissions, names) must reach cached users
+    revoke_user_tokens(instance)
+
+
+def revoke_cached_user_tokens_m2m(sender, instance, action, reverse, pk_set, **kwargs):
+    """Group and permission changes of users, from either side of the relation"""
+    if action not in ('post_add', 'post_remove', 'pre_clear'):
+        return
+    if not reverse:
+        revoke_user_tokens(instance)
+    elif action == 'pre_clear':
+        revoke_user_tokens(*instance.user_set.all())
+    else:
+        revoke_user_tokens(*pk_set)
+
+
+def connect():
+    for model in list(apps.get_app_config('api').get_models()) + [User]:
+        post_save.connect(invalidate_response_cache, sender=model, dispatch_uid=f'cache-save-{model._meta.label}')
+        post_delete.connect(invalidate_response_cache, sender=model, dispatch_uid=f'cache-delete-{model._meta.label}')
+    m2m_changed.connect(invalidate_response_cache_m2m, dispatch_uid='cache-m2m')
+    post_delete.connect(revoke_cached_token, sender=Token, dispatch_uid='auth-token-delete')
+    post_save.connect(revoke_cached_user_tokens, sender=User, dispatch_uid='auth-token-user-save')
+    m2m_changed.connect(
+        revoke_cached_user_tokens_m2m, sender=User.groups.through, dispatch_uid='auth-token-user-groups'
+    )
+    m2m_changed.connect(
+        revoke_cached_user_tokens_m2m, sender=User.user_permissions.through, dispatch_uid='auth-token-user-permissions'
+    )
+
+    # Change stream (api/stream.py)
+    for model in stream.TRACKED_FIELDS:
+        post_init.connect(stream.stash_tracked_fields, sender=model, dispatch_uid=f'stream-init-{model._meta.label}')
+    for model in stream.ANALYSIS_TYPES:
+        post_save.connect(stream.analysis_saved, sender=model, dispatch_uid=f'stream-save-{model._meta.label}')
+    post_save.connect(stream.lead_saved, sender=Lead, dispatch_uid='stream-save-api.Lead')
+    post_save.connect(stream.investment_saved, sender=Investment, dispatch_uid='stream-save-api.Investment')
+
+    # Similar-company vectors (api/similarity.py)
+    post_save.connect(similarity.drop_vector, sender=CompanyTag, dispatch_uid='similarity-tag-save')
+    post_delete.connect(similarity.drop_vector, sender=CompanyTag, dispatch_uid='similarity-tag-delete')
+
+    # Sentiment series buckets (api/sentiment.py)
+    pre_save.connect(sentiment.stash_mention_date, sender=RecentMention, dispatch_uid='sentiment-mention-pre-save')
+    post_save.connect(sentiment.mention_changed, sender=RecentMention, dispatch_uid='sentiment-mention-save')
+    post_delete.connect(sentiment.mention_changed, sender=RecentMention, dispatch_uid='sentiment-mention-delete')
+
+    # Numeric shadow columns of display strings (api/numeric.py)
+    for model in numeric.shadowed_models():
+        pre_save.connect(numeric.fill_on_save, sender=model, dispatch_uid=f'numeric-save-{model._meta.label}')
+
+    # Company.ai_score rollup of the latest analyses (api/rollup.py)
+    for _, model, *_ in ANALYSIS_SECTIONS:
+        post_save.connect(rollup.analysis_changed, sender=model, dispatch_uid=f'rollup-save-{model._meta.label}')
+        post_delete.connect(rollup.analysis_changed, sender=model, dispatch_uid=f'rollup-delete-{model._meta.label}')
+
+    # Lead.ai_match_score inputs (api/scoring.py)
+    post_save.connect(scoring.company_changed, sender=Company, dispatch_uid='scoring-company-save')
+    for model in [CompanyTag] + [model for _, model, *_ in ANALYSIS_SECTIONS]:
+        post_save.connect(
+            scoring.company_inputs_changed, sender=model, dispatch_uid=f'scoring-save-{model._meta.label}'
+        )
+        post_delete.connect(
+            scoring.company_inputs_changed, sender=model, dispatch_uid=f'scoring-delete-{model._meta.label}'
+        )
+    post_save.connect(scoring.preferences_changed, sender=UserProfile, dispatch_uid='scoring-profile-save')
@@ -0,0 +1,244 @@
+"""
+Similar-company search (``/api/companies/{id}/similar/?k=``).
+
+Every company has a ``CompanyVector``: a unit-length float32 vector built
+from its industry, stage, founded year, headcount, funding, tag names and a
+hashed bag of words of its description. Text features use the hashing trick,
+so vectors need no shared vocabulary and one company's vector never changes
+because another company changed. The cosine similarity of two companies is
+then the dot product of their vectors.
+
+Vectors are kept fresh incrementally: a search first recomputes the vectors
+of companies saved since their vector was (one query when nothing changed),
+and tag changes drop the company's vector so it is rebuilt the same way.
+``manage.py build_similarity_index`` builds them all up front. Each process
+keeps the vectors of the active companies in one NumPy matrix and, when the
+CompanyVector or Company tag version changes, reloads only the rows updated
+since the previous sync; a top-k search is then one matrix-vector product
+and an ``argpartition``.
+"""
+import hashlib
+import math
+import re
+import threading
+from collections import Counter
+from datetime import timedelta
+
+import numpy as np
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .cache import bump_model_tags, model_tag, tag_versions
+from .models import Company, CompanyTag, CompanyVector
+
+# Bump when the features change; build_similarity_index then rewrites every vector
+VECTOR_VERSION = 1
+
+STAGES = [value for value, _ in Company._meta.get_field('stage').choices]
+INDUSTRY_DIMS = 32
+TAG_DIMS = 64
+TEXT_DIMS = 256
+NUMERIC_DIMS = 3
+DIMENSIONS = INDUSTRY_DIMS + len(STAGES) + NUMERIC_DIMS + TAG_DIMS + TEXT_DIMS
+# Share of each feature block in the similarity
+BLOCK_WEIGHTS = {'industry': 1.0, 'stage': 0.6, 'numeric': 0.6, 'tags': 0.8, 'description': 1.0}
+
+DEFAULT_K = 10
+MAX_K = 50
+DEFAULT_BATCH_SIZE = 500
+# Vectors written while the index was loading may carry an earlier updated_at
+SYNC_OVERLAP = timedelta(minutes=1)
+
+_WORD = re.compile(r'[a-z0-9]{3,}')
+STOPWORDS = frozenset(
+    'the and for with that this from are our its into their has have was were will can which who '
+    'all more than also such other most over'.split()
+)
+
+FIELDS = ('id', 'industry', 'stage', 'founded_year', 'employees_min', 'employees_max', 'funding_raised', 'description')
+
+
+def _unit(block):
+    norm = np.linalg.norm(block)
+    return block / norm if norm else block
+
+
+def _hashed(tokens, dims):
+    """Signed hashing-trick bag of ``tokens`` with sublinear counts"""
+    block = np.zeros(dims)
+    for token, count in Counter(tokens).items():
+        digest = int.from_bytes(hashlib.blake2b(token.encode(), digest_size=8).digest(), 'little')
+        sign = -1.0 if digest & 1 else 1.0
+        block[(digest >> 1) % dims] += sign * (1 + math.log(count))
+    return _unit(block)
+
+
+def _stage(stage):
+    # Neighbouring stages are partly similar
+    block = np.zeros(len(STAGES))
+    if stage in STAGES:
+        position = STAGES.index(stage)
+        block[max(position - 1, 0):position + 2] = 0.5
+        block[position] = 1.0
+    return _unit(block)
+
+
+def _scaled(value, log_scale=None, low=0.0, high=1.0):
+    # Centred on 0 so that missing values (0) neither attract nor repel
+    if value is None:
+        return 0.0
+    value = float(value)
+    if log_scale:
+        value = math.log10(value + 1) / log_scale
+    else:
+        value = (value - low) / (high - low)
+    return min(max(value, 0.0), 1.0) - 0.5
+
+
+def vectorize(row, tags):
+    """Unit-length float32 vector of one company (``FIELDS`` row and tag names)"""
+    _, industry, stage, founded_year, employees_min, employees_max, funding, description = row
+    numeric = np.array([
+        _scaled(founded_year, low=1980, high=2030),
+        _scaled(employees_max or employees_min, log_scale=4),
+        _scaled(funding, log_scale=9),
+    ])
+    words = [word for word in _WORD.findall(description.lower()) if word not in STOPWORDS]
+    vector = np.concatenate([
+        BLOCK_WEIGHTS['industry'] * _hashed([industry.strip().lower()], INDUSTRY_DIMS),
+        BLOCK_WEIGHTS['stage'] * _stage(stage),
+        BLOCK_WEIGHTS['numeric'] * numeric,
+        BLOCK_WEIGHTS['tags'] * _hashed([tag.strip().lower() for tag in tags], TAG_DIMS),
+        BLOCK_WEIGHTS['description'] * _hashed(words, TEXT_DIMS),
+    ])
+    return _unit(vector).astype(np.float32)
+
+
+def _inputs_hash(row, tags):
+    raw = repr((VECTOR_VERSION, row[1:], sorted(tags)))
+    return hashlib.blake2b(raw.encode(), digest_size=8).hexdigest()
+
+
+def refresh_vectors(company_ids=None, force=False, batch_size=DEFAULT_BATCH_SIZE):
+    """Recompute the vectors (of all companies if ``company_ids`` is None) whose inputs changed"""
+    if company_ids is None:
+        company_ids = list(Company.objects.order_by('id').values_list('id', flat=True))
+    written = 0
+    for start in range(0, len(company_ids), batch_size):
+        batch = company_ids[start:start + batch_size]
+        existing = dict(CompanyVector.objects.filter(company_id__in=batch).values_list('company_id', 'inputs_hash'))
+        tags = {}
+        for company_id, name in CompanyTag.objects.filter(company_id__in=batch).values_list('company_id', 'name'):
+            tags.setdefault(company_id, []).append(name)
+
+        now = timezone.now()
+        creates, updates, unchanged = [], [], []
+        for row in Company.objects.filter(id__in=batch).values_list(*FIELDS):
+            company_tags = tags.get(row[0], [])
+            digest = _inputs_hash(row, company_tags)
+            if not force and existing.get(row[0]) == digest:
+                unchanged.append(row[0])
+                continue
+            vector = CompanyVector(
+                company_id=row[0], vector=vectorize(row, company_tags).tobytes(), inputs_hash=digest, updated_at=now
+            )
+            (updates if row[0] in existing else creates).append(vector)
+
+        with transaction.atomic():
+            CompanyVector.objects.bulk_create(creates)
+            CompanyVector.objects.bulk_update(updates, ['vector', 'inputs_hash', 'updated_at'])
+            # Saved without an input change: mark checked so they are not stale again
+            if unchanged:
+                CompanyVector.objects.filter(company_id__in=unchanged, updated_at__lt=now).update(updated_at=now)
+        written += len(creates) + len(updates)
+
+    if written:
+        # bulk writes send no signals
+        bump_model_tags(CompanyVector)
+    return written
+
+
+def refresh_stale_vectors():
+    """Recompute the vectors of companies without one or saved after it"""
+    stale = Company.objects.filter(Q(vector__isnull=True) | Q(updated_at__gt=F('vector__updated_at')))
+    company_ids = list(stale.values_list('id', flat=True))
+    return refresh_vectors(company_ids) if company_ids else 0
+
+
+def drop_vector(sender, instance, **kwargs):
+    """Signal receiver: a tag changed, rebuild the company's vector on the next search"""
+    CompanyVector.objects.filter(company_id=instance.company_id).delete()
+
+
+def _load_vectors(queryset):
+    return {
+        company_id: np.frombuffer(bytes(vector), dtype=np.float32)
+        for company_id, vector in queryset.values_list('company_id', 'vector')
+    }
+
+
+class SimilarityIndex:
+    """The vectors of all active companies as one matrix, synced incrementally"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version = None
+        self._synced_at = None
+        # (company ids, {company id: row}, matrix); replaced as a whole on sync
+        self._state = ([], {}, np.zeros((0, DIMENSIONS), dtype=np.float32))
+
+    def sync(self):
+        versions = tag_versions([model_tag(CompanyVector), model_tag(Company)])
+        with self._lock:
+            if versions == self._version:
+                return self._state
+            started = timezone.now()
+            active = CompanyVector.objects.filter(company__is_active=True)
+            ids = list(active.order_by('company_id').values_list('company_id', flat=True))
+            changed = active if self._synced_at is None else active.filter(updated_at__gte=self._synced_at - SYNC_OVERLAP)
+            fresh = _load_vectors(changed)
+
+            _, positions, matrix = self._state
+            missing = [company_id for company_id in ids if company_id not in fresh and company_id not in positions]
+            if missing:
+                # e.g. reactivated companies with an old vector
+                fresh.update(_load_vectors(active.filter(company_id__in=missing)))
+
+            new_matrix = np.empty((len(ids), DIMENSIONS), dtype=np.float32)
+            kept_from, kept_to = [], []
+            for row, company_id in enumerate(ids):
+                vector = fresh.get(company_id)
+                if vector is None:
+                    kept_from.append(positions[company_id])
+                    kept_to.append(row)
+                else:
+                    new_matrix[row] = vector
+            new_matrix[kept_to] = matrix[kept_from]
+
+            self._state = (ids, {company_id: row for row, company_id in enumerate(ids)}, new_matrix)
+            self._version = versions
+            self._synced_at = started
+            return self._state
+
+    def similar(self, company_id, k=DEFAULT_K):
+        """[(company id, cosine similarity)] of the ``k`` nearest companies"""
+        ids, positions, matrix = self.sync()
+        position = positions.get(company_id)
+        k = min(k, len(ids) - 1)
+        if position is None or k < 1:
+            return []
+        scores = matrix @ matrix[position]
+        scores[position] = -np.inf
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind='stable')]
+        return [(ids[row], float(scores[row])) for row in top]
+
+
+_index = SimilarityIndex()
+
+
+def similar_companies(company_id, k=DEFAULT_K):
+    """The ``k`` active companies most similar to ``company_id``, best first"""
+    refresh_stale_vectors()
+    return _index.similar(company_id, k)
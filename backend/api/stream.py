@@ -0,0 +1,253 @@
+"""
+Change notifications pushed to clients over server-sent events.
+
+Model signals publish an event when an analysis is created or completed, a
+lead changes status or an investment is saved. ``GET /api/stream/`` streams
+the events of the companies the user watches (``UserProfile.watched_companies``)
+or has leads assigned in, so the dashboard and company pages can refetch on
+change instead of polling.
+
+Events go through a broker selected by ``STREAM_BROKER``:
+
+* ``DatabaseBroker`` (default) stores them in the ``ChangeEvent`` table, so
+  every web and job worker process sees events published by any other.
+* ``InProcessBroker`` keeps them in memory, for tests and single-process runs.
+
+Streams poll the broker every ``STREAM_POLL_SECONDS``. Under ASGI the wait is
+asynchronous; under WSGI each open stream holds a worker, so /api/stream/
+should be routed to the ASGI app in production. A stream ends after
+``STREAM_MAX_SECONDS``; the client reconnects with a new stream ticket (see
+api/authentication.py) and ``?last_event_id=`` set to the last id it received.
+"""
+import asyncio
+import itertools
+import json
+import threading
+import time
+from collections import deque
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import ChangeEvent, Lead, Investment, UserProfile
+from .sections import ANALYSIS_SECTIONS
+
+DEFAULT_BROKER = 'api.stream.DatabaseBroker'
+FETCH_LIMIT = 200
+
+
+class InProcessBroker:
+    """Keeps the most recent events in memory; visible to this process only"""
+
+    def __init__(self, max_events=1000):
+        self._events = deque(maxlen=max_events)
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def publish(self, event, company_id=None, user_ids=(), payload=None):
+        with self._lock:
+            event_id = next(self._ids)
+            self._events.append({
+                'id': event_id,
+                'event': event,
+                'company_id': company_id,
+                'user_ids': list(user_ids),
+                'payload': payload or {},
+            })
+        return event_id
+
+    def latest_id(self):
+        with self._lock:
+            return self._events[-1]['id'] if self._events else 0
+
+    def fetch(self, after_id, limit=FETCH_LIMIT):
+        with self._lock:
+            return [event for event in self._events if event['id'] > after_id][:limit]
+
+
+class DatabaseBroker:
+    """Events in the ChangeEvent table, shared by all processes"""
+
+    # Prune expired events once every this many publishes
+    PRUNE_EVERY = 500
+
+    def publish(self, event, company_id=None, user_ids=(), payload=None):
+        row = ChangeEvent.objects.create(
+            event=event, company_id=company_id, user_ids=list(user_ids), payload=payload or {}
+        )
+        if row.pk % self.PRUNE_EVERY == 0:
+            retention = getattr(settings, 'STREAM_RETENTION_SECONDS', 3600)
+            ChangeEvent.objects.filter(created_at__lt=timezone.now() - timedelta(seconds=retention)).delete()
+        return row.pk
+
+    def latest_id(self):
+        return ChangeEvent.objects.order_by('-id').values_list('id', flat=True).first() or 0
+
+    def fetch(self, after_id, limit=FETCH_LIMIT):
+        rows = ChangeEvent.objects.filter(id__gt=after_id).order_by('id')[:limit]
+        return [
+            {
+                'id': row.pk,
+                'event': row.event,
+                'company_id': str(row.company_id) if row.company_id else None,
+                'user_ids': row.user_ids,
+                'payload': row.payload,
+            }
+            for row in rows
+        ]
+
+
+_brokers = {}
+
+
+def get_broker():
+    path = getattr(settings, 'STREAM_BROKER', DEFAULT_BROKER)
+    if path not in _brokers:
+        _brokers[path] = import_string(path)()
+    return _brokers[path]
+
+
+def publish(event, company_id=None, user_ids=(), **payload):
+    """Publish an event once the current transaction commits"""
+    company_id = str(company_id) if company_id else None
+    user_ids = [user_id for user_id in user_ids if user_id]
+    payload['company'] = company_id
+    transaction.on_commit(lambda: get_broker().publish(event, company_id, user_ids, payload))
+
+
+# Signal receivers (connected in api/signals.py)
+
+# Fields whose previous value decides which event a save publishes
+TRACKED_FIELDS = {Lead: ('status',)}
+TRACKED_FIELDS.update({model: ('is_completed',) for _, model, *_ in ANALYSIS_SECTIONS})
+
+ANALYSIS_TYPES = {
+    model: list_serializer().get_analysis_type(None) for _, model, _, list_serializer in ANALYSIS_SECTIONS
+}
+
+
+def stash_tracked_fields(sender, instance, **kwargs):
+    # __dict__ so deferred fields are not loaded just to be stashed
+    instance._stream_initial = {name: instance.__dict__.get(name) for name in TRACKED_FIELDS[sender]}
+
+
+def _initial(instance, name):
+    return getattr(instance, '_stream_initial', {}).get(name)
+
+
+def analysis_saved(sender, instance, created, **kwargs):
+    payload = {'id': instance.pk, 'analysis_type': ANALYSIS_TYPES[sender], 'title': instance.title}
+    if created:
+        publish('analysis.created', instance.company_id, [instance.analyst_id], **payload)
+    if instance.is_completed and (created or not _initial(instance, 'is_completed')):
+        publish('analysis.completed', instance.company_id, [instance.analyst_id], **payload)
+    stash_tracked_fields(sender, instance)
+
+
+def lead_saved(sender, instance, created, **kwargs):
+    previous = None if created else _initial(instance, 'status')
+    if created or previous != instance.status:
+        publish(
+            'lead.status_changed', instance.company_id, [instance.assigned_to_id],
+            id=instance.pk, status=instance.status, previous_status=previous,
+        )
+    stash_tracked_fields(sender, instance)
+
+
+def investment_saved(sender, instance, created, **kwargs):
+    publish(
+        'investment.updated', instance.company_id, [instance.created_by_id],
+        id=instance.pk, status=instance.status, amount=instance.amount, created=created,
+    )
+
+
+# Streaming
+
+def format_event(event):
+    data = json.dumps(event['payload'], cls=DjangoJSONEncoder)
+    return f"id: {event['id']}\nevent: {event['event']}\ndata: {data}\n\n"
+
+
+class ChangeStream:
+    """Per-connection cursor over the broker, filtered to the user's companies"""
+
+    def __init__(self, user, last_event_id=None):
+        self.user = user
+        self.broker = get_broker()
+        self.last_id = last_event_id if last_event_id is not None else self.broker.latest_id()
+        self.company_ids = set()
+        self.scope_loaded_at = None
+
+    def _load_scope(self):
+        watched = UserProfile.watched_companies.through.objects.filter(
+            userprofile__user=self.user
+        ).values_list('company_id', flat=True)
+        assigned = Lead.objects.filter(assigned_to=self.user).values_list('company_id', flat=True)
+        self.company_ids = {str(pk) for pk in itertools.chain(watched, assigned)}
+        self.scope_loaded_at = time.monotonic()
+
+    def _visible(self, event):
+        return self.user.pk in event['user_ids'] or event['company_id'] in self.company_ids
+
+    def poll(self):
+        """SSE text of the events published since the last poll"""
+        try:
+            refresh = getattr(settings, 'STREAM_SCOPE_REFRESH_SECONDS', 30)
+            if self.scope_loaded_at is None or time.monotonic() - self.scope_loaded_at > refresh:
+                self._load_scope()
+            events = self.broker.fetch(self.last_id)
+            if events:
+                self.last_id = events[-1]['id']
+            if any(self.user.pk in e['user_ids'] and e['event'] == 'lead.status_changed' for e in events):
+                # A lead was (re)assigned to this user: pick up its company now
+                self._load_scope()
+            return ''.join(format_event(event) for event in events if self._visible(event))
+        finally:
+            # A stream outlives the request cycle that normally recycles connections
+            close_old_connections()
+
+    def _timings(self):
+        return (
+            getattr(settings, 'STREAM_POLL_SECONDS', 1.0),
+            getattr(settings, 'STREAM_HEARTBEAT_SECONDS', 15),
+            time.monotonic() + getattr(settings, 'STREAM_MAX_SECONDS', 300),
+        )
+
+    def __iter__(self):
+        poll_interval, heartbeat, deadline = self._timings()
+        yield f'retry: {int(poll_interval * 1000)}\n\n'
+        last_sent = time.monotonic()
+        while time.monotonic() < deadline:
+            chunk = self.poll()
+            if not chunk and time.monotonic() - last_sent >= heartbeat:
+                chunk = ': keep-alive\n\n'
+            if chunk:
+                last_sent = time.monotonic()
+                yield chunk
+            time.sleep(poll_interval)
+
+    async def __aiter__(self):
+        poll_interval, heartbeat, deadline = self._timings()
+        yield f'retry: {int(poll_interval * 1000)}\n\n'
+        last_sent = time.monotonic()
+        while time.monotonic() < deadline:
+            chunk = await sync_to_async(self.poll)()
+            if not chunk and time.monotonic() - last_sent >= heartbeat:
+                chunk = ': keep-alive\n\n'
+            if chunk:
+                last_sent = time.monotonic()
+                yield chunk
+            await asyncio.sleep(poll_interval)
+
+
+def stream_content(request, stream):
+    """The iterator the current server can stream without buffering"""
+    if isinstance(request, ASGIRequest):
+        return stream.__aiter__()
+    return iter(stream)
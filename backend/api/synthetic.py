@@ -0,0 +1,262 @@
+"""
+Deterministic synthetic portfolio for benchmarks and local load testing.
+
+``generate_portfolio(companies, seed)`` creates companies with tags, leads and
+investments plus every analysis type with child-row counts close to real
+analyses. The same seed, scale and anchor date always produce the same rows
+(including primary keys). Rows are written with ``bulk_create`` - which sends
+no model signals - so the response cache tags are bumped once at the end.
+Analyses are backdated from the anchor date afterwards, since ``auto_now_add``
+overrides any ``created_at`` given to ``bulk_create``.
+"""
+import random
+import uuid
+from datetime import date, datetime, time, timedelta, timezone
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.db import models, transaction
+
+from . import numeric, rollup, sentiment
+from .cache import bump_model_tags
+from .models import (
+    Company, CompanyTag, Lead, Investment,
+    HighLevelAnalysis, PerceptionAnalysis, MarketAnalysis, KeyIndividualsAnalysis, CompetitiveAnalysis,
+    SentimentBySource, CompetitorSentiment, RecentMention, KeyTopic, BrandMetric, RiskAlert,
+    RevenueInformation, MarketForce, SalesChannel, IndustryTrend,
+    KeyIndividual, IndividualRisk, PublicMention, Competitor, StrategicRecommendation
+)
+
+INDUSTRIES = ['Technology', 'Fintech', 'Healthcare', 'E-commerce', 'Logistics', 'Edtech', 'Agritech', 'Energy']
+CITIES = ['Jakarta', 'Singapore', 'Bandung', 'Surabaya', 'Kuala Lumpur', 'Manila', 'Ho Chi Minh City', 'Bangkok']
+TAGS = ['B2B', 'B2C', 'SaaS', 'Marketplace', 'AI', 'Mobile', 'Hardware', 'Impact', 'Deep Tech', 'Payments']
+SOURCES = ['Twitter', 'LinkedIn', 'News', 'Reddit', 'Blogs', 'Forums']
+FORCES = ['Competitive Rivalry', 'Supplier Power', 'Buyer Power', 'Threat of Substitution', 'Threat of New Entry']
+PLATFORMS = ['App Store', 'Google Play', 'Website', 'Tokopedia', 'Shopee']
+ROLES = ['CEO', 'CTO', 'CFO', 'COO', 'VP Engineering', 'Head of Product', 'Board Member']
+
+# Child rows per analysis: (model, count)
+CHILD_COUNTS = {
+    PerceptionAnalysis: [
+        (SentimentBySource, 4), (CompetitorSentiment, 4), (RecentMention, 12),
+        (KeyTopic, 5), (BrandMetric, 4), (RiskAlert, 3),
+    ],
+    MarketAnalysis: [(RevenueInformation, 4), (MarketForce, 5), (SalesChannel, 3), (IndustryTrend, 4)],
+    KeyIndividualsAnalysis: [(KeyIndividual, 6), (IndividualRisk, 2), (PublicMention, 5)],
+    CompetitiveAnalysis: [(Competitor, 5), (StrategicRecommendation, 3)],
+    HighLevelAnalysis: [],
+}
+
+BATCH_SIZE = 1000
+
+
+class PortfolioGenerator:
+    """Builds unsaved, seeded model instances into ``rows`` (model -> list, parents first)"""
+
+    def __init__(self, seed, anchor_date):
+        self.rng = random.Random(seed)
+        self.anchor = anchor_date
+        self.rows = {}
+        # Analysis model -> {created_at: [pk]}, applied after the insert
+        self.created = {}
+
+    def uuid(self):
+        return uuid.UUID(int=self.rng.getrandbits(128), version=4)
+
+    def add(self, instance):
+        if isinstance(instance._meta.pk, models.UUIDField):
+            # Replace the random uuid4 default so primary keys are seeded too
+            instance.pk = self.uuid()
+        if getattr(instance, 'numeric_shadow_fields', ()):
+            # bulk_create skips the pre_save receiver that fills them
+            numeric.fill_shadow_columns(instance)
+        self.rows.setdefault(type(instance), []).append(instance)
+        return instance
+
+    def past_date(self, max_days=730):
+        return self.anchor - timedelta(days=self.rng.randint(0, max_days))
+
+    def past_datetime(self, max_days=730, before=None):
+        """Seeded timestamp up to ``max_days`` before ``before`` (default: the anchor date)"""
+        day = (before.date() if before else self.anchor) - timedelta(days=self.rng.randint(0, max_days))
+        return datetime.combine(day, time(9), tzinfo=timezone.utc)
+
+    def pick(self, values):
+        return self.rng.choice(values)
+
+    def score(self, low=30, high=95):
+        return self.rng.randint(low, high)
+
+    # Rows
+
+    def company(self, index):
+        industry = self.pick(INDUSTRIES)
+        employees = self.rng.choice([10, 25, 50, 100, 250, 500])
+        company = self.add(Company(
+            name=f'{industry} Venture {index:05d}',
+            description=f'Synthetic {industry.lower()} company #{index} for benchmarking.',
+            industry=industry,
+            stage=self.pick(['pre-seed', 'seed', 'series-a', 'series-b', 'series-c']),
+            founded_year=self.rng.randint(2008, self.anchor.year),
+            headquarters=self.pick(CITIES),
+            website=f'https://venture{index:05d}.example.com',
+            employees_min=employees,
+            employees_max=employees * 2,
+            funding_raised=Decimal(self.rng.randint(1, 500) * 100000),
+        ))
+        for name in self.rng.sample(TAGS, 3):
+            self.add(CompanyTag(company=company, name=name))
+        return company
+
+    def leads_and_investments(self, company, users):
+        for _ in range(self.rng.randint(1, 3)):
+            lead = self.add(Lead(
+                company=company,
+                status=self.pick([choice for choice, _ in Lead.STATUS_CHOICES]),
+                priority=self.pick(['low', 'medium', 'high', 'critical']),
+                assigned_to=self.pick(users),
+                source=self.pick(['Referral', 'Inbound', 'Event', 'Scouting']),
+                notes='Synthetic lead',
+                ai_match_score=self.score(20, 99),
+            ))
+            if lead.status in ('recommended', 'invested') or self.rng.random() < 0.2:
+                self.add(Investment(
+                    company=company,
+                    lead=lead,
+                    amount=Decimal(self.rng.randint(5, 200) * 10000),
+                    equity_percentage=round(self.rng.uniform(1, 20), 1),
+                    valuation=Decimal(self.rng.randint(2, 100) * 1000000),
+                    investment_date=self.past_date(),
+                    status=self.pick(['proposed', 'approved', 'completed', 'exited']),
+                    created_by=self.pick(users),
+                ))
+
+    def analysis(self, model, company, users, created_at=None):
+        fields = {
+            'company': company,
+            'title': f'{model._meta.verbose_name.title()} of {company.name}',
+            'summary': 'Synthetic analysis summary. ' * 4,
+            'overall_score': self.score(),
+            'confidence_score': round(self.rng.uniform(0.5, 0.95), 2),
+            'analyst': self.pick(users),
+            'is_completed': self.rng.random() < 0.7,
+        }
+        if model is PerceptionAnalysis:
+            fields['sentiment_score'] = self.score()
+        elif model is MarketAnalysis:
+            fields['market_size'] = f'${self.rng.randint(1, 90)}B'
+            fields['market_growth_rate'] = round(self.rng.uniform(2, 40), 1)
+        elif model is KeyIndividualsAnalysis:
+            fields['team_strength_score'] = self.score()
+        elif model is CompetitiveAnalysis:
+            fields['competitive_position'] = self.pick(['Leader', 'Challenger', 'Niche', 'Follower'])
+        analysis = self.add(model(**fields))
+        if created_at:
+            self.created.setdefault(model, {}).setdefault(created_at, []).append(analysis.pk)
+        for child_model, count in CHILD_COUNTS[model]:
+            for order in range(count):
+                self.add(child_model(analysis=analysis, **self.child_fields(child_model, order)))
+        return analysis
+
+    def child_fields(self, model, order):
+        rng = self.rng
+        if model is SentimentBySource:
+            return {'source_name': SOURCES[order % len(SOURCES)], 'positive_percentage': self.score(10, 90),
+                    'mentions_count': rng.randint(10, 5000), 'display_order': order}
+        if model is CompetitorSentiment:
+            return {'company_name': f'Rival {order}', 'positive_percentage': self.score(10, 90),
+                    'mentions_count': rng.randint(10, 5000), 'is_current_company': order == 0, 'display_order': order}
+        if model is RecentMention:
+            return {'title': f'Mention {order}', 'source': self.pick(SOURCES), 'date': self.past_date(),
+                    'excerpt': 'Synthetic mention excerpt.', 'engagement_level': self.pick(['low', 'medium', 'high', 'very_high']),
+                    'sentiment_label': self.pick(['Positive', 'Neutral', 'Negative']), 'sentiment_score': self.score(0, 100),
+                    'display_order': order}
+        if model is KeyTopic:
+            return {'topic_name': f'Topic {order}', 'sentiment_score': self.score(0, 100),
+                    'mentions_count': rng.randint(5, 900), 'trend': self.pick(['up', 'down', 'stable']), 'display_order': order}
+        if model is BrandMetric:
+            return {'metric_name': f'Metric {order}', 'current_score': self.score(), 'industry_benchmark': self.score(),
+                    'trend': self.pick(['up', 'down', 'stable']), 'display_order': order}
+        if model is RiskAlert:
+            return {'title': f'Risk {order}', 'priority': self.pick(['low', 'medium', 'high', 'critical']),
+                    'description': 'Synthetic risk alert.', 'display_order': order}
+        if model is RevenueInformation:
+            return {'title': f'Revenue report {order}', 'source': self.pick(SOURCES), 'date': self.past_date(),
+                    'revenue_figure': f'${rng.randint(1, 900)}M', 'description': 'Synthetic revenue item.',
+                    'reliability': self.pick(['low', 'medium', 'high', 'verified']),
+                    'growth_rate': f'{rng.randint(-10, 120)}%', 'display_order': order}
+        if model is MarketForce:
+            return {'force_name': FORCES[order % len(FORCES)], 'intensity': self.pick(['low', 'medium', 'high']),
+                    'score': self.score(), 'factors': ['factor a', 'factor b'], 'display_order': order}
+        if model is SalesChannel:
+            return {'platform_name': PLATFORMS[order % len(PLATFORMS)], 'installs_count': f'{rng.randint(1, 900)}K',
+                    'revenue_amount': f'${rng.randint(1, 90)}M', 'rating': round(rng.uniform(3, 5), 1),
+                    'reviews_count': rng.randint(10, 90000), 'change_percentage': round(rng.uniform(-20, 80), 1),
+                    'display_order': order}
+        if model is IndustryTrend:
+            return {'title': f'Trend {order}', 'impact': self.pick(['low', 'medium', 'high']),
+                    'relevance': self.score(), 'display_order': order}
+        if model is KeyIndividual:
+            return {'name': f'Person {order}', 'role': ROLES[order % len(ROLES)], 'is_board_member': order >= 5,
+                    'credibility_score': self.score(), 'public_perception': self.score(),
+                    'previous_companies': ['Example Corp'], 'strengths': ['Execution']}
+        if model is IndividualRisk:
+            return {'title': f'Key person risk {order}', 'description': 'Synthetic individual risk.'}
+        if model is PublicMention:
+            return {'title': f'Interview {order}', 'person': f'Person {order}', 'source': self.pick(SOURCES),
+                    'date': self.past_date(), 'summary': 'Synthetic public mention.', 'sentiment': 'Positive'}
+        if model is Competitor:
+            return {'name': f'Competitor {order}', 'position': self.pick(['Leader', 'Challenger', 'Niche']),
+                    'headquarters': self.pick(CITIES), 'funding': f'${rng.randint(1, 500)}M',
+                    'market_share': f'{rng.randint(1, 40)}%', 'score': self.score(),
+                    'trend': self.pick(['up', 'down', 'stable']), 'strengths': ['Brand'], 'weaknesses': ['Cost'],
+                    'display_order': order}
+        if model is StrategicRecommendation:
+            return {'category': self.pick(['Growth', 'Product', 'Risk', 'Partnerships']),
+                    'priority': self.pick(['low', 'medium', 'high', 'critical']),
+                    'recommendations': ['Synthetic recommendation'], 'display_order': order}
+        raise ValueError(f'No synthetic fields for {model.__name__}')
+
+
+def ensure_users(count=5):
+    users = []
+    for index in range(count):
+        user, _ = User.objects.get_or_create(
+            username=f'synthetic-analyst-{index}', defaults={'email': f'analyst{index}@example.com'}
+        )
+        users.append(user)
+    return users
+
+
+def generate_portfolio(companies=100, seed=0, anchor_date=None, superseded_ratio=0.2, progress=None):
+    """Create the portfolio; returns {model name: rows created}"""
+    generator = PortfolioGenerator(seed, anchor_date or date.today())
+    users = ensure_users()
+
+    for index in range(companies):
+        company = generator.company(index)
+        generator.leads_and_investments(company, users)
+        for model in CHILD_COUNTS:
+            current = generator.past_datetime(max_days=180)
+            generator.analysis(model, company, users, current)
+            # Some companies have an older, superseded analysis as well
+            if generator.rng.random() < superseded_ratio:
+                superseded = generator.past_datetime(max_days=335, before=current - timedelta(days=30))
+                generator.analysis(model, company, users, superseded)
+
+    counts = {}
+    with transaction.atomic():
+        # Insertion order follows dependencies (parents before children)
+        for model, rows in generator.rows.items():
+            model.objects.bulk_create(rows, batch_size=BATCH_SIZE)
+            counts[model.__name__] = len(rows)
+            if progress:
+                progress(model.__name__, len(rows))
+        for model, created in generator.created.items():
+            for created_at, pks in created.items():
+                model.objects.filter(pk__in=pks).update(created_at=created_at, updated_at=created_at)
+    # Derived from the analyses, which bulk_create saved without signals
+    rollup.refresh_company_scores([company.pk for company in generator.rows[Company]])
+    bump_model_tags(*generator.rows)
+    sentiment.invalidate_all()
+    return counts
@@ -1,3 +1,1136 @@
-from django.test import TestCase
+import csv
+import io
+import json
+import shutil
+import tempfile
+import uuid
+from datetime import date, timedelta
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+import numpy as np
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import Group, Permission, User
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.http import HttpResponse
+from django.test import AsyncClient, Client, RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework import serializers
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.test import APIClient
+
+from core.db_router import PRIMARY_ALIAS, REPLICA_ALIAS, ReadReplicaRouter, ReplicaRoutingMiddleware
+from core.metrics import instrument_serializers
+from core.nplusone import NPlusOneAssertionsMixin, NPlusOneError
+
+from .admin_tools import EstimatedCountPaginator, estimated_row_count
+from . import (
+    archive, authentication, competitors, exports, jobs, numeric, portfolio, profiling, rollup, scoring, sentiment,
+    similarity, stream
+)
+from .authentication import CachedTokenAuthentication, revoke_token_keys
+from .cache import bump_tags, tag_versions
+from .models import (
+    ArchivedRow, Company, CompanyTag, CompanyVector, CompetitiveAnalysis, Competitor, CompetitorEdge,
+    CompetitorSentiment, HighLevelAnalysis, Investment, Job, Lead, MarketAnalysis, PerceptionAnalysis, RecentMention,
+    UserProfile
+)
+from .serializers import LeadSerializer
+from .optimizer import PK_ONLY, optimize_queryset, query_plan
+from .synthetic import CHILD_COUNTS, generate_portfolio
+from .views import CompanyViewSet
+
+
+def make_company(name='Acme', **fields):
+    values = {
+        'description': 'Test company', 'industry': 'Technology', 'stage': 'seed',
+        'founded_year': 2020, 'headquarters': 'Jakarta',
+    }
+    values.update(fields)
+    return Company.objects.create(name=name, **values)
+
+
+class JobCreateTests(TestCase):
+    def setUp(self):
+        self.results_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.results_dir, ignore_errors=True)
+        settings_override = override_settings(JOB_RESULTS_DIR=self.results_dir)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user('staff', is_staff=True))
+
+    def create(self, kind, params, **extra):
+        return self.client.post('/api/jobs/', {'kind': kind, 'params': json.dumps(params), **extra})
+
+    def test_params_must_be_an_object(self):
+        response = self.create('export', [1])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {'error': 'params must be an object'})
+
+    def test_only_client_params_are_accepted(self):
+        for params in (
+            {'dataset': 'leads', 'chunk_size': 'x'},
+            {'dataset': 'leads', 'file': '/etc/passwd'},
+            {'dataset': ['leads']},
+        ):
+            with self.subTest(params=params):
+                self.assertEqual(self.create('export', params).status_code, 400)
+        self.assertFalse(Job.objects.exists())
+
+    def test_export_is_queued(self):
+        response = self.create('export', {'dataset': 'leads', 'output_format': 'jsonl'})
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(Job.objects.get().params, {'dataset': 'leads', 'output_format': 'jsonl'})
+
+    def import_job(self, content):
+        upload = SimpleUploadedFile('companies.csv', content.encode(), content_type='text/csv')
+        response = self.create('import', {'dataset': 'companies'}, file=upload)
+        self.assertEqual(response.status_code, 202)
+        return Job.objects.get(pk=response.json()['id'])
+
+    def test_import_counts_records_and_removes_the_upload(self):
+        job = self.import_job(
+            'id,name,description,industry,stage,founded_year,headquarters\n'
+            ',Acme,"Two\nlines",Technology,seed,2020,Jakarta\n'
+            ',Beta,One line,Finance,seed,2021,Bandung\n'
+        )
+        upload = job.params['file']
+        job = jobs.run_job(job)
+        self.assertEqual(job.status, 'succeeded', job.error)
+        self.assertEqual(job.progress_total, 2)
+        self.assertEqual(job.result['errors'], [])
+        self.assertEqual(Company.objects.get(name='Acme').description, 'Two\nlines')
+        with self.assertRaises(FileNotFoundError):
+            open(upload)
+
+    def test_rolled_back_chunks_are_reported(self):
+        job = jobs.run_job(self.import_job('name\nAcme\n'))
+        self.assertEqual(job.status, 'succeeded')
+        self.assertIn('id', job.result['errors'][0])
+        self.assertFalse(Company.objects.exists())
+
+    def test_failed_and_cancelled_imports_remove_the_upload(self):
+        failed = self.import_job('name,founded_year\nAcme,not a year\n')
+        failed.params['dataset'] = 'missing'
+        with self.assertLogs('api.jobs', 'ERROR'):
+            self.assertEqual(jobs.run_job(failed).status, 'failed')
+
+        cancelled = self.import_job('name\nAcme\n')
+        jobs.cancel(cancelled)
+        for job in (failed, cancelled):
+            with self.assertRaises(FileNotFoundError):
+                open(job.params['file'])
+
+
+@mock.patch('core.db_router.replica_configured', return_value=True)
+class ReplicaRoutingTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+
+    def route(self, method, view, model=Company, **headers):
+        """Alias the router picks for reads of ``model`` while ``view`` handles the request"""
+        request = getattr(RequestFactory(), method)('/', **headers)
+        aliases = []
+
+        def get_response(request):
+            middleware.process_view(request, view, (), {})
+            aliases.append(ReadReplicaRouter().db_for_read(model))
+            return HttpResponse()
+
+        middleware = ReplicaRoutingMiddleware(get_response)
+        middleware(request)
+        return aliases[0]
+
+    def test_safe_listed_actions_read_from_the_replica(self, _):
+        for action in ('list', 'retrieve', 'full_analysis'):
+            with self.subTest(action=action):
+                self.assertEqual(self.route('get', CompanyViewSet.as_view({'get': action})), REPLICA_ALIAS)
+
+    def test_other_reads_use_the_primary(self, _):
+        self.assertEqual(self.route('get', CompanyViewSet.as_view({'get': 'similar'})), PRIMARY_ALIAS)
+        self.assertEqual(self.route('get', lambda request: None), PRIMARY_ALIAS)
+        self.assertEqual(self.route('post', CompanyViewSet.as_view({'post': 'create'})), PRIMARY_ALIAS)
+        # Credentials are always read from the primary
+        self.assertEqual(self.route('get', CompanyViewSet.as_view({'get': 'list'}), model=Token), PRIMARY_ALIAS)
+
+    def test_writer_is_pinned_to_the_primary(self, _):
+        list_view = CompanyViewSet.as_view({'get': 'list'})
+        self.route('post', CompanyViewSet.as_view({'post': 'create'}), HTTP_AUTHORIZATION='Token writer')
+        self.assertEqual(self.route('get', list_view, HTTP_AUTHORIZATION='Token writer'), PRIMARY_ALIAS)
+        self.assertEqual(self.route('get', list_view, HTTP_AUTHORIZATION='Token reader'), REPLICA_ALIAS)
+
+    def test_flag_is_reset_after_the_request(self, _):
+        self.route('get', CompanyViewSet.as_view({'get': 'list'}))
+        self.assertEqual(ReadReplicaRouter().db_for_read(Company), PRIMARY_ALIAS)
+
+
+class ArchiveRowsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        generate_portfolio(companies=8, seed=3, superseded_ratio=0.6)
+
+    def test_dry_run_counts_what_the_real_run_moves(self):
+        # Recent enough that some rows are both old and superseded
+        horizon = RecentMention.objects.order_by('date').values_list('date', flat=True)[
+            RecentMention.objects.count() // 2
+        ]
+        planned = archive.archive_rows(horizon=horizon, dry_run=True)
+        self.assertFalse(ArchivedRow.objects.exists())
+        moved = archive.archive_rows(horizon=horizon)
+        self.assertEqual(planned, moved)
+        self.assertEqual(ArchivedRow.objects.count(), sum(moved.values()))
+        self.assertFalse(RecentMention.objects.filter(date__lt=horizon).exists())
+
+    def test_superseded_ids_stay_in_sql(self):
+        parent = RecentMention._meta.get_field('analysis').related_model
+        superseded = [pk.hex for pk in archive.superseded_analysis_ids(parent).values_list('pk', flat=True)]
+        self.assertTrue(superseded)
+        with CaptureQueriesContext(connection) as queries:
+            moved = archive.archive_rows(models=[RecentMention], by_age=False, batch_size=5)
+        self.assertTrue(moved)
+        self.assertFalse(RecentMention.objects.filter(analysis_id__in=superseded).exists())
+        # The batches of rows to move are selected without the id list
+        batch_select = f'SELECT "{RecentMention._meta.db_table}"."id"'
+        batches = [query['sql'] for query in queries if query['sql'].startswith(batch_select)]
+        self.assertTrue(batches)
+        for sql in batches:
+            self.assertFalse(any(pk in sql for pk in superseded), sql)
+
+
+class ResponseCacheTests(TransactionTestCase):
+    """Runs outside a test transaction so commits really happen"""
+
+    def setUp(self):
+        cache.clear()
+
+    def version(self, tag='t'):
+        # Not tag_versions(): reading a tag inside a transaction changes what the next bump does
+        return cache.get(f'api-cache:tag:{tag}')
+
+    def test_bump_outside_a_transaction(self):
+        before = tag_versions(['t'])['t']
+        bump_tags('t')
+        self.assertNotEqual(self.version(), before)
+
+    def test_bump_inside_a_transaction(self):
+        before = tag_versions(['t'])['t']
+        with transaction.atomic():
+            bump_tags('t')
+            # New to the transaction: bumped at once
+            first = self.version()
+            self.assertNotEqual(first, before)
+            bump_tags('t')
+            # Not read since: left for the commit
+            self.assertEqual(self.version(), first)
+            tag_versions(['t'])
+            bump_tags('t')
+            # Read since: bumped again so this connection never reads stale entries
+            second = self.version()
+            self.assertNotEqual(second, first)
+        # And once more on commit
+        self.assertNotEqual(self.version(), second)
+
+    def test_rollback_does_not_bump_on_commit(self):
+        with transaction.atomic():
+            bump_tags('t')
+            during = self.version()
+            transaction.set_rollback(True)
+        self.assertEqual(self.version(), during)
+
+    def test_cached_list_is_invalidated_by_a_write(self):
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user('reader'))
+        self.assertEqual(client.get('/api/companies/')['X-Cache'], 'MISS')
+        self.assertEqual(client.get('/api/companies/')['X-Cache'], 'HIT')
+        make_company()
+        response = client.get('/api/companies/')
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.json()['count'], 1)
+
+
+class CachedTokenAuthenticationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        authentication._local.clear()
+        self.user = User.objects.create_user('analyst')
+        self.key = Token.objects.create(user=self.user).key
+        self.auth = CachedTokenAuthentication()
+
+    def test_cached_lookup_builds_fresh_instances(self):
+        first, _ = self.auth.authenticate_credentials(self.key)
+        first._perm_cache = {'api.delete_company'}
+        with self.assertNumQueries(0):
+            user, token = self.auth.authenticate_credentials(self.key)
+            self.assertIs(token.user, user)
+        self.assertEqual(user.pk, self.user.pk)
+        self.assertIsNot(user, first)
+        self.assertFalse(hasattr(user, '_perm_cache'))
+
+    def test_saving_the_user_revokes(self):
+        self.auth.authenticate_credentials(self.key)
+        self.user.is_active = False
+        self.user.save()
+        with self.assertRaises(AuthenticationFailed):
+            self.auth.authenticate_credentials(self.key)
+
+    def test_group_and_permission_changes_revoke(self):
+        group = Group.objects.create(name='analysts')
+        permission = Permission.objects.get(codename='delete_company')
+        changes = {
+            'groups.add': lambda: self.user.groups.add(group),
+            'user_set.remove': lambda: group.user_set.remove(self.user),
+            'user_permissions.add': lambda: self.user.user_permissions.add(permission),
+            'user_set.clear': lambda: permission.user_set.clear(),
+        }
+        for name, change in changes.items():
+            with self.subTest(change=name):
+                self.auth.authenticate_credentials(self.key)
+                change()
+                with self.assertNumQueries(1):
+                    self.auth.authenticate_credentials(self.key)
+
+    def test_revoke_during_the_lookup_is_not_lost(self):
+        lookup = TokenAuthentication.authenticate_credentials
+
+        def revoked_meanwhile(auth, key):
+            resolved = lookup(auth, key)
+            revoke_token_keys([key])
+            return resolved
+
+        with mock.patch.object(TokenAuthentication, 'authenticate_credentials', revoked_meanwhile):
+            self.auth.authenticate_credentials(self.key)
+        with self.assertNumQueries(1):
+            self.auth.authenticate_credentials(self.key)
+
+
+class StreamTicketTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('analyst')
+        self.client = APIClient()
+
+    def open_stream(self, **params):
+        response = APIClient().get('/api/stream/', params, HTTP_ACCEPT='text/event-stream')
+        response.close()
+        return response
+
+    def test_ticket_opens_the_stream_once(self):
+        self.client.force_authenticate(self.user)
+        response = self.client.post('/api/stream/ticket/')
+        self.assertEqual(response.status_code, 200)
+        ticket = response.json()['ticket']
+
+        response = self.open_stream(ticket=ticket)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        self.assertEqual(self.open_stream(ticket=ticket).status_code, 403)
+
+    def test_ticket_requires_authentication(self):
+        self.assertIn(self.client.post('/api/stream/ticket/').status_code, (401, 403))
+
+    def test_api_token_is_not_accepted_in_the_url(self):
+        token = Token.objects.create(user=self.user)
+        self.assertEqual(self.open_stream(token=token.key).status_code, 403)
+        self.assertEqual(self.open_stream(ticket=token.key).status_code, 403)
+
+    @override_settings(STREAM_TICKET_SECONDS=0)
+    def test_expired_ticket_is_rejected(self):
+        self.client.force_authenticate(self.user)
+        ticket = self.client.post('/api/stream/ticket/').json()['ticket']
+        self.assertEqual(self.open_stream(ticket=ticket).status_code, 403)
+
+
+@override_settings(STREAM_BROKER='api.stream.InProcessBroker')
+class ChangeStreamTests(TestCase):
+    def setUp(self):
+        stream._brokers.clear()
+        self.user = User.objects.create_user('analyst')
+        self.watched = make_company('Watched')
+        self.other = make_company('Other')
+        UserProfile.objects.create(user=self.user).watched_companies.add(self.watched)
+
+    def test_only_events_of_the_users_companies_are_sent(self):
+        change_stream = stream.ChangeStream(self.user)
+        broker = stream.get_broker()
+        broker.publish('investment.updated', str(self.watched.pk), payload={'id': 1})
+        broker.publish('investment.updated', str(self.other.pk), payload={'id': 2})
+        broker.publish('investment.updated', str(self.other.pk), [self.user.pk], payload={'id': 3})
+        sent = change_stream.poll()
+        self.assertEqual(sent.count('event: investment.updated'), 2)
+        self.assertIn('"id": 1', sent)
+        self.assertNotIn('"id": 2', sent)
+        self.assertIn('"id": 3', sent)
+        self.assertEqual(change_stream.poll(), '')
+
+    def test_lead_assignment_is_published_on_commit_and_resumable(self):
+        change_stream = stream.ChangeStream(self.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            Lead.objects.create(company=self.other, assigned_to=self.user)
+        sent = change_stream.poll()
+        self.assertIn('event: lead.status_changed', sent)
+        # Reconnecting with the last id received sends nothing twice
+        self.assertEqual(stream.ChangeStream(self.user, change_stream.last_id).poll(), '')
+
+
+@override_settings(API_CACHE_ENABLED=False)
+class NPlusOneTests(NPlusOneAssertionsMixin, TestCase):
+    list_endpoints = (
+        'companies', 'high-level-analyses', 'perception-analyses', 'market-analyses',
+        'key-individuals-analyses', 'competitive-analyses', 'competitors', 'sales-channels',
+        'leads', 'investments', 'profiles', 'jobs', 'request-profiles',
+    )
+
+    @classmethod
+    def setUpTestData(cls):
+        generate_portfolio(companies=12, seed=1)
+        cls.user = User.objects.create_user('staff', is_staff=True, is_superuser=True)
+        UserProfile.objects.create(user=cls.user)
+        Lead.objects.update(assigned_to=cls.user)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def assertServedWithoutNPlusOne(self, path):
+        with self.assertNoNPlusOne():
+            response = self.client.get(path)
+        self.assertEqual(response.status_code, 200, path)
+
+    def test_list_endpoints(self):
+        for name in self.list_endpoints:
+            with self.subTest(endpoint=name):
+                self.assertServedWithoutNPlusOne(f'/api/{name}/')
+
+    def test_full_analysis(self):
+        company = Company.objects.order_by('name').first()
+        self.assertServedWithoutNPlusOne(f'/api/companies/{company.pk}/full_analysis/')
+
+    def test_dashboard(self):
+        for action in ('stats', 'recent_analyses', 'upcoming_tasks'):
+            with self.subTest(action=action):
+                self.assertServedWithoutNPlusOne(f'/api/dashboard/{action}/')
+
+    def test_n_plus_one_is_caught(self):
+        with self.assertRaises(NPlusOneError) as caught:
+            with self.assertNoNPlusOne():
+                LeadSerializer(Lead.objects.all(), many=True).data
+        self.assertIn('LeadSerializer.company_name', str(caught.exception))
+
+        with self.assertRaises(NPlusOneError) as caught:
+            with self.assertNoNPlusOne():
+                [lead.company.name for lead in Lead.objects.all()]
+        self.assertIn('api/tests.py', str(caught.exception))
+
+
+class SyntheticPortfolioTests(TestCase):
+    anchor = date(2024, 6, 30)
+
+    @classmethod
+    def setUpTestData(cls):
+        generate_portfolio(companies=10, seed=5, anchor_date=cls.anchor, superseded_ratio=0.5)
+
+    def test_analyses_are_dated_from_the_anchor(self):
+        for model in CHILD_COUNTS:
+            for created_at, updated_at in model.objects.values_list('created_at', 'updated_at'):
+                self.assertEqual(created_at, updated_at)
+                self.assertLessEqual(created_at.date(), self.anchor)
+                self.assertGreaterEqual(created_at.date(), self.anchor - timedelta(days=180 + 30 + 335))
+
+    def test_superseded_analyses_are_older(self):
+        for model in CHILD_COUNTS:
+            superseded = archive.superseded_analysis_ids(model)
+            self.assertTrue(superseded)
+            for analysis in model.objects.filter(pk__in=superseded):
+                current = model.objects.filter(company=analysis.company).exclude(pk__in=superseded).get()
+                self.assertGreaterEqual(current.created_at - analysis.created_at, timedelta(days=30))
+
+
+class PortfolioAnalyticsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.acme = make_company('Acme', industry='Fintech')
+        cls.globex = make_company('Globex', industry='Healthcare', stage='series-a')
+        for company, amount, currency, equity, valuation, day, status in [
+            (cls.acme, 1000000, 'USD', 10, 10000000, date(2022, 1, 10), 'completed'),
+            (cls.acme, 2000000, 'USD', 5, 40000000, date(2023, 3, 5), 'approved'),
+            (cls.acme, 9000000, 'USD', 9, 100000000, date(2024, 1, 1), 'proposed'),
+            (cls.acme, 5000000000, 'IDR', 2, 250000000000, date(2023, 6, 1), 'completed'),
+            (cls.globex, 500000, 'USD', 5, 10000000, date(2022, 1, 20), 'exited'),
+            (cls.globex, 500000, 'USD', None, 20000000, date(2022, 6, 1), 'completed'),
+            (cls.globex, 600000, 'USD', 2, 30000000, date(2023, 1, 1), 'completed'),
+        ]:
+            Investment.objects.create(
+                company=company, amount=amount, currency=currency, equity_percentage=equity,
+                valuation=valuation, investment_date=day, status=status,
+            )
+
+    def test_exposure_is_per_currency(self):
+        exposure = portfolio.portfolio_analytics()['exposure']
+        self.assertEqual(exposure['total'], {'IDR': 5000000000.0, 'USD': 4100000.0})
+        by_industry = {entry['name']: entry for entry in exposure['by_industry']}
+        self.assertEqual(by_industry['Fintech']['count'], 3)
+        self.assertEqual(by_industry['Fintech']['amount'], {'IDR': 5000000000.0, 'USD': 3000000.0})
+        self.assertEqual(by_industry['Healthcare']['share'], {'USD': round(1100000 / 4100000, 4)})
+
+    def test_deployed_is_cumulative(self):
+        months = portfolio.portfolio_analytics()['deployed']['months']
+        self.assertEqual([month['month'] for month in months], ['2022-01', '2022-06', '2023-01', '2023-06'])
+        self.assertEqual(months[0]['amount'], {'USD': 1500000.0})
+        self.assertEqual(months[-1]['cumulative'], {'IDR': 5000000000.0, 'USD': 2600000.0})
+
+    def test_ownership_of_held_positions(self):
+        ownership = {entry['company_name']: entry for entry in portfolio.portfolio_analytics()['ownership']}
+        self.assertEqual(ownership['Acme']['ownership_percentage'], 17.0)
+        self.assertEqual(ownership['Acme']['rounds'], 3)
+        # Latest priced held round: the IDR one, in its currency
+        self.assertEqual(ownership['Acme']['implied_valuation'], {'IDR': 250000000000.0})
+        self.assertEqual(ownership['Globex']['implied_valuation'], {'USD': 30000000.0})
+        # The exited round is no longer held; the unpriced one is invested but has no stake
+        self.assertEqual(ownership['Globex']['ownership_percentage'], 2.0)
+        self.assertEqual(ownership['Globex']['invested'], {'USD': 1100000.0})
+        self.assertEqual(ownership['Globex']['rounds'], 2)
+
+    def test_unpriced_positions_are_listed(self):
+        Investment.objects.create(
+            company=make_company('Initech'), amount=250000, investment_date=date(2023, 2, 1), status='approved'
+        )
+        ownership = {entry['company_name']: entry for entry in portfolio.portfolio_analytics()['ownership']}
+        self.assertEqual(ownership['Initech'], {
+            'company_id': str(Company.objects.get(name='Initech').pk), 'company_name': 'Initech',
+            'ownership_percentage': 0.0, 'invested': {'USD': 250000.0}, 'rounds': 1, 'implied_valuation': None,
+        })
+
+    def test_step_ups_skip_proposed_rounds_and_other_currencies(self):
+        step_ups = portfolio.portfolio_analytics()['step_ups']
+        self.assertEqual([(entry['company_name'], entry['currency']) for entry in step_ups],
+                         [('Acme', 'USD'), ('Globex', 'USD')])
+        acme, globex = step_ups
+        self.assertEqual((acme['rounds'], acme['latest_valuation'], acme['total_step_up']), (2, 40000000.0, 4.0))
+        self.assertEqual(globex['rounds'], 3)
+        self.assertEqual(globex['latest_step_up'], 1.5)
+        self.assertEqual(globex['average_step_up'], round(3 ** 0.5, 3))
+
+    def test_empty_portfolio(self):
+        result = portfolio.portfolio_analytics(Investment.objects.none())
+        self.assertEqual((result['investments'], result['step_ups'], result['ownership']), (0, [], []))
+
+
+class LeadScoringTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('analyst')
+        # Without signals, so no rescore is pending in the class transaction
+        cls.profile, = UserProfile.objects.bulk_create([UserProfile(user=cls.user, preferred_industries=['Fintech'])])
+        cls.acme = make_company('Acme', industry='Fintech', funding_raised=5000000)
+        cls.globex = make_company('Globex', industry='Healthcare')
+        cls.acme_lead = Lead.objects.create(company=cls.acme, assigned_to=cls.user)
+        cls.globex_lead = Lead.objects.create(company=cls.globex)
+
+    def features(self, lead):
+        features, _ = scoring.build_features([(lead.pk, lead.company_id, lead.assigned_to_id)])
+        return dict(zip(scoring.FEATURES, features[0]))
+
+    def queued_ids(self):
+        return [sorted(job.params['ids']) for job in Job.objects.filter(kind='score_leads').order_by('created_at')]
+
+    def test_unchanged_inputs_are_skipped(self):
+        self.assertEqual(scoring.rescore_leads(), {'scanned': 2, 'rescored': 2})
+        self.assertEqual(scoring.rescore_leads(), {'scanned': 2, 'rescored': 0})
+        Company.objects.filter(pk=self.globex.pk).update(stage='series-b')
+        self.assertEqual(scoring.rescore_leads(), {'scanned': 2, 'rescored': 1})
+        self.assertEqual(scoring.rescore_leads(force=True)['rescored'], 2)
+
+    def test_analyses_count_once(self):
+        HighLevelAnalysis.objects.create(
+            company=self.acme, title='Draft', summary='-', overall_score=40, confidence_score=0.5
+        )
+        # Not rolled up while in progress: the mean of the latest scores stands in
+        self.assertAlmostEqual(self.features(self.acme_lead)['analysis'], 0.4)
+        HighLevelAnalysis.objects.create(
+            company=self.acme, title='Final', summary='-', overall_score=90, confidence_score=0.8, is_completed=True
+        )
+        self.acme.refresh_from_db()
+        self.assertEqual(self.acme.ai_score, 90)
+        self.assertAlmostEqual(self.features(self.acme_lead)['analysis'], 0.9)
+
+    def test_input_changes_queue_one_job_per_transaction(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.acme.stage = 'series-a'
+            self.acme.save()
+            CompanyTag.objects.create(company=self.acme, name='AI')
+            CompanyTag.objects.create(company=self.globex, name='AI')
+        self.assertEqual(self.queued_ids(), [sorted([str(self.acme_lead.pk), str(self.globex_lead.pk)])])
+
+    def test_preferences_queue_the_assigned_leads(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.profile.preferred_industries = ['Healthcare']
+            self.profile.save()
+        self.assertEqual(self.queued_ids(), [[str(self.acme_lead.pk)]])
+
+    def test_other_fields_do_not_queue(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.acme.description = 'Edited'
+            self.acme.save(update_fields=['description'])
+            self.profile.save(update_fields=['role'])
+            make_company('Initech')
+        self.assertEqual(self.queued_ids(), [])
+
+
+class SimilarityTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.companies = [
+            make_company(f'{industry} {index}', industry=industry, stage=stage, description=description)
+            for index, (industry, stage, description) in enumerate([
+                ('Fintech', 'seed', 'Payments and lending for small merchants'),
+                ('Fintech', 'seed', 'Lending and payments for merchants'),
+                ('Fintech', 'series-a', 'Payroll software for merchants'),
+                ('Healthcare', 'seed', 'Telemedicine for rural clinics'),
+                ('Healthcare', 'series-b', 'Clinic management software'),
+                ('Logistics', 'series-c', 'Cold chain trucking'),
+            ])
+        ]
+
+    def setUp(self):
+        patcher = mock.patch.object(similarity, '_index', similarity.SimilarityIndex())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def brute_force(self, company, k):
+        vectors = {
+            company_id: np.frombuffer(bytes(vector), dtype=np.float32)
+            for company_id, vector in CompanyVector.objects.filter(company__is_active=True)
+            .values_list('company_id', 'vector')
+        }
+        scores = [(other, float(vectors[other] @ vectors[company.pk])) for other in vectors if other != company.pk]
+        return sorted(scores, key=lambda entry: -entry[1])[:k]
+
+    def test_top_k_matches_brute_force(self):
+        first = self.companies[0]
+        found = similarity.similar_companies(first.pk, k=3)
+        expected = self.brute_force(first, 3)
+        self.assertEqual([company_id for company_id, _ in found], [company_id for company_id, _ in expected])
+        for (_, score), (_, expected_score) in zip(found, expected):
+            self.assertAlmostEqual(score, expected_score, places=5)
+        self.assertEqual(found[0][0], self.companies[1].pk)
+        # k is capped by the companies there are; the company itself never matches
+        everything = similarity.similar_companies(first.pk, k=similarity.MAX_K)
+        self.assertEqual(len(everything), len(self.companies) - 1)
+        self.assertNotIn(first.pk, [company_id for company_id, _ in everything])
+
+    def test_inactive_companies_are_left_out(self):
+        similarity.similar_companies(self.companies[0].pk)
+        self.companies[1].is_active = False
+        self.companies[1].save()
+        found = [company_id for company_id, _ in similarity.similar_companies(self.companies[0].pk)]
+        self.assertNotIn(self.companies[1].pk, found)
+        self.assertEqual(similarity.similar_companies(self.companies[1].pk), [])
+
+    def test_changes_are_synced_incrementally(self):
+        first, last = self.companies[0], self.companies[-1]
+        similarity.similar_companies(first.pk)
+        self.assertEqual(similarity.refresh_vectors(), 0)
+        last.industry, last.stage, last.description = first.industry, first.stage, first.description
+        last.save()
+        CompanyTag.objects.create(company=first, name='Payments')
+        self.assertFalse(CompanyVector.objects.filter(company=first).exists())
+        CompanyTag.objects.create(company=last, name='Payments')
+        self.assertEqual(similarity.similar_companies(first.pk, k=1)[0][0], last.pk)
+
+
+class SentimentSeriesTests(TestCase):
+    params = {'granularity': 'week', 'start': date(2024, 1, 1), 'end': date(2024, 1, 21), 'window': 2}
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.company = make_company()
+        analysis = PerceptionAnalysis.objects.create(company=cls.company, title='Perception', summary='-')
+        cls.mentions = [
+            RecentMention.objects.create(
+                analysis=analysis, title=f'Mention {index}', source=source, date=day, excerpt='-',
+                sentiment_label=label, sentiment_score=score,
+            )
+            for index, (source, day, label, score) in enumerate([
+                ('Twitter', date(2024, 1, 2), 'Positive', 80),
+                ('News', date(2024, 1, 4), 'Neutral', 60),
+                ('Twitter', date(2024, 1, 16), 'Negative', 20),
+            ])
+        ]
+
+    def setUp(self):
+        cache.clear()
+
+    def series(self):
+        return sentiment.sentiment_series(self.company.pk, **self.params)
+
+    def averages(self):
+        return [bucket['avg_sentiment'] for bucket in self.series()['buckets']]
+
+    def test_buckets_and_rolling_average(self):
+        result = self.series()
+        self.assertEqual((result['mentions'], result['avg_sentiment']), (3, 53.33))
+        first, empty, last = result['buckets']
+        self.assertEqual([first['bucket'], empty['bucket'], last['bucket']], ['2024-01-01', '2024-01-08', '2024-01-15'])
+        self.assertEqual(first['by_source'], [
+            {'source': 'News', 'mentions': 1, 'avg_sentiment': 60.0},
+            {'source': 'Twitter', 'mentions': 1, 'avg_sentiment': 80.0},
+        ])
+        self.assertEqual(first['by_label'], {'Neutral': 1, 'Positive': 1})
+        # Mention-weighted over the last two weeks; the week before the range is empty
+        self.assertEqual([bucket['rolling_avg_sentiment'] for bucket in result['buckets']], [70.0, 70.0, 20.0])
+        self.assertEqual([bucket['rolling_mentions'] for bucket in result['buckets']], [1.0, 1.0, 0.5])
+        self.assertEqual(sentiment.sentiment_series(**self.params)['mentions'], 3)
+
+    def test_closed_buckets_are_served_from_the_cache(self):
+        self.assertEqual(self.averages(), [70.0, None, 20.0])
+        # Bulk writes send no signals
+        RecentMention.objects.update(sentiment_score=0)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.averages(), [70.0, None, 20.0])
+        sentiment.invalidate_all()
+        self.assertEqual(self.averages(), [0.0, None, 0.0])
+
+    def test_mention_writes_drop_their_buckets(self):
+        self.assertEqual(self.averages(), [70.0, None, 20.0])
+        moved = self.mentions[0]
+        moved.date = date(2024, 1, 9)
+        moved.save()
+        self.assertEqual(self.averages(), [60.0, 80.0, 20.0])
+        self.mentions[2].delete()
+        self.assertEqual(self.averages(), [60.0, 80.0, None])
+
+    def test_open_bucket_is_not_cached(self):
+        today = timezone.localdate()
+        RecentMention.objects.filter(pk=self.mentions[2].pk).update(date=today)
+        params = {'granularity': 'day', 'start': today, 'end': today}
+        self.assertEqual(sentiment.sentiment_series(self.company.pk, **params)['mentions'], 1)
+        RecentMention.objects.filter(pk=self.mentions[1].pk).update(date=today)
+        self.assertEqual(sentiment.sentiment_series(self.company.pk, **params)['mentions'], 2)
+
+
+class CompanyMatcherTests(SimpleTestCase):
+    companies = [
+        (1, 'Tokopedia'), (2, 'Traveloka Indonesia'), (3, 'Grab Foods'), (4, 'Grab Fooda'),
+        (5, 'PT Go-Jek Indonesia Tbk'), (6, 'Acme'), (7, 'ACME Ltd'),
+    ]
+
+    def matcher(self, threshold=None):
+        return competitors.CompanyMatcher(self.companies, threshold)
+
+    def test_normalize_name(self):
+        self.assertEqual(competitors.normalize_name('PT Gojek Indonesia Tbk.'), 'gojek indonesia')
+        self.assertEqual(competitors.normalize_name('Café & Co'), 'cafe and')
+        self.assertEqual(competitors.normalize_name('Limited Co'), 'limited co')
+
+    def test_exact_matches_ignore_legal_forms_and_spaces(self):
+        matcher = self.matcher()
+        self.assertEqual(matcher.match('Tokopedia Inc.'), (1, 1.0))
+        self.assertEqual(matcher.match('GoJek Indonesia'), (5, 1.0))
+        # Two companies normalize to the same name
+        self.assertIsNone(matcher.match('Acme Corp'))
+
+    def test_threshold(self):
+        matcher = self.matcher()
+        self.assertEqual(matcher.match('Tokopedya'), (1, 0.8889))
+        self.assertEqual(matcher.match('Traveloka Indonesa'), (2, 0.973))
+        self.assertIsNone(matcher.match('Tokoped'))     # 0.875
+        self.assertIsNone(matcher.match('Traveloka'))
+        self.assertEqual(self.matcher(threshold=0.85).match('Tokoped'), (1, 0.875))
+        with override_settings(COMPETITOR_MATCH_THRESHOLD=0.85):
+            self.assertEqual(self.matcher().match('Tokoped'), (1, 0.875))
+
+    def test_ambiguous_names_stay_unresolved(self):
+        matcher = self.matcher()
+        self.assertIsNone(matcher.match('Grab Food'))
+        self.assertEqual(matcher.match('Grab Foods'), (3, 1.0))
+        self.assertEqual(matcher.stats(), (2, 1))
+
+
+class ResolveCompetitorsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.acme = make_company('Acme Indonesia')
+        cls.globex = make_company('Globex')
+        competitive = CompetitiveAnalysis.objects.create(company=cls.acme, title='Competition', summary='-')
+        cls.listed = [
+            Competitor.objects.create(analysis=competitive, name=name)
+            for name in ('PT Globex Tbk', 'Globexx', 'Acme Indonesia', 'Unknown Ventures')
+        ]
+        perception = PerceptionAnalysis.objects.create(company=cls.globex, title='Perception', summary='-')
+        for name, current in (('Acme Indonesia Ltd', False), ('Globex', True)):
+            CompetitorSentiment.objects.create(
+                analysis=perception, company_name=name, positive_percentage=50, mentions_count=10,
+                is_current_company=current,
+            )
+
+    def test_rows_and_edges(self):
+        result = competitors.resolve_competitors()
+        self.assertEqual(result['relinked'], {'competitor': 2, 'competitorsentiment': 1})
+        self.assertEqual(result['edges'], {'created': 2, 'updated': 0, 'deleted': 0})
+        resolved = [competitor.resolved_company_id for competitor in Competitor.objects.order_by('name')]
+        # A company never competes with itself; unknown names stay unresolved
+        self.assertEqual(resolved, [None, self.globex.pk, self.globex.pk, None])
+        edges = {
+            (edge.company_id, edge.competitor_id): (edge.mentions, edge.similarity)
+            for edge in CompetitorEdge.objects.all()
+        }
+        self.assertEqual(edges[(self.acme.pk, self.globex.pk)][0], 2)
+        self.assertEqual(edges[(self.globex.pk, self.acme.pk)], (1, 1.0))
+
+    def test_second_pass_writes_nothing(self):
+        competitors.resolve_competitors()
+        result = competitors.resolve_competitors()
+        self.assertEqual(result['relinked'], {'competitor': 0, 'competitorsentiment': 0})
+        self.assertEqual(result['edges'], {'created': 0, 'updated': 0, 'deleted': 0})
+
+    def test_stricter_threshold_drops_fuzzy_links(self):
+        competitors.resolve_competitors()
+        result = competitors.resolve_competitors(threshold=0.99)
+        self.assertEqual(result['relinked']['competitor'], 1)
+        self.assertEqual(result['edges'], {'created': 0, 'updated': 1, 'deleted': 0})
+        self.assertEqual(CompetitorEdge.objects.get(company=self.acme).mentions, 1)
+
+
+class ParseFigureTests(SimpleTestCase):
+    def assertFigure(self, text, value, unit='', currency=''):
+        expected = numeric.Figure(None if value is None else Decimal(value), unit, currency)
+        self.assertEqual(numeric.parse_figure(text), expected, text)
+
+    def test_scales_and_currencies(self):
+        self.assertFigure('$10M ARR', '10000000', 'arr', 'USD')
+        self.assertFigure('US$2.5B', '2500000000', currency='USD')
+        self.assertFigure('SGD 40 million', '40000000', currency='SGD')
+        self.assertFigure('120K', '120000')
+        self.assertFigure('1,200 installs', '1200', 'installs')
+
+    def test_ranges_take_the_midpoint(self):
+        self.assertFigure('$1.5M - $2M', '1750000', currency='USD')
+        self.assertFigure('1.2B to 1.8B', '1500000000')
+        self.assertFigure('1-5M', '3000000')
+        self.assertFigure('100-500', '300')
+
+    def test_local_formats(self):
+        self.assertFigure('€3,5 Mio', '3500000', currency='EUR')
+        self.assertFigure('€1.234,56', '1234.56', currency='EUR')
+        self.assertFigure('Rp 5 miliar', '5000000000', currency='IDR')
+        self.assertFigure('Rp 2,5 miliar', '2500000000', currency='IDR')
+        self.assertFigure('Rp 1.200.000', '1200000', currency='IDR')
+        self.assertFigure('5 juta', '5000000')
+
+    def test_percentages(self):
+        self.assertFigure('12.5%', '12.5', '%')
+        self.assertFigure('~15% market share', '15', '%')
+
+    def test_no_number(self):
+        for text in (None, '', '   ', 'N/A', 'Series A'):
+            self.assertFigure(text, None)
+        self.assertFigure('$ undisclosed', None, currency='USD')
+
+
+class NumericShadowColumnTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        analysis = CompetitiveAnalysis.objects.create(company=make_company(), title='Competition', summary='-')
+        cls.competitor = Competitor.objects.create(analysis=analysis, name='Globex', funding='$1.5M - $2M')
+
+    def test_filled_on_save(self):
+        self.assertEqual(self.competitor.funding_value, Decimal('1750000'))
+        self.assertEqual(self.competitor.funding_currency, 'USD')
+
+    def test_backfill_reparses_bulk_writes(self):
+        Competitor.objects.update(funding='Rp 5 miliar')
+        self.assertEqual(numeric.backfill(Competitor), 1)
+        self.competitor.refresh_from_db()
+        self.assertEqual(
+            (self.competitor.funding_value, self.competitor.funding_currency), (Decimal('5000000000'), 'IDR')
+        )
+        self.assertEqual(numeric.backfill(Competitor), 0)
+
+
+class CompanyScoreRollupTests(TestCase):
+    weights = {
+        'high_level_analyses': 0.5, 'perception_analyses': 0.25, 'market_analyses': 0.25,
+        'key_individuals_analyses': 0, 'competitive_analyses': 0,
+    }
+
+    def setUp(self):
+        self.company = make_company()
+
+    def analysis(self, model, score, confidence, **fields):
+        return model.objects.create(
+            company=self.company, title='Analysis', summary='-', overall_score=score, confidence_score=confidence,
+            is_completed=fields.pop('is_completed', True), **fields
+        )
+
+    def scores(self):
+        self.company.refresh_from_db()
+        return self.company.ai_score, self.company.ai_confidence
+
+    def test_rollup(self):
+        scores = {'high_level_analyses': (80, 0.9), 'market_analyses': (40, 0.6)}
+        # Score over the types present, confidence over all of them
+        self.assertEqual(rollup.rollup(scores, self.weights), (67, 0.6))
+        self.assertEqual(rollup.rollup({'competitive_analyses': (90, 1.0)}, self.weights), (None, None))
+        self.assertEqual(rollup.rollup({}, self.weights), (None, None))
+
+    def test_default_weights_cover_every_section(self):
+        self.assertEqual(set(rollup.weights()), set(rollup.DEFAULT_WEIGHTS))
+        self.assertAlmostEqual(sum(rollup.DEFAULT_WEIGHTS.values()), 1.0)
+
+    def test_latest_completed_analysis_counts(self):
+        with override_settings(COMPANY_SCORE_WEIGHTS=self.weights):
+            self.analysis(HighLevelAnalysis, 80, 0.9)
+            self.assertEqual(self.scores(), (80, 0.45))
+            self.analysis(MarketAnalysis, 40, 0.6)
+            self.assertEqual(self.scores(), (67, 0.6))
+            # In progress: does not replace the completed one
+            draft = self.analysis(HighLevelAnalysis, 20, 0.2, is_completed=False)
+            self.assertEqual(self.scores(), (67, 0.6))
+            draft.is_completed = True
+            draft.save()
+            self.assertEqual(self.scores(), (27, 0.25))
+            draft.delete()
+            self.assertEqual(self.scores(), (67, 0.6))
+
+    def test_refresh_after_changing_the_weights(self):
+        self.analysis(HighLevelAnalysis, 80, 0.9)
+        self.analysis(MarketAnalysis, 40, 0.6)
+        self.assertEqual(self.scores()[0], round((0.30 * 80 + 0.20 * 40) / 0.5))
+        with override_settings(COMPANY_SCORE_WEIGHTS=self.weights):
+            self.assertEqual(rollup.refresh_company_scores(), 1)
+            self.assertEqual(rollup.refresh_company_scores(), 0)
+        self.assertEqual(self.scores(), (67, 0.6))
+
+
+class SerializerWrapperTests(TestCase):
+    def wrappers(self):
+        return [cls.__dict__['data'] for cls in (serializers.Serializer, serializers.ListSerializer)]
+
+    def test_each_wrapper_is_applied_once(self):
+        # Every handler loads both middlewares, each wrapping Serializer.data
+        Client().get('/api/companies/')
+        wrapped = self.wrappers()
+        for _ in range(3):
+            Client().get('/api/companies/')
+            instrument_serializers()
+            profiling.track_serializer_allocations()
+        self.assertEqual(self.wrappers(), wrapped)
+
+
+class ServerTimingTests(TestCase):
+    def get(self, user=None):
+        client = APIClient()
+        if user:
+            client.credentials(HTTP_AUTHORIZATION=f'Token {Token.objects.create(user=user).key}')
+        return client.get('/api/companies/')
+
+    def test_only_staff_get_timings(self):
+        self.assertNotIn('Server-Timing', self.get())
+        self.assertNotIn('Server-Timing', self.get(User.objects.create_user('analyst')))
+        self.assertIn('queries', self.get(User.objects.create_user('admin', is_staff=True))['Server-Timing'])
+
+    @override_settings(METRICS_SERVER_TIMING=True)
+    def test_setting_sends_timings_to_everyone(self):
+        self.assertIn('Server-Timing', self.get())
+
+
+class ExportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create_user('staff', is_staff=True)
+        for index in range(5):
+            make_company(f'Company {index}')
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.staff)
+
+    def export(self, dataset='companies', **params):
+        return self.client.get(f'/api/exports/{dataset}/', params)
+
+    def test_csv(self):
+        response = self.export(chunk_size=2)
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="companies.csv"')
+        chunks = list(response.streaming_content)
+        # Header with the first chunk, then one piece per chunk of rows
+        self.assertEqual(len(chunks), 3)
+        rows = list(csv.reader(io.StringIO(b''.join(chunks).decode())))
+        self.assertEqual(rows[0], [field.attname for field in exports.export_fields(Company)])
+        self.assertEqual(len(rows) - 1, Company.objects.count())
+
+    def test_jsonl(self):
+        response = self.export(output='jsonl')
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        records = [json.loads(line) for line in b''.join(response.streaming_content).decode().splitlines()]
+        self.assertEqual(sorted(record['name'] for record in records), [f'Company {index}' for index in range(5)])
+        self.assertEqual(set(records[0]), {field.attname for field in exports.export_fields(Company)})
+
+    def test_chunked_iteration(self):
+        chunks = list(exports.stream_export('companies', 'jsonl', chunk_size=2))
+        self.assertEqual([chunk.count(b'\n') for chunk in chunks], [2, 2, 1])
+
+    def test_unknown_dataset_or_format(self):
+        self.assertEqual(self.export('users').status_code, 400)
+        response = self.export(output='xlsx')
+        self.assertEqual((response.status_code, response.data), (400, {'error': "Unknown export format 'xlsx'"}))
+        self.assertEqual(self.export(chunk_size='many').status_code, 400)
+
+    def test_parquet_requires_pyarrow(self):
+        with mock.patch.object(exports, 'pyarrow', None):
+            with self.assertRaisesMessage(exports.ExportError, 'pyarrow'):
+                exports.stream_export('companies', 'parquet')
+            self.assertEqual(self.export(output='parquet').status_code, 400)
+
+    def test_staff_only(self):
+        self.client.force_authenticate(User.objects.create_user('analyst'))
+        self.assertEqual(self.export().status_code, 403)
+
+
+@override_settings(API_CACHE_ENABLED=False)
+class AsyncEndpointTests(TransactionTestCase):
+    # Sections load on connections of their own threads: the data must be committed
+
+    def setUp(self):
+        generate_portfolio(companies=3, seed=2)
+        self.user = User.objects.create_user('analyst')
+        Lead.objects.update(assigned_to=self.user)
+        self.company = Company.objects.order_by('name').first()
+        self.headers = {'Authorization': f'Token {Token.objects.create(user=self.user).key}'}
+
+    def sync_get(self, path):
+        response = APIClient(headers=self.headers).get(path)
+        self.assertEqual(response.status_code, 200, path)
+        return response.json()
+
+    async def async_get(self, path, headers=None):
+        return await AsyncClient().get(path, headers=headers)
+
+    async def test_authentication_is_required(self):
+        response = await self.async_get('/api/async/dashboard/stats/')
+        self.assertIn(response.status_code, (401, 403))
+        response = await self.async_get('/api/async/dashboard/stats/', headers={'Authorization': 'Token wrong'})
+        self.assertIn(response.status_code, (401, 403))
+
+    async def test_same_payloads_as_the_sync_endpoints(self):
+        paths = [
+            f'companies/{self.company.pk}/full_analysis/',
+            'dashboard/stats/', 'dashboard/recent_analyses/', 'dashboard/upcoming_tasks/',
+        ]
+        for path in paths:
+            with self.subTest(path=path):
+                response = await self.async_get(f'/api/async/{path}', headers=self.headers)
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response.json(), await sync_to_async(self.sync_get)(f'/api/{path}'))
+
+    async def test_unknown_company(self):
+        response = await self.async_get(f'/api/async/companies/{uuid.uuid4()}/full_analysis/', headers=self.headers)
+        self.assertEqual(response.status_code, 404)
+
+    async def test_lead_status_breakdown(self):
+        response = await self.async_get(
+            f'/api/async/companies/{self.company.pk}/full_analysis/', headers=self.headers
+        )
+        data = response.json()
+        statuses = [lead['status'] for lead in data['leads']]
+        # Status -> number of the company's leads, only statuses that occur
+        self.assertEqual(
+            data['metrics_summary']['lead_status_breakdown'], {status: statuses.count(status) for status in statuses}
+        )
+        self.assertEqual(sum(data['metrics_summary']['lead_status_breakdown'].values()), len(statuses))
+
+
+class MentionWithCompany(serializers.ModelSerializer):
+    company_name = serializers.CharField(source='analysis.company.name')
+
+    class Meta:
+        model = RecentMention
+        fields = ['id', 'title', 'company_name']
+
+
+class PerceptionWithMentions(serializers.ModelSerializer):
+    recent_mentions = MentionWithCompany(many=True)
+
+    class Meta:
+        model = PerceptionAnalysis
+        fields = ['id', 'title', 'recent_mentions']
+
+
+class LeadSummary(serializers.ModelSerializer):
+    company_name = serializers.CharField(source='company.name')
+    company_tags = serializers.StringRelatedField(source='company.tags', many=True)
+    assigned_to = serializers.PrimaryKeyRelatedField(read_only=True)
+
+    class Meta:
+        model = Lead
+        fields = ['id', 'company_name', 'company_tags', 'assigned_to']
+
+
+class ProfileWatches(serializers.ModelSerializer):
+    watched_companies = serializers.PrimaryKeyRelatedField(many=True, read_only=True)
+
+    class Meta:
+        model = UserProfile
+        fields = ['id', 'watched_companies']
+
+
+class QueryPlanTests(SimpleTestCase):
+    def test_dotted_source_is_a_join(self):
+        self.assertEqual(query_plan(Lead, LeadSummary)[0], ('company',))
+        self.assertEqual(query_plan(RecentMention, MentionWithCompany), (('analysis__company',), ()))
+
+    def test_primary_key_field_adds_no_join(self):
+        self.assertNotIn('assigned_to', query_plan(Lead, LeadSummary)[0])
+
+    def test_many_valued_step_of_a_dotted_path_is_a_prefetch(self):
+        self.assertEqual(query_plan(Lead, LeadSummary)[1], (('company__tags', CompanyTag, None),))
+
+    def test_nested_many_serializer_is_an_optimized_prefetch(self):
+        self.assertEqual(
+            query_plan(PerceptionAnalysis, PerceptionWithMentions),
+            ((), (('recent_mentions', RecentMention, MentionWithCompany),)),
+        )
+        queryset = optimize_queryset(PerceptionAnalysis.objects.all(), PerceptionWithMentions)
+        prefetch, = queryset._prefetch_related_lookups
+        self.assertEqual(prefetch.prefetch_through, 'recent_mentions')
+        self.assertEqual(prefetch.queryset.query.select_related, {'analysis': {'company': {}}})
+
+    def test_many_primary_keys_prefetch_only_the_keys(self):
+        self.assertEqual(query_plan(UserProfile, ProfileWatches), ((), (('watched_companies', Company, PK_ONLY),)))
+        prefetch, = optimize_queryset(UserProfile.objects.all(), ProfileWatches)._prefetch_related_lookups
+        self.assertEqual(prefetch.queryset.query.deferred_loading, ({'id'}, False))
+
+    def test_plans_are_cached(self):
+        self.assertIs(query_plan(Lead, LeadSummary), query_plan(Lead, LeadSummary))
+
+
+class EstimatedCountTests(TestCase):
+    def setUp(self):
+        for index in range(6):
+            make_company(f'Company {index}')
+
+    def analyze(self):
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+    def test_exact_count_until_analyzed(self):
+        self.assertIsNone(estimated_row_count(Company))
+        self.analyze()
+        self.assertEqual(estimated_row_count(Company), 6)
+
+    def test_deleted_rows_are_not_counted(self):
+        Company.objects.filter(name__in=['Company 4', 'Company 5']).delete()
+        with mock.patch('api.admin_tools.ESTIMATE_THRESHOLD', 1):
+            paginator = EstimatedCountPaginator(Company.objects.order_by('name'), 2)
+            self.assertEqual((paginator.count, paginator.estimated), (4, False))
+            self.assertEqual(paginator.num_pages, 2)
+            self.analyze()
+            paginator = EstimatedCountPaginator(Company.objects.order_by('name'), 2)
+            self.assertEqual((paginator.count, paginator.estimated), (4, True))
@@ -1,11 +1,13 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from rest_framework.authtoken.views import obtain_auth_token
+from . import async_views
 from .views import (
     CompanyViewSet, LeadViewSet, InvestmentViewSet,
-    DashboardViewSet, UserProfileViewSet,
+    DashboardViewSet, PortfolioViewSet, UserProfileViewSet,
     HighLevelAnalysisViewSet, PerceptionAnalysisViewSet, MarketAnalysisViewSet,
-    KeyIndividualsAnalysisViewSet, CompetitiveAnalysisViewSet
+    KeyIndividualsAnalysisViewSet, CompetitiveAnalysisViewSet, ExportViewSet, JobViewSet,
+    ChangeStreamView, StreamTicketView, MetricsView, RequestProfileViewSet, CompetitorViewSet, SalesChannelViewSet
 )
 
 router = DefaultRouter()
@@ -15,12 +17,26 @@ router.register(r'perception-analyses', PerceptionAnalysisViewSet)
 router.register(r'market-analyses', MarketAnalysisViewSet)
 router.register(r'key-individuals-analyses', KeyIndividualsAnalysisViewSet)
 router.register(r'competitive-analyses', CompetitiveAnalysisViewSet)
+router.register(r'competitors', CompetitorViewSet)
+router.register(r'sales-channels', SalesChannelViewSet)
 router.register(r'leads', LeadViewSet)
 router.register(r'investments', InvestmentViewSet)
 router.register(r'dashboard', DashboardViewSet, basename='dashboard')
+router.register(r'portfolio', PortfolioViewSet, basename='portfolio')
 router.register(r'profiles', UserProfileViewSet)
+router.register(r'exports', ExportViewSet, basename='export')
+router.register(r'jobs', JobViewSet)
+router.register(r'request-profiles', RequestProfileViewSet)
 
 urlpatterns = [
     path('', include(router.urls)),
     path('auth/token/', obtain_auth_token, name='api_token_auth'),
+    path('stream/', ChangeStreamView.as_view(), name='change-stream'),
+    path('stream/ticket/', StreamTicketView.as_view(), name='stream-ticket'),
+    path('_metrics', MetricsView.as_view(), name='metrics'),
+    # Async variants of the composite read endpoints (serve with an ASGI server)
+    path('async/companies/<uuid:pk>/full_analysis/', async_views.company_full_analysis, name='async-company-full-analysis'),
+    path('async/dashboard/stats/', async_views.dashboard_stats, name='async-dashboard-stats'),
+    path('async/dashboard/recent_analyses/', async_views.dashboard_recent_analyses, name='async-dashboard-recent-analyses'),
+    path('async/dashboard/upcoming_tasks/', async_views.dashboard_upcoming_tasks, name='async-dashboard-upcoming-tasks'),
 ]
@@ -1,16 +1,23 @@
-from rest_framework import viewsets, status, filters
+from rest_framework import viewsets, mixins, status, filters
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import IsAuthenticated, IsAdminUser
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.views import APIView
+from rest_framework.exceptions import ValidationError
+from rest_framework.settings import api_settings
 # from django_filters.rest_framework import DjangoFilterBackend
-from django.db.models import Count, Avg, Sum, Q
+from django.db.models import Q
+from django.http import HttpResponse, StreamingHttpResponse, FileResponse, Http404
 from django.contrib.auth.models import User
-from datetime import datetime, timedelta
+import json
+import uuid
 
 from .models import (
     Company, CompanyTag, Metric, Lead, Investment, UserProfile,
     HighLevelAnalysis, PerceptionAnalysis, MarketAnalysis,
-    KeyIndividualsAnalysis, CompetitiveAnalysis
+    KeyIndividualsAnalysis, CompetitiveAnalysis, Job, ArchivedRow, RequestProfile, CompanyVector,
+    CompetitorEdge, Competitor, SalesChannel
 )
 from .serializers import (
     CompanySerializer, CompanyListSerializer, CompanyTagSerializer,
@@ -20,10 +27,68 @@ from .serializers import (
     KeyIndividualsAnalysisSerializer, KeyIndividualsAnalysisListSerializer,
     CompetitiveAnalysisSerializer, CompetitiveAnalysisListSerializer,
     MetricSerializer, LeadSerializer, InvestmentSerializer, UserProfileSerializer,
-    DashboardStatsSerializer, CompanyAnalysisSerializer
+    JobSerializer, RequestProfileSerializer, CompetitorListSerializer, SalesChannelListSerializer
+)
+from .exports import (
+    EXPORT_DATASETS, EXPORT_FORMATS, DEFAULT_CHUNK_SIZE, ExportError,
+    stream_export, export_filename
+)
+from . import jobs
+from .archive import ARCHIVE_POLICIES, include_archived_requested, merge_archived
+from .cache import CachedResponseMixin, cache_response
+from .authentication import StreamTicketAuthentication, issue_stream_ticket
+from .stream import ChangeStream, stream_content
+from .portfolio import portfolio_analytics
+from .similarity import DEFAULT_K, MAX_K, similar_companies
+from .sentiment import sentiment_series, series_params
+from .numeric import parse_figure
+from .optimizer import OptimizedQuerySetMixin
+from core.metrics import render_prometheus
+from .sections import (
+    full_analysis_loaders, build_full_analysis, dashboard_stat_loaders, build_dashboard_stats,
+    recent_analysis_loaders, build_recent_analyses, load_upcoming_tasks, run_loaders
+)
+
+# Models whose rows appear in serialized analyses (nested children, archived
+# children, company and analyst names); any write to them invalidates the cache
+ANALYSIS_CACHE_MODELS = (Company, User, ArchivedRow, *ARCHIVE_POLICIES)
+
+ALL_ANALYSIS_MODELS = (
+    HighLevelAnalysis, PerceptionAnalysis, MarketAnalysis,
+    KeyIndividualsAnalysis, CompetitiveAnalysis
 )
 
-class CompanyViewSet(viewsets.ModelViewSet):
+
+class IncludeArchivedMixin:
+    """Adds archived child rows to detail responses when ?include_archived=true"""
+
+    def retrieve(self, request, *args, **kwargs):
+        response = super().retrieve(request, *args, **kwargs)
+        if include_archived_requested(request):
+            merge_archived([response.data], self.get_serializer_class())
+        return response
+
+
+class NumericRangeFilter(filters.BaseFilterBackend):
+    """
+    ``?min_<name>=`` / ``?max_<name>=`` on the numeric shadow columns named in
+    the view's ``range_filter_fields`` ({name: column}; see api/numeric.py)
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        for name, column in getattr(view, 'range_filter_fields', {}).items():
+            for bound, lookup in (('min', 'gte'), ('max', 'lte')):
+                value = request.query_params.get(f'{bound}_{name}')
+                if value in (None, ''):
+                    continue
+                figure = parse_figure(value)
+                if figure.value is None:
+                    raise ValidationError({'error': f'Invalid {bound}_{name}'})
+                queryset = queryset.filter(**{f'{column}__{lookup}': figure.value})
+        return queryset
+
+
+class CompanyViewSet(OptimizedQuerySetMixin, CachedResponseMixin, viewsets.ModelViewSet):
     """ViewSet for managing companies"""
     queryset = Company.objects.filter(is_active=True)
     permission_classes = [IsAuthenticated]
@@ -32,52 +97,26 @@ class CompanyViewSet(viewsets.ModelViewSet):
     search_fields = ['name', 'description', 'headquarters']
     ordering_fields = ['name', 'created_at', 'updated_at', 'ai_score']
     ordering = ['-updated_at']
+    replica_actions = ('full_analysis', 'search', 'competitors')
+    cache_models = (CompanyTag,)
+    optimized_actions = OptimizedQuerySetMixin.optimized_actions + ('search',)
     
     def get_serializer_class(self):
-        if self.action == 'list':
+        if self.action in ('list', 'search'):
             return CompanyListSerializer
         return CompanySerializer
     
     @action(detail=True, methods=['get'])
+    @cache_response(ANALYSIS_CACHE_MODELS + ALL_ANALYSIS_MODELS + (Lead, Investment))
     def full_analysis(self, request, pk=None):
         """Get comprehensive analysis for a company"""
         company = self.get_object()
-        
-        # Get all analysis types
-        high_level_analyses = HighLevelAnalysis.objects.filter(company=company).order_by('-created_at')
-        perception_analyses = PerceptionAnalysis.objects.filter(company=company).order_by('-created_at')
-        market_analyses = MarketAnalysis.objects.filter(company=company).order_by('-created_at')
-        key_individuals_analyses = KeyIndividualsAnalysis.objects.filter(company=company).order_by('-created_at')
-        competitive_analyses = CompetitiveAnalysis.objects.filter(company=company).order_by('-created_at')
-        
-        leads = Lead.objects.filter(company=company).order_by('-created_at')
-        investments = Investment.objects.filter(company=company).order_by('-investment_date')
-        
-        # Calculate metrics summary
-        all_analyses = list(high_level_analyses) + list(perception_analyses) + list(market_analyses) + list(key_individuals_analyses) + list(competitive_analyses)
-        metrics_summary = {
-            'total_analyses': len(all_analyses),
-            'avg_score': sum(a.overall_score or 0 for a in all_analyses) / len(all_analyses) if all_analyses else 0,
-            'avg_confidence': sum(a.confidence_score or 0 for a in all_analyses) / len(all_analyses) if all_analyses else 0,
-            'total_investment': investments.aggregate(total=Sum('amount'))['total'] or 0,
-            'lead_status_breakdown': dict(leads.values('status').annotate(count=Count('status')).values_list('status', 'count'))
-        }
-        
-        serializer = CompanyAnalysisSerializer({
-            'company': company,
-            'high_level_analyses': high_level_analyses,
-            'perception_analyses': perception_analyses,
-            'market_analyses': market_analyses,
-            'key_individuals_analyses': key_individuals_analyses,
-            'competitive_analyses': competitive_analyses,
-            'leads': leads,
-            'investments': investments,
-            'metrics_summary': metrics_summary
-        })
-        
-        return Response(serializer.data)
+        loaders = full_analysis_loaders(company, include_archived=include_archived_requested(request))
+        data = build_full_analysis(run_loaders(loaders))
+        return Response(data)
     
     @action(detail=False, methods=['get'])
+    @cache_response((Company,))
     def search(self, request):
         """Advanced search for companies"""
         query = request.query_params.get('q', '')
@@ -108,14 +147,80 @@ class CompanyViewSet(viewsets.ModelViewSet):
         
         page = self.paginate_queryset(queryset)
         if page is not None:
-            serializer = CompanyListSerializer(page, many=True)
+            serializer = self.get_serializer(page, many=True)
             return self.get_paginated_response(serializer.data)
         
-        serializer = CompanyListSerializer(queryset, many=True)
+        serializer = self.get_serializer(queryset, many=True)
         return Response(serializer.data)
+    
+    @action(detail=True, methods=['get'])
+    @cache_response((Company, CompanyTag, CompanyVector))
+    def similar(self, request, pk=None):
+        """Nearest-neighbour comparables of a company (?k=, at most MAX_K)"""
+        company = self.get_object()
+        try:
+            k = int(request.query_params.get('k', DEFAULT_K))
+        except ValueError:
+            return Response({'error': 'Invalid k'}, status=status.HTTP_400_BAD_REQUEST)
+        if not 1 <= k <= MAX_K:
+            return Response({'error': f'k must be between 1 and {MAX_K}'}, status=status.HTTP_400_BAD_REQUEST)
+
+        neighbours = similar_companies(company.pk, k)
+        companies = Company.objects.in_bulk([company_id for company_id, _ in neighbours])
+        results = []
+        for company_id, similarity in neighbours:
+            data = CompanyListSerializer(companies[company_id]).data
+            data['similarity'] = round(similarity, 4)
+            results.append(data)
+        return Response({'company': company.id, 'k': k, 'results': results})
+    
+    @action(detail=True, methods=['get'])
+    @cache_response((Company, CompetitorEdge))
+    def competitors(self, request, pk=None):
+        """Resolved competitors of a company, and the companies listing it as one"""
+        company = self.get_object()
+
+        def edge_data(edge, other):
+            return {
+                'company_id': other.id,
+                'name': other.name,
+                'industry': other.industry,
+                'stage': other.stage,
+                'mentions': edge.mentions,
+                'similarity': edge.similarity,
+            }
+
+        competitors = CompetitorEdge.objects.filter(company=company).select_related('competitor')
+        listed_by = CompetitorEdge.objects.filter(competitor=company).select_related('company')
+        return Response({
+            'company': company.id,
+            'competitors': [edge_data(edge, edge.competitor) for edge in competitors.order_by('-mentions', 'competitor__name')],
+            'listed_by': [edge_data(edge, edge.company) for edge in listed_by.order_by('-mentions', 'company__name')],
+        })
+    
+    @action(detail=True, methods=['get'])
+    def sentiment(self, request, pk=None):
+        """Mention sentiment per day/week/month bucket with a rolling average"""
+        company = self.get_object()
+        try:
+            params = series_params(request.query_params)
+        except ValueError as exc:
+            return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(sentiment_series(company_id=company.pk, **params))
+    
+    @action(detail=True, methods=['post', 'delete'])
+    def watch(self, request, pk=None):
+        """Watch (POST) or unwatch (DELETE) a company on the change stream"""
+        company = self.get_object()
+        profile, _ = UserProfile.objects.get_or_create(user=request.user)
+        if request.method == 'DELETE':
+            profile.watched_companies.remove(company)
+        else:
+            profile.watched_companies.add(company)
+        return Response({'company': company.id, 'watching': request.method != 'DELETE'})
 
 # Analysis ViewSets for each type
-class HighLevelAnalysisViewSet(viewsets.ModelViewSet):
+class HighLevelAnalysisViewSet(OptimizedQuerySetMixin, CachedResponseMixin, IncludeArchivedMixin, viewsets.ModelViewSet):
     """ViewSet for managing high-level analyses"""
     queryset = HighLevelAnalysis.objects.all()
     permission_classes = [IsAuthenticated]
@@ -123,6 +228,7 @@ class HighLevelAnalysisViewSet(viewsets.ModelViewSet):
     search_fields = ['title', 'summary']
     ordering_fields = ['created_at', 'updated_at', 'overall_score']
     ordering = ['-created_at']
+    cache_models = ANALYSIS_CACHE_MODELS
     
     def get_serializer_class(self):
         if self.action == 'list':
@@ -132,7 +238,7 @@ class HighLevelAnalysisViewSet(viewsets.ModelViewSet):
     def perform_create(self, serializer):
         serializer.save(analyst=self.request.user)
 
-class PerceptionAnalysisViewSet(viewsets.ModelViewSet):
+class PerceptionAnalysisViewSet(OptimizedQuerySetMixin, CachedResponseMixin, IncludeArchivedMixin, viewsets.ModelViewSet):
     """ViewSet for managing perception analyses"""
     queryset = PerceptionAnalysis.objects.all()
     permission_classes = [IsAuthenticated]
@@ -140,6 +246,7 @@ class PerceptionAnalysisViewSet(viewsets.ModelViewSet):
     search_fields = ['title', 'summary']
     ordering_fields = ['created_at', 'updated_at', 'overall_score']
     ordering = ['-created_at']
+    cache_models = ANALYSIS_CACHE_MODELS
     
     def get_serializer_class(self):
         if self.action == 'list':
@@ -149,7 +256,7 @@ class PerceptionAnalysisViewSet(viewsets.ModelViewSet):
     def perform_create(self, serializer):
         serializer.save(analyst=self.request.user)
 
-class MarketAnalysisViewSet(viewsets.ModelViewSet):
+class MarketAnalysisViewSet(OptimizedQuerySetMixin, CachedResponseMixin, IncludeArchivedMixin, viewsets.ModelViewSet):
     """ViewSet for managing market analyses"""
     queryset = MarketAnalysis.objects.all()
     permission_classes = [IsAuthenticated]
@@ -157,6 +264,7 @@ class MarketAnalysisViewSet(viewsets.ModelViewSet):
     search_fields = ['title', 'summary']
     ordering_fields = ['created_at', 'updated_at', 'overall_score']
     ordering = ['-created_at']
+    cache_models = ANALYSIS_CACHE_MODELS
     
     def get_serializer_class(self):
         if self.action == 'list':
@@ -166,7 +274,7 @@ class MarketAnalysisViewSet(viewsets.ModelViewSet):
     def perform_create(self, serializer):
         serializer.save(analyst=self.request.user)
 
-class KeyIndividualsAnalysisViewSet(viewsets.ModelViewSet):
+class KeyIndividualsAnalysisViewSet(OptimizedQuerySetMixin, CachedResponseMixin, IncludeArchivedMixin, viewsets.ModelViewSet):
     """ViewSet for managing key individuals analyses"""
     queryset = KeyIndividualsAnalysis.objects.all()
     permission_classes = [IsAuthenticated]
@@ -174,6 +282,7 @@ class KeyIndividualsAnalysisViewSet(viewsets.ModelViewSet):
     search_fields = ['title', 'summary']
     ordering_fields = ['created_at', 'updated_at', 'overall_score']
     ordering = ['-created_at']
+    cache_models = ANALYSIS_CACHE_MODELS
     
     def get_serializer_class(self):
         if self.action == 'list':
@@ -183,7 +292,7 @@ class KeyIndividualsAnalysisViewSet(viewsets.ModelViewSet):
     def perform_create(self, serializer):
         serializer.save(analyst=self.request.user)
 
-class CompetitiveAnalysisViewSet(viewsets.ModelViewSet):
+class CompetitiveAnalysisViewSet(OptimizedQuerySetMixin, CachedResponseMixin, IncludeArchivedMixin, viewsets.ModelViewSet):
     """ViewSet for managing competitive analyses"""
     queryset = CompetitiveAnalysis.objects.all()
     permission_classes = [IsAuthenticated]
@@ -191,6 +300,7 @@ class CompetitiveAnalysisViewSet(viewsets.ModelViewSet):
     search_fields = ['title', 'summary']
     ordering_fields = ['created_at', 'updated_at', 'overall_score']
     ordering = ['-created_at']
+    cache_models = ANALYSIS_CACHE_MODELS
     
     def get_serializer_class(self):
         if self.action == 'list':
@@ -200,15 +310,62 @@ class CompetitiveAnalysisViewSet(viewsets.ModelViewSet):
     def perform_create(self, serializer):
         serializer.save(analyst=self.request.user)
 
-class LeadViewSet(viewsets.ModelViewSet):
+class CompetitorViewSet(OptimizedQuerySetMixin, CachedResponseMixin, viewsets.ReadOnlyModelViewSet):
+    """Competitors across all competitive analyses, sortable by their parsed figures"""
+    queryset = Competitor.objects.all()
+    serializer_class = CompetitorListSerializer
+    permission_classes = [IsAuthenticated]
+    filter_backends = [filters.SearchFilter, NumericRangeFilter, filters.OrderingFilter]
+    search_fields = ['name', 'headquarters']
+    ordering_fields = ['funding_value', 'revenue_value', 'market_share_value', 'employees_value', 'score', 'name']
+    ordering = ['-funding_value', 'id']
+    range_filter_fields = {
+        'funding': 'funding_value', 'revenue': 'revenue_value',
+        'market_share': 'market_share_value', 'employees': 'employees_value',
+    }
+    cache_models = (CompetitiveAnalysis,)
+    
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        company = self.request.query_params.get('company')
+        if company:
+            queryset = queryset.filter(analysis__company_id=company)
+        currency = self.request.query_params.get('currency')
+        if currency:
+            queryset = queryset.filter(funding_currency=currency.upper())
+        return queryset
+
+class SalesChannelViewSet(OptimizedQuerySetMixin, CachedResponseMixin, viewsets.ReadOnlyModelViewSet):
+    """Sales channels across all market analyses, sortable by their parsed figures"""
+    queryset = SalesChannel.objects.all()
+    serializer_class = SalesChannelListSerializer
+    permission_classes = [IsAuthenticated]
+    filter_backends = [filters.SearchFilter, NumericRangeFilter, filters.OrderingFilter]
+    search_fields = ['platform_name']
+    ordering_fields = ['installs_count_value', 'revenue_amount_value', 'rating', 'reviews_count', 'platform_name']
+    ordering = ['-installs_count_value', 'id']
+    range_filter_fields = {'installs': 'installs_count_value', 'revenue': 'revenue_amount_value'}
+    cache_models = (MarketAnalysis,)
+    
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        company = self.request.query_params.get('company')
+        if company:
+            queryset = queryset.filter(analysis__company_id=company)
+        return queryset
+
+class LeadViewSet(OptimizedQuerySetMixin, CachedResponseMixin, viewsets.ModelViewSet):
     """ViewSet for managing leads"""
     queryset = Lead.objects.all()
+    serializer_class = LeadSerializer
     permission_classes = [IsAuthenticated]
     filter_backends = [filters.SearchFilter, filters.OrderingFilter]
     # filterset_fields = ['status', 'priority', 'assigned_to']  # Requires django-filter
     search_fields = ['company__name', 'source', 'notes']
     ordering_fields = ['created_at', 'updated_at', 'ai_match_score']
     ordering = ['-created_at']
+    cache_models = (Company, User)
+    optimized_actions = OptimizedQuerySetMixin.optimized_actions + ('update_status',)
     
     def perform_create(self, serializer):
         # Auto-assign to current user if not specified
@@ -227,7 +384,7 @@ class LeadViewSet(viewsets.ModelViewSet):
             lead.status = new_status
             lead.save()
             
-            serializer = LeadSerializer(lead)
+            serializer = self.get_serializer(lead)
             return Response(serializer.data)
         
         return Response(
@@ -235,14 +392,16 @@ class LeadViewSet(viewsets.ModelViewSet):
             status=status.HTTP_400_BAD_REQUEST
         )
 
-class InvestmentViewSet(viewsets.ModelViewSet):
+class InvestmentViewSet(OptimizedQuerySetMixin, CachedResponseMixin, viewsets.ModelViewSet):
     """ViewSet for managing investments"""
     queryset = Investment.objects.all()
+    serializer_class = InvestmentSerializer
     permission_classes = [IsAuthenticated]
     filter_backends = [filters.OrderingFilter]
     # filterset_fields = ['status', 'created_by']  # Requires django-filter
     ordering_fields = ['investment_date', 'amount', 'created_at']
     ordering = ['-investment_date']
+    cache_models = (Company, User)
     
     def perform_create(self, serializer):
         serializer.save(created_by=self.request.user)
@@ -250,139 +409,68 @@ class InvestmentViewSet(viewsets.ModelViewSet):
 class DashboardViewSet(viewsets.ViewSet):
     """ViewSet for dashboard data"""
     permission_classes = [IsAuthenticated]
+    replica_actions = ('stats', 'recent_analyses', 'upcoming_tasks')
     
     @action(detail=False, methods=['get'])
+    @cache_response((Lead, Investment, Company) + ALL_ANALYSIS_MODELS)
     def stats(self, request):
         """Get dashboard statistics"""
-        # Active prospects
-        active_prospects = Lead.objects.filter(
-            status__in=['new', 'contacted', 'qualified', 'under_review']
-        ).count()
-        
-        # Investment pipeline
-        pipeline_investments = Investment.objects.filter(
-            status__in=['proposed', 'approved']
-        )
-        investment_pipeline = pipeline_investments.aggregate(
-            total=Sum('amount')
-        )['total'] or 0
-        
-        # Analysis completed this month
-        month_start = datetime.now().replace(day=1)
-        analysis_completed = (
-            HighLevelAnalysis.objects.filter(created_at__gte=month_start, is_completed=True).count() +
-            PerceptionAnalysis.objects.filter(created_at__gte=month_start, is_completed=True).count() +
-            MarketAnalysis.objects.filter(created_at__gte=month_start, is_completed=True).count() +
-            KeyIndividualsAnalysis.objects.filter(created_at__gte=month_start, is_completed=True).count() +
-            CompetitiveAnalysis.objects.filter(created_at__gte=month_start, is_completed=True).count()
-        )
-        
-        # Success rate (investments vs total leads)
-        total_leads = Lead.objects.count()
-        successful_investments = Investment.objects.filter(
-            status__in=['completed', 'exited']
-        ).count()
-        success_rate = (successful_investments / total_leads * 100) if total_leads > 0 else 0
-        
-        # New companies this week
-        week_ago = datetime.now() - timedelta(days=7)
-        new_companies = Company.objects.filter(
-            created_at__gte=week_ago
-        ).count()
-        
-        # Average match score
-        avg_match_score = Lead.objects.filter(
-            ai_match_score__isnull=False
-        ).aggregate(avg=Avg('ai_match_score'))['avg'] or 0
-        
-        # Hot leads (high priority + high score)
-        hot_leads = Lead.objects.filter(
-            priority__in=['high', 'critical'],
-            ai_match_score__gte=80
-        ).count()
-        
-        stats_data = {
-            'active_prospects': active_prospects,
-            'investment_pipeline': investment_pipeline,
-            'analysis_completed': analysis_completed,
-            'success_rate': round(success_rate, 1),
-            'new_companies_this_week': new_companies,
-            'avg_match_score': round(avg_match_score, 1),
-            'hot_leads': hot_leads
-        }
-        
-        serializer = DashboardStatsSerializer(stats_data)
-        return Response(serializer.data)
+        return Response(build_dashboard_stats(run_loaders(dashboard_stat_loaders())))
     
     @action(detail=False, methods=['get'])
+    @cache_response((Company, User) + ALL_ANALYSIS_MODELS)
     def recent_analyses(self, request):
         """Get recent analyses for dashboard"""
-        # Get recent analyses from all types
-        recent_high_level = HighLevelAnalysis.objects.select_related('company', 'analyst').order_by('-created_at')[:2]
-        recent_perception = PerceptionAnalysis.objects.select_related('company', 'analyst').order_by('-created_at')[:2]
-        recent_market = MarketAnalysis.objects.select_related('company', 'analyst').order_by('-created_at')[:2]
-        recent_key_individuals = KeyIndividualsAnalysis.objects.select_related('company', 'analyst').order_by('-created_at')[:2]
-        recent_competitive = CompetitiveAnalysis.objects.select_related('company', 'analyst').order_by('-created_at')[:2]
-        
-        # Combine and sort by created_at
-        all_recent = list(recent_high_level) + list(recent_perception) + list(recent_market) + list(recent_key_individuals) + list(recent_competitive)
-        all_recent.sort(key=lambda x: x.created_at, reverse=True)
-        
-        # Serialize each type appropriately
-        serialized_analyses = []
-        for analysis in all_recent[:5]:  # Limit to 5 most recent
-            if isinstance(analysis, HighLevelAnalysis):
-                serializer = HighLevelAnalysisListSerializer(analysis)
-            elif isinstance(analysis, PerceptionAnalysis):
-                serializer = PerceptionAnalysisListSerializer(analysis)
-            elif isinstance(analysis, MarketAnalysis):
-                serializer = MarketAnalysisListSerializer(analysis)
-            elif isinstance(analysis, KeyIndividualsAnalysis):
-                serializer = KeyIndividualsAnalysisListSerializer(analysis)
-            elif isinstance(analysis, CompetitiveAnalysis):
-                serializer = CompetitiveAnalysisListSerializer(analysis)
-            serialized_analyses.append(serializer.data)
-        
-        return Response(serialized_analyses)
+        return Response(build_recent_analyses(run_loaders(recent_analysis_loaders())))
     
     @action(detail=False, methods=['get'])
+    @cache_response((Lead, Company), scope='user')
     def upcoming_tasks(self, request):
         """Get upcoming tasks for dashboard"""
-        # This would typically come from a Task model
-        # For now, return mock data or derive from leads
-        upcoming_leads = Lead.objects.filter(
-            status__in=['new', 'contacted'],
-            assigned_to=request.user
-        ).order_by('created_at')[:5]
-        
-        tasks = []
-        for lead in upcoming_leads:
-            tasks.append({
-                'id': lead.id,
-                'task': f'Follow up with {lead.company.name}',
-                'priority': lead.priority.title(),
-                'due_date': 'Today' if lead.created_at.date() == datetime.now().date() else 'This week',
-                'type': 'follow_up'
-            })
-        
-        return Response(tasks)
+        # This would typically come from a Task model; derived from leads for now
+        return Response(load_upcoming_tasks(request.user))
+
+class PortfolioViewSet(viewsets.ViewSet):
+    """Portfolio-wide investment analytics"""
+    permission_classes = [IsAuthenticated]
+    replica_actions = ('analytics',)
 
-class UserProfileViewSet(viewsets.ModelViewSet):
+    @action(detail=False, methods=['get'])
+    @cache_response((Investment, Company))
+    def analytics(self, request):
+        """Exposure, deployed capital, ownership, valuation step-ups and status mix"""
+        return Response(portfolio_analytics())
+
+    @action(detail=False, methods=['get'])
+    def sentiment(self, request):
+        """Mention sentiment of every company per day/week/month bucket"""
+        try:
+            params = series_params(request.query_params)
+        except ValueError as exc:
+            return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(sentiment_series(**params))
+
+class UserProfileViewSet(OptimizedQuerySetMixin, CachedResponseMixin, viewsets.ModelViewSet):
     """ViewSet for user profiles"""
     queryset = UserProfile.objects.all()
+    serializer_class = UserProfileSerializer
     permission_classes = [IsAuthenticated]
+    cache_models = (User,)
+    cache_scope = 'user'
+    optimized_actions = OptimizedQuerySetMixin.optimized_actions + ('me',)
     
     def get_queryset(self):
+        queryset = super().get_queryset()
         # Users can only see their own profile
         if self.action == 'list':
-            return UserProfile.objects.filter(user=self.request.user)
-        return UserProfile.objects.all()
+            return queryset.filter(user=self.request.user)
+        return queryset
     
     @action(detail=False, methods=['get'])
     def me(self, request):
         """Get current user's profile"""
         try:
-            profile = UserProfile.objects.get(user=request.user)
+            profile = self.get_queryset().get(user=request.user)
             serializer = UserProfileSerializer(profile)
             return Response(serializer.data)
         except UserProfile.DoesNotExist:
@@ -390,3 +478,196 @@ class UserProfileViewSet(viewsets.ModelViewSet):
             profile = UserProfile.objects.create(user=request.user)
             serializer = UserProfileSerializer(profile)
             return Response(serializer.data)
+
+class EventStreamRenderer(BaseRenderer):
+    """Lets clients ask for text/event-stream; only error bodies go through it"""
+    media_type = 'text/event-stream'
+    format = 'event-stream'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return JSONRenderer().render(data)
+
+
+class StreamTicketView(APIView):
+    """Single-use ticket for opening the change stream without a token in the URL"""
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        ticket, expires_in = issue_stream_ticket(request.user)
+        return Response({'ticket': ticket, 'expires_in': expires_in})
+
+
+class ChangeStreamView(APIView):
+    """Server-sent events for the companies the user watches or is assigned to"""
+    authentication_classes = [*api_settings.DEFAULT_AUTHENTICATION_CLASSES, StreamTicketAuthentication]
+    permission_classes = [IsAuthenticated]
+    renderer_classes = [JSONRenderer, EventStreamRenderer]
+
+    def get(self, request):
+        last_event_id = request.META.get('HTTP_LAST_EVENT_ID') or request.query_params.get('last_event_id')
+        try:
+            last_event_id = int(last_event_id) if last_event_id else None
+        except ValueError:
+            return Response({'error': 'Invalid last_event_id'}, status=status.HTTP_400_BAD_REQUEST)
+
+        stream = ChangeStream(request.user, last_event_id)
+        response = StreamingHttpResponse(
+            stream_content(request._request, stream), content_type='text/event-stream'
+        )
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no'  # nginx: do not buffer the stream
+        return response
+
+class MetricsView(APIView):
+    """Request metrics in Prometheus text format (staff only)"""
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return HttpResponse(render_prometheus(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+class ExportViewSet(viewsets.ViewSet):
+    """Streaming CSV / JSONL / Parquet exports of whole tables"""
+    permission_classes = [IsAdminUser]
+    lookup_value_regex = '[a-z-]+'
+
+    def list(self, request):
+        """List exportable datasets and formats"""
+        return Response({
+            'datasets': sorted(EXPORT_DATASETS),
+            'formats': list(EXPORT_FORMATS),
+        })
+
+    def retrieve(self, request, pk=None):
+        """Stream a dataset, e.g. /api/exports/leads/?output=jsonl"""
+        output_format = request.query_params.get('output', 'csv')
+        try:
+            chunk_size = int(request.query_params.get('chunk_size', DEFAULT_CHUNK_SIZE))
+        except ValueError:
+            return Response({'error': 'Invalid chunk_size'}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            chunks = stream_export(pk, output_format, chunk_size=max(chunk_size, 1))
+        except ExportError as exc:
+            return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
+        response = StreamingHttpResponse(chunks, content_type=EXPORT_FORMATS[output_format][0])
+        response['Content-Disposition'] = f'attachment; filename="{export_filename(pk, output_format)}"'
+        return response
+
+
+class JobViewSet(OptimizedQuerySetMixin, mixins.ListModelMixin, mixins.RetrieveModelMixin,
+                 mixins.CreateModelMixin, viewsets.GenericViewSet):
+    """Background jobs: status, progress, cancellation and result download"""
+    queryset = Job.objects.all()
+    serializer_class = JobSerializer
+    permission_classes = [IsAuthenticated]
+    filter_backends = [filters.OrderingFilter]
+    ordering_fields = ['created_at', 'finished_at']
+    ordering = ['-created_at']
+
+    optimized_actions = OptimizedQuerySetMixin.optimized_actions + ('cancel',)
+
+    # Job kinds that may be started through the API, with the params a client may set
+    creatable_kinds = {
+        'export': ('dataset', 'output_format'),
+        'import': ('dataset',),
+    }
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        # Staff see every job, other users only their own
+        if self.request.user.is_staff:
+            return queryset
+        return queryset.filter(created_by=self.request.user)
+
+    def get_permissions(self):
+        if self.action == 'create':
+            return [IsAdminUser()]
+        return super().get_permissions()
+
+    def create(self, request, *args, **kwargs):
+        """Queue an export or import, e.g. {"kind": "export", "params": {"dataset": "leads"}}"""
+        kind = request.data.get('kind')
+        if kind not in self.creatable_kinds:
+            return Response(
+                {'error': f"kind must be one of: {', '.join(self.creatable_kinds)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        params = request.data.get('params') or {}
+        if isinstance(params, str):
+            try:
+                params = json.loads(params)
+            except ValueError:
+                return Response({'error': 'Invalid params'}, status=status.HTTP_400_BAD_REQUEST)
+        if not isinstance(params, dict):
+            return Response({'error': 'params must be an object'}, status=status.HTTP_400_BAD_REQUEST)
+        # Everything else (chunk sizes, the upload path) is set by the server
+        unknown = sorted(set(params) - set(self.creatable_kinds[kind]))
+        if unknown:
+            return Response(
+                {'error': f"Unknown params for {kind}: {', '.join(unknown)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if not isinstance(params.get('dataset'), str) or params['dataset'] not in EXPORT_DATASETS:
+            return Response({'error': 'Unknown dataset'}, status=status.HTTP_400_BAD_REQUEST)
+
+        output_format = params.get('output_format', 'csv')
+        if kind == 'export' and (not isinstance(output_format, str) or output_format not in EXPORT_FORMATS):
+            return Response({'error': 'Unknown export format'}, status=status.HTTP_400_BAD_REQUEST)
+
+        if kind == 'import':
+            upload = request.FILES.get('file')
+            if upload is None:
+                return Response({'error': 'A CSV file is required'}, status=status.HTTP_400_BAD_REQUEST)
+            uploads_dir = jobs.results_dir() / 'uploads'
+            uploads_dir.mkdir(parents=True, exist_ok=True)
+            path = uploads_dir / f'{uuid.uuid4()}.csv'
+            with open(path, 'wb') as fileobj:
+                for chunk in upload.chunks():
+                    fileobj.write(chunk)
+            params['file'] = str(path)
+
+        job = jobs.enqueue(kind, params, user=request.user)
+        serializer = self.get_serializer(job)
+        return Response(serializer.data, status=status.HTTP_202_ACCEPTED)
+
+    @action(detail=True, methods=['post'])
+    def cancel(self, request, pk=None):
+        """Cancel a queued job or ask a running one to stop"""
+        job = self.get_object()
+        if job.is_finished:
+            return Response({'error': 'Job already finished'}, status=status.HTTP_400_BAD_REQUEST)
+        jobs.cancel(job)
+        job.refresh_from_db()
+        return Response(self.get_serializer(job).data)
+
+    @action(detail=True, methods=['get'])
+    def download(self, request, pk=None):
+        """Download the job's result file"""
+        job = self.get_object()
+        if job.status != 'succeeded' or not job.result_file:
+            raise Http404('No result file for this job')
+        path = jobs.results_dir() / job.result_file
+        if not path.is_file():
+            raise Http404('Result file no longer exists')
+        return FileResponse(open(path, 'rb'), as_attachment=True, filename=path.name)
+
+
+class RequestProfileViewSet(OptimizedQuerySetMixin, viewsets.ReadOnlyModelViewSet):
+    """Profiles captured with ?_profile= (see api/profiling.py), staff only"""
+    queryset = RequestProfile.objects.defer('data')
+    serializer_class = RequestProfileSerializer
+    permission_classes = [IsAdminUser]
+
+    @action(detail=True, methods=['get'])
+    def download(self, request, pk=None):
+        """Download the folded stacks, pstats dump or allocation report"""
+        profile = self.get_object()
+        content_type = {
+            'sample': 'text/plain; charset=utf-8',
+            'alloc': 'application/json',
+        }.get(profile.mode, 'application/octet-stream')
+        response = HttpResponse(bytes(profile.data), content_type=content_type)
+        response['Content-Disposition'] = f'attachment; filename="{profile.filename}"'
+        return response
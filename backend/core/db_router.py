@@ -0,0 +1,109 @@
+"""
+Read/write splitting between the primary database and a read replica.
+
+``ReplicaRoutingMiddleware`` decides per request whether reads may go to the
+replica: only safe-method requests to viewset actions listed as replica-safe
+qualify (``list``/``retrieve`` plus each viewset's ``replica_actions``). After
+a client writes, it is pinned to the primary for ``REPLICA_PIN_SECONDS`` so it
+reads its own changes even while the replica is catching up. Everything that
+runs outside such a request (management commands, job workers, writes) uses
+the primary.
+
+The replica is only used when a ``replica`` alias exists in DATABASES, so
+development and tests without one behave exactly as before.
+"""
+import hashlib
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+
+PRIMARY_ALIAS = 'default'
+REPLICA_ALIAS = 'replica'
+
+# Actions every viewset may serve from the replica for GET/HEAD/OPTIONS
+REPLICA_SAFE_ACTIONS = frozenset({'list', 'retrieve'})
+
+SAFE_METHODS = frozenset({'GET', 'HEAD', 'OPTIONS'})
+
+# Credentials are read from the primary so a token or session created a
+# moment ago works before the replica has caught up.
+PRIMARY_ONLY_APPS = frozenset({'authtoken', 'sessions'})
+
+_use_replica = ContextVar('use_replica', default=False)
+
+
+def replica_configured():
+    return REPLICA_ALIAS in settings.DATABASES
+
+
+class ReadReplicaRouter:
+    """Send reads to the replica when the current request allows it, writes to the primary"""
+
+    def db_for_read(self, model, **hints):
+        if _use_replica.get() and replica_configured() and model._meta.app_label not in PRIMARY_ONLY_APPS:
+            return REPLICA_ALIAS
+        return PRIMARY_ALIAS
+
+    def db_for_write(self, model, **hints):
+        return PRIMARY_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Both aliases hold the same data
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return None
+
+
+def _client_key(request):
+    """Stable identity for pinning: the auth token or the session cookie"""
+    credential = (
+        request.META.get('HTTP_AUTHORIZATION')
+        or request.COOKIES.get(settings.SESSION_COOKIE_NAME)
+    )
+    if not credential:
+        return None
+    return 'db-pin:' + hashlib.sha256(credential.encode()).hexdigest()[:32]
+
+
+def _replica_allowed(request, view_func):
+    if request.method not in SAFE_METHODS:
+        return False
+    viewset = getattr(view_func, 'cls', None)
+    actions = getattr(view_func, 'actions', None)
+    if viewset is None or not actions:
+        return False
+    action = actions.get(request.method.lower())
+    allowed = REPLICA_SAFE_ACTIONS | frozenset(getattr(viewset, 'replica_actions', ()))
+    return action in allowed
+
+
+class ReplicaRoutingMiddleware:
+    """Mark replica-safe requests and pin clients to the primary after they write"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        token = _use_replica.set(False)
+        try:
+            response = self.get_response(request)
+        finally:
+            _use_replica.reset(token)
+
+        if request.method not in SAFE_METHODS and replica_configured():
+            key = _client_key(request)
+            if key:
+                cache.set(key, True, getattr(settings, 'REPLICA_PIN_SECONDS', 5))
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if not replica_configured() or not _replica_allowed(request, view_func):
+            return None
+        key = _client_key(request)
+        if key and cache.get(key):
+            # Recently wrote: keep reading from the primary
+            return None
+        _use_replica.set(True)
+        return None
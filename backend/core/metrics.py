@@ -0,0 +1,271 @@
+"""
+Per-request performance metrics.
+
+``RequestMetricsMiddleware`` records for every request the view (viewset
+class and action), query count, SQL time, serializer time, response size and
+status. They are aggregated into histograms served in Prometheus text format
+at ``/api/_metrics``. Responses to staff users carry them in a
+``Server-Timing`` header (shown in the browser's network panel); with
+``DEBUG`` or ``METRICS_SERVER_TIMING`` every response does.
+
+Every process aggregates in memory and publishes a cumulative snapshot to the
+shared cache every ``METRICS_FLUSH_SECONDS`` under a slot it claims with
+``cache.add``, so the endpoint can merge all gunicorn workers without any
+per-request cache traffic. A restarted worker starts from zero, which
+Prometheus treats as a counter reset.
+"""
+import os
+import threading
+import time
+from contextlib import ExitStack
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+from rest_framework import serializers
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500)
+SIZE_BUCKETS = (1_000, 10_000, 100_000, 1_000_000, 10_000_000)
+
+HISTOGRAMS = {
+    'api_request_duration_seconds': ('Request duration', DURATION_BUCKETS),
+    'api_request_sql_seconds': ('Time spent in SQL per request', DURATION_BUCKETS),
+    'api_request_serializer_seconds': ('Time spent in serializer .data per request', DURATION_BUCKETS),
+    'api_request_queries': ('SQL queries per request', QUERY_BUCKETS),
+    'api_response_bytes': ('Response body size (non-streaming responses)', SIZE_BUCKETS),
+}
+
+MAX_WORKER_SLOTS = 64
+
+_current = ContextVar('request_metrics', default=None)
+
+
+class RequestMetrics:
+    __slots__ = ('view', 'queries', 'sql_time', 'serializer_time', 'serializer_depth')
+
+    def __init__(self):
+        self.view = None
+        self.queries = 0
+        self.sql_time = 0.0
+        self.serializer_time = 0.0
+        self.serializer_depth = 0
+
+    def sql_wrapper(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.sql_time += time.perf_counter() - started
+            self.queries += 1
+
+
+# Serializer timing: wrap the ``data`` property of DRF serializers. Nested
+# serializers go through to_representation, so only the outermost ``.data``
+# of a request is timed (the depth guard covers explicit nested calls).
+
+def _timed_data(prop):
+    def data(self):
+        metrics = _current.get()
+        if metrics is None or metrics.serializer_depth:
+            return prop.fget(self)
+        metrics.serializer_depth += 1
+        started = time.perf_counter()
+        try:
+            return prop.fget(self)
+        finally:
+            metrics.serializer_time += time.perf_counter() - started
+            metrics.serializer_depth -= 1
+    return property(data)
+
+
+def instrument_serializers():
+    for cls in (serializers.Serializer, serializers.ListSerializer):
+        # Marked on the class: other wrappers (api/profiling.py) may sit on top of ours
+        if not cls.__dict__.get('_metrics_instrumented', False):
+            cls.data = _timed_data(cls.__dict__['data'])
+            cls._metrics_instrumented = True
+
+
+# Aggregation
+
+class Registry:
+    """Cumulative histograms and counters of this process"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.histograms = {}   # (metric, view) -> [bucket counts..., +Inf count, sum]
+        self.requests = {}     # (view, method, status) -> count
+        self.last_flush = 0.0
+        self.slot = None
+
+    def observe(self, metric, view, value):
+        buckets = HISTOGRAMS[metric][1]
+        key = (metric, view)
+        series = self.histograms.get(key)
+        if series is None:
+            series = self.histograms[key] = [0] * (len(buckets) + 2)
+        for index, bound in enumerate(buckets):
+            if value <= bound:
+                series[index] += 1
+        series[-2] += 1
+        series[-1] += value
+
+    def record(self, view, method, status_code, duration, metrics, size):
+        with self.lock:
+            key = (view, method, status_code)
+            self.requests[key] = self.requests.get(key, 0) + 1
+            self.observe('api_request_duration_seconds', view, duration)
+            self.observe('api_request_sql_seconds', view, metrics.sql_time)
+            self.observe('api_request_serializer_seconds', view, metrics.serializer_time)
+            self.observe('api_request_queries', view, metrics.queries)
+            if size is not None:
+                self.observe('api_response_bytes', view, size)
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                'histograms': {key: list(series) for key, series in self.histograms.items()},
+                'requests': dict(self.requests),
+            }
+
+    def _claim_slot(self, timeout):
+        owner = f'{os.getpid()}:{id(self)}'
+        for slot in range(MAX_WORKER_SLOTS):
+            key = f'metrics:slot:{slot}'
+            if cache.add(key, owner, timeout) or cache.get(key) == owner:
+                return slot
+        return None
+
+    def flush(self, force=False):
+        """Publish this process's snapshot to the shared cache"""
+        interval = getattr(settings, 'METRICS_FLUSH_SECONDS', 10)
+        now = time.monotonic()
+        if not force and now - self.last_flush < interval:
+            return
+        self.last_flush = now
+        # Slots of workers that stop flushing expire with their snapshot
+        timeout = max(interval * 6, 60)
+        if self.slot is None or cache.get(f'metrics:slot:{self.slot}') is None:
+            self.slot = self._claim_slot(timeout)
+        if self.slot is None:
+            return
+        cache.set_many({
+            f'metrics:slot:{self.slot}': f'{os.getpid()}:{id(self)}',
+            f'metrics:snapshot:{self.slot}': self.snapshot(),
+        }, timeout)
+
+
+registry = Registry()
+
+
+def collect():
+    """Merge the snapshots of all processes"""
+    registry.flush(force=True)
+    keys = [f'metrics:snapshot:{slot}' for slot in range(MAX_WORKER_SLOTS)]
+    histograms, requests = {}, {}
+    for snapshot in cache.get_many(keys).values():
+        for key, series in snapshot['histograms'].items():
+            merged = histograms.setdefault(key, [0] * len(series))
+            for index, value in enumerate(series):
+                merged[index] += value
+        for key, count in snapshot['requests'].items():
+            requests[key] = requests.get(key, 0) + count
+    return histograms, requests
+
+
+def _label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def render_prometheus():
+    histograms, requests = collect()
+    lines = [
+        '# HELP api_requests_total Requests by view, method and status',
+        '# TYPE api_requests_total counter',
+    ]
+    for (view, method, status_code), count in sorted(requests.items()):
+        lines.append(
+            f'api_requests_total{{view="{_label(view)}",method="{method}",status="{status_code}"}} {count}'
+        )
+    for metric, (help_text, buckets) in HISTOGRAMS.items():
+        lines.append(f'# HELP {metric} {help_text}')
+        lines.append(f'# TYPE {metric} histogram')
+        for (name, view), series in sorted(histograms.items()):
+            if name != metric:
+                continue
+            labels = f'view="{_label(view)}"'
+            for bound, count in zip(buckets, series):
+                lines.append(f'{metric}_bucket{{{labels},le="{bound}"}} {count}')
+            lines.append(f'{metric}_bucket{{{labels},le="+Inf"}} {series[-2]}')
+            lines.append(f'{metric}_count{{{labels}}} {series[-2]}')
+            lines.append(f'{metric}_sum{{{labels}}} {series[-1]:.6f}')
+    return '\n'.join(lines) + '\n'
+
+
+# Middleware
+
+def view_name(view_func, request):
+    """``ViewSet.action`` for viewsets, the dotted path otherwise"""
+    viewset = getattr(view_func, 'cls', None)
+    actions = getattr(view_func, 'actions', None)
+    if viewset is not None and actions:
+        return f'{viewset.__name__}.{actions.get(request.method.lower(), request.method.lower())}'
+    if viewset is not None:
+        return viewset.__name__
+    return f'{view_func.__module__}.{getattr(view_func, "__name__", type(view_func).__name__)}'
+
+
+def server_timing_allowed(request):
+    """Timings and query counts are only shown to staff, unless DEBUG or METRICS_SERVER_TIMING"""
+    if settings.DEBUG or getattr(settings, 'METRICS_SERVER_TIMING', False):
+        return True
+    # Set by the session middleware, or by DRF once it authenticated a token
+    user = getattr(request, 'user', None)
+    return bool(user is not None and user.is_authenticated and user.is_staff)
+
+
+class RequestMetricsMiddleware:
+    """Measure each request, feed the histograms and add Server-Timing where allowed"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        instrument_serializers()
+
+    def __call__(self, request):
+        if not getattr(settings, 'METRICS_ENABLED', True):
+            return self.get_response(request)
+
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        started = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(metrics.sql_wrapper))
+                response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        duration = time.perf_counter() - started
+
+        if server_timing_allowed(request):
+            app_time = max(duration - metrics.sql_time - metrics.serializer_time, 0.0)
+            response['Server-Timing'] = ', '.join([
+                f'db;dur={metrics.sql_time * 1000:.1f};desc="{metrics.queries} queries"',
+                f'ser;dur={metrics.serializer_time * 1000:.1f};desc="serializers"',
+                f'app;dur={app_time * 1000:.1f};desc="view"',
+                f'total;dur={duration * 1000:.1f}',
+            ])
+
+        size = None if response.streaming else len(response.content)
+        view = metrics.view or 'unresolved'
+        registry.record(view, request.method, response.status_code, duration, metrics, size)
+        registry.flush()
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        metrics = _current.get()
+        if metrics is not None:
+            metrics.view = view_name(view_func, request)
+        return None
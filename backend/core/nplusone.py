@@ -0,0 +1,147 @@
+"""
+N+1 query detection.
+
+Queries are fingerprinted by their SQL template (parameters are not part of
+it and ``IN (%s, %s, ...)`` lists are collapsed), so the per-row lookups of
+an N+1 pattern - e.g. ``LeadSerializer.company_name`` loading each lead's
+company - share one fingerprint. When a fingerprint repeats at least
+``NPLUSONE_THRESHOLD`` times from the same site within one request, that is
+reported together with the site: the serializer field whose
+``get_attribute`` triggered the query, or else the innermost project frame.
+
+* ``NPlusOneMiddleware`` checks every request. ``NPLUSONE_MODE`` is ``log``
+  (warn on the ``nplusone`` logger, the default with DEBUG), ``raise``
+  (raise ``NPlusOneError``, for CI) or ``off``.
+* ``detect_nplusone()`` is a context manager for tests and shells, and
+  ``NPlusOneAssertionsMixin.assertNoNPlusOne`` wraps it for TestCases.
+"""
+import logging
+import re
+import sys
+from collections import Counter, defaultdict
+from contextlib import ExitStack, contextmanager
+from pathlib import Path
+
+from django.conf import settings
+from django.db import connections
+from rest_framework.fields import Field
+from rest_framework.serializers import ListSerializer
+
+logger = logging.getLogger('nplusone')
+
+DEFAULT_THRESHOLD = 5
+
+_IN_LIST = re.compile(r'IN \((?:%s, )*%s\)')
+_PROJECT_ROOT = str(Path(__file__).resolve().parent.parent)
+# Instrumentation (this module, metrics wrappers) is never the culprit
+_CORE_DIR = str(Path(__file__).resolve().parent)
+
+
+class NPlusOneError(AssertionError):
+    pass
+
+
+def fingerprint(sql):
+    return _IN_LIST.sub('IN (...)', sql)
+
+
+def _query_site():
+    """(serializer field, project code site) responsible for the current query"""
+    field_site = code_site = None
+    frame = sys._getframe(2)
+    while frame is not None and not (field_site and code_site):
+        code = frame.f_code
+        # A field reading its attribute, or a nested many=True serializer
+        # iterating its related manager
+        if field_site is None and code.co_name in ('get_attribute', 'to_representation'):
+            field = frame.f_locals.get('self')
+            if (isinstance(field, Field) and field.field_name
+                    and (code.co_name == 'get_attribute' or isinstance(field, ListSerializer))):
+                field_site = f'{type(field.parent).__name__}.{field.field_name}'
+        filename = code.co_filename
+        if (code_site is None and filename.startswith(_PROJECT_ROOT)
+                and not filename.startswith(_CORE_DIR) and 'site-packages' not in filename):
+            code_site = f'{Path(filename).relative_to(_PROJECT_ROOT)}:{frame.f_lineno} in {code.co_name}'
+        frame = frame.f_back
+    return field_site, code_site
+
+
+class QueryRecorder:
+    """execute_wrapper that groups queries by fingerprint and call site"""
+
+    def __init__(self):
+        self.queries = defaultdict(Counter)   # fingerprint -> Counter(site)
+        self.examples = {}
+
+    def __call__(self, execute, sql, params, many, context):
+        key = fingerprint(sql)
+        field_site, code_site = _query_site()
+        self.queries[key][field_site or code_site or 'unknown'] += 1
+        self.examples.setdefault(key, (sql, params))
+        return execute(sql, params, many, context)
+
+    def findings(self, threshold=None):
+        """[(site, count, sql)] for every fingerprint repeated from one site"""
+        threshold = threshold or getattr(settings, 'NPLUSONE_THRESHOLD', DEFAULT_THRESHOLD)
+        found = []
+        for key, sites in self.queries.items():
+            for site, count in sites.items():
+                if count >= threshold:
+                    found.append((site, count, self.examples[key][0]))
+        return sorted(found, key=lambda finding: -finding[1])
+
+
+def format_findings(findings, context=''):
+    lines = [f'N+1 queries detected{f" in {context}" if context else ""}:']
+    for site, count, sql in findings:
+        lines.append(f'  {count}x from {site}: {sql[:200]}')
+    return '\n'.join(lines)
+
+
+@contextmanager
+def record_queries(using=None):
+    recorder = QueryRecorder()
+    aliases = [using] if using else list(connections)
+    with ExitStack() as stack:
+        for alias in aliases:
+            stack.enter_context(connections[alias].execute_wrapper(recorder))
+        yield recorder
+
+
+@contextmanager
+def detect_nplusone(threshold=None, using=None):
+    """Raise NPlusOneError if the block runs an N+1 query pattern"""
+    with record_queries(using) as recorder:
+        yield recorder
+    findings = recorder.findings(threshold)
+    if findings:
+        raise NPlusOneError(format_findings(findings))
+
+
+class NPlusOneAssertionsMixin:
+    """TestCase mixin: ``with self.assertNoNPlusOne(): self.client.get(...)``"""
+
+    def assertNoNPlusOne(self, threshold=None, using=None):
+        return detect_nplusone(threshold, using)
+
+
+class NPlusOneMiddleware:
+    """Check each request for N+1 patterns according to NPLUSONE_MODE"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        mode = getattr(settings, 'NPLUSONE_MODE', 'off')
+        if mode == 'off':
+            return self.get_response(request)
+
+        with record_queries() as recorder:
+            response = self.get_response(request)
+        findings = recorder.findings()
+        if findings:
+            message = format_findings(findings, f'{request.method} {request.path}')
+            if mode == 'raise':
+                raise NPlusOneError(message)
+            logger.warning(message)
+        return response
@@ -0,0 +1,46 @@
+"""
+Server profiles: what a process loads at startup.
+
+``SERVER_PROFILE`` (environment) selects one per process:
+
+* ``full``: everything. It is used by the admin worker, management commands
+  and job workers (imports go through the admin's import-export resources).
+* ``api``: a pure REST worker for token clients. It drops the admin app and
+  its model registrations, django-import-export, sessions, messages, CSRF and
+  ``SessionAuthentication``. ``/admin/`` is not routed there, so put it on a
+  ``full`` worker (ecosystem.config.js).
+
+The ``api`` profile installs fewer apps, so run ``migrate`` with ``full``.
+Compare the two with ``manage.py bench_startup``.
+"""
+from django.core.exceptions import ImproperlyConfigured
+
+# Settings entries (apps, middleware, context processors, DRF
+# authentication classes) that each profile leaves out
+SERVER_PROFILES = {
+    'full': frozenset(),
+    'api': frozenset({
+        'django.contrib.admin',
+        'django.contrib.sessions',
+        'django.contrib.messages',
+        'import_export',
+        'django.contrib.sessions.middleware.SessionMiddleware',
+        'django.middleware.csrf.CsrfViewMiddleware',
+        # Needs a session; DRF authenticates the request itself
+        'django.contrib.auth.middleware.AuthenticationMiddleware',
+        'django.contrib.messages.middleware.MessageMiddleware',
+        'django.contrib.messages.context_processors.messages',
+        'rest_framework.authentication.SessionAuthentication',
+    }),
+}
+
+
+def profile_filter(profile):
+    """Function that drops the entries ``profile`` leaves out of a settings list"""
+    try:
+        excluded = SERVER_PROFILES[profile]
+    except KeyError:
+        raise ImproperlyConfigured(
+            f"Unknown SERVER_PROFILE {profile!r}; expected one of {', '.join(SERVER_PROFILES)}"
+        )
+    return lambda entries: [entry for entry in entries if entry not in excluded]
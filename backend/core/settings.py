@@ -12,6 +12,11 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 
 from pathlib import Path
 
+from decouple import config
+
+from .profiles import profile_filter
+from .sqlite import sqlite_options
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -37,7 +42,13 @@ ALLOWED_HOSTS = [
 
 # Application definition
 
-INSTALLED_APPS = [
+# SERVER_PROFILE selects what the process loads (core/profiles.py): 'full'
+# (admin worker, commands, jobs) or 'api' (REST workers without the admin,
+# import-export, sessions, messages, CSRF and session authentication).
+SERVER_PROFILE = config('SERVER_PROFILE', default='full')
+in_profile = profile_filter(SERVER_PROFILE)
+
+INSTALLED_APPS = in_profile([
     'django.contrib.admin',
     'django.contrib.auth',
     'django.contrib.contenttypes',
@@ -50,18 +61,22 @@ INSTALLED_APPS = [
     # 'django_filters',  # Uncomment after installing django-filter
     'api',
     'import_export',
-]
+])
 
-MIDDLEWARE = [
+MIDDLEWARE = in_profile([
+    'core.metrics.RequestMetricsMiddleware',
+    'core.nplusone.NPlusOneMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'api.profiling.RequestProfilerMiddleware',
+    'core.db_router.ReplicaRoutingMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
-]
+])
 
 ROOT_URLCONF = 'core.urls'
 
@@ -71,11 +86,11 @@ TEMPLATES = [
         'DIRS': [],
         'APP_DIRS': True,
         'OPTIONS': {
-            'context_processors': [
+            'context_processors': in_profile([
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
-            ],
+            ]),
         },
     },
 ]
@@ -86,13 +101,34 @@ WSGI_APPLICATION = 'core.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+# SQLITE_PROFILE selects the connection profile from core/sqlite.py
+# ('production' = WAL, mmap, busy timeout, immediate transactions).
+SQLITE_PROFILE = config('SQLITE_PROFILE', default='production')
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        'NAME': config('SQLITE_PATH', default=str(BASE_DIR / 'db.sqlite3')),
+        'OPTIONS': sqlite_options(SQLITE_PROFILE),
     }
 }
 
+# Optional read replica. Safe-method viewset requests read from it (see
+# core/db_router.py); writers are pinned to the primary for a few seconds.
+# Locally this can be a second SQLite file refreshed with
+# `python manage.py sync_replica`.
+SQLITE_REPLICA_PATH = config('SQLITE_REPLICA_PATH', default='')
+if SQLITE_REPLICA_PATH:
+    DATABASES['replica'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': SQLITE_REPLICA_PATH,
+        'OPTIONS': sqlite_options(SQLITE_PROFILE),
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_ROUTERS = ['core.db_router.ReadReplicaRouter']
+REPLICA_PIN_SECONDS = config('REPLICA_PIN_SECONDS', default=5, cast=int)
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -137,10 +173,10 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 # Django REST Framework
 REST_FRAMEWORK = {
-    'DEFAULT_AUTHENTICATION_CLASSES': [
+    'DEFAULT_AUTHENTICATION_CLASSES': in_profile([
         'rest_framework.authentication.SessionAuthentication',
-        'rest_framework.authentication.TokenAuthentication',
-    ],
+        'api.authentication.CachedTokenAuthentication',
+    ]),
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
@@ -170,3 +206,78 @@ CORS_ALLOW_CREDENTIALS = True
 
 # Allow all headers and methods for development
 CORS_ALLOW_ALL_ORIGINS = True  # Only for development - set to False in production
+
+# Cache: shared Redis when REDIS_URL is set (needed for invalidation and
+# replica pinning to work across gunicorn workers), local memory otherwise
+REDIS_URL = config('REDIS_URL', default='')
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+# API response cache (api/cache.py)
+API_CACHE_ENABLED = config('API_CACHE_ENABLED', default=True, cast=bool)
+API_CACHE_ALIAS = 'default'
+API_CACHE_TIMEOUT = config('API_CACHE_TIMEOUT', default=300, cast=int)
+
+# Seconds a token -> user resolution is reused (api/authentication.py)
+AUTH_TOKEN_CACHE_TIMEOUT = config('AUTH_TOKEN_CACHE_TIMEOUT', default=60, cast=int)
+
+# Request metrics (core/metrics.py): Server-Timing header and /api/_metrics
+METRICS_ENABLED = config('METRICS_ENABLED', default=True, cast=bool)
+# Server-Timing for every client; otherwise only staff users (or DEBUG) get it
+METRICS_SERVER_TIMING = config('METRICS_SERVER_TIMING', default=False, cast=bool)
+METRICS_FLUSH_SECONDS = 10
+
+# N+1 query detection (core/nplusone.py): 'log', 'raise' (CI) or 'off'
+NPLUSONE_MODE = config('NPLUSONE_MODE', default='log' if DEBUG else 'off')
+NPLUSONE_THRESHOLD = config('NPLUSONE_THRESHOLD', default=5, cast=int)
+
+# Staff request profiling with ?_profile=sample|cprofile|alloc (api/profiling.py)
+PROFILER_ENABLED = config('PROFILER_ENABLED', default=True, cast=bool)
+PROFILER_KEEP = 50
+PROFILER_SAMPLE_INTERVAL = 0.005
+PROFILER_TRACEMALLOC_FRAMES = 32
+
+# Change stream (api/stream.py, GET /api/stream/)
+STREAM_BROKER = config('STREAM_BROKER', default='api.stream.DatabaseBroker')
+STREAM_POLL_SECONDS = config('STREAM_POLL_SECONDS', default=1.0, cast=float)
+STREAM_HEARTBEAT_SECONDS = 15
+STREAM_MAX_SECONDS = config('STREAM_MAX_SECONDS', default=300, cast=int)
+STREAM_SCOPE_REFRESH_SECONDS = 30
+STREAM_RETENTION_SECONDS = 3600
+# Lifetime of the single-use ticket an EventSource opens the stream with
+STREAM_TICKET_SECONDS = config('STREAM_TICKET_SECONDS', default=30, cast=int)
+
+# Background jobs (api/jobs.py, run with `python manage.py run_jobs`)
+JOB_RESULTS_DIR = BASE_DIR / 'job_results'
+JOB_HEARTBEAT_SECONDS = 30
+JOB_STALE_SECONDS = 300
+JOB_MAX_ATTEMPTS = 3
+
+# Analysis child rows dated before this many days ago are moved to the
+# archive table by `python manage.py archive_rows` (see api/archive.py)
+ARCHIVE_HORIZON_DAYS = config('ARCHIVE_HORIZON_DAYS', default=365, cast=int)
+
+# Minimum name similarity (0-1) for linking a competitor name to a company
+# with `python manage.py resolve_competitors` (see api/competitors.py)
+COMPETITOR_MATCH_THRESHOLD = config('COMPETITOR_MATCH_THRESHOLD', default=0.88, cast=float)
+
+# Weight of each analysis type in Company.ai_score / ai_confidence, rolled up
+# from the latest completed analysis of each type (see api/rollup.py)
+COMPANY_SCORE_WEIGHTS = {
+    'high_level_analyses': 0.30,
+    'perception_analyses': 0.15,
+    'market_analyses': 0.20,
+    'key_individuals_analyses': 0.15,
+    'competitive_analyses': 0.20,
+}
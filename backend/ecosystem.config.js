@@ -1,5 +1,6 @@
 module.exports = {
   apps: [{
+    // REST API only (SERVER_PROFILE=api, see core/profiles.py): no admin, sessions or CSRF
     name: 'alphaint-backend',
     script: '.venv/bin/gunicorn',
     args: 'core.wsgi:application --bind 0.0.0.0:8000 --workers 3 --timeout 120',
@@ -11,12 +12,70 @@ module.exports = {
     max_memory_restart: '1G',
     env: {
       DJANGO_SETTINGS_MODULE: 'core.settings',
+      SERVER_PROFILE: 'api',
       PYTHONUNBUFFERED: '1'
     },
     error_file: './logs/backend-error.log',
     out_file: './logs/backend-out.log',
     log_file: './logs/backend-combined.log',
     time: true
+  }, {
+    // Django admin (proxy /admin/ and /static/ to port 8002)
+    name: 'alphaint-admin',
+    script: '.venv/bin/gunicorn',
+    args: 'core.wsgi:application --bind 0.0.0.0:8002 --workers 1 --timeout 120',
+    interpreter: 'none',
+    instances: 1,
+    autorestart: true,
+    watch: false,
+    max_memory_restart: '1G',
+    env: {
+      DJANGO_SETTINGS_MODULE: 'core.settings',
+      SERVER_PROFILE: 'full',
+      PYTHONUNBUFFERED: '1'
+    },
+    error_file: './logs/admin-error.log',
+    out_file: './logs/admin-out.log',
+    log_file: './logs/admin-combined.log',
+    time: true
+  }, {
+    // Async endpoints under /api/async/ (proxy that prefix to port 8001)
+    name: 'alphaint-asgi',
+    script: '.venv/bin/uvicorn',
+    args: 'core.asgi:application --host 0.0.0.0 --port 8001 --workers 2',
+    interpreter: 'none',
+    instances: 1,
+    autorestart: true,
+    watch: false,
+    max_memory_restart: '1G',
+    env: {
+      DJANGO_SETTINGS_MODULE: 'core.settings',
+      SERVER_PROFILE: 'api',
+      PYTHONUNBUFFERED: '1'
+    },
+    error_file: './logs/asgi-error.log',
+    out_file: './logs/asgi-out.log',
+    log_file: './logs/asgi-combined.log',
+    time: true
+  }, {
+    name: 'alphaint-jobs',
+    script: '.venv/bin/python',
+    args: 'manage.py run_jobs --workers 2',
+    interpreter: 'none',
+    instances: 1,
+    autorestart: true,
+    watch: false,
+    max_memory_restart: '1G',
+    env: {
+      DJANGO_SETTINGS_MODULE: 'core.settings',
+      // Imports use the admin's import-export resources
+      SERVER_PROFILE: 'full',
+      PYTHONUNBUFFERED: '1'
+    },
+    error_file: './logs/jobs-error.log',
+    out_file: './logs/jobs-out.log',
+    log_file: './logs/jobs-combined.log',
+    time: true
   }]
 }
 
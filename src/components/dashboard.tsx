@@ -56,11 +56,17 @@ export function Dashboard() {
 
   useEffect(() => {
     fetchDashboardData()
+
+    // Refresh when the server reports a change instead of polling
+    const refresh = () => fetchDashboardData(false)
+    const events = ['analysis.created', 'analysis.completed', 'lead.status_changed', 'investment.updated']
+    const stream = apiService.stream.connect(Object.fromEntries(events.map((event) => [event, refresh])))
+    return () => stream.close()
   }, [])
 
-  const fetchDashboardData = async () => {
+  const fetchDashboardData = async (showLoading = true) => {
     try {
-      setLoading(true)
+      if (showLoading) setLoading(true)
       const [statsResponse, analysesResponse, tasksResponse] = await Promise.all([
         apiService.dashboard.stats(),
         apiService.dashboard.recentAnalyses(),
@@ -97,7 +103,7 @@ export function Dashboard() {
         <div className="flex items-center justify-center h-64">
           <div className="text-center">
             <p className="text-red-500 mb-4">{error}</p>
-            <Button onClick={fetchDashboardData}>Retry</Button>
+            <Button onClick={() => fetchDashboardData()}>Retry</Button>
           </div>
         </div>
       </div>
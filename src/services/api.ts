@@ -58,6 +58,8 @@ export const apiService = {
     create: (data: any) => api.post('/companies/', data),
     update: (id: string, data: any) => api.put(`/companies/${id}/`, data),
     delete: (id: string) => api.delete(`/companies/${id}/`),
+    watch: (id: string) => api.post(`/companies/${id}/watch/`),
+    unwatch: (id: string) => api.delete(`/companies/${id}/watch/`),
     search: (params: any) => api.get('/companies/search/', { params }),
     fullAnalysis: (id: string) => api.get(`/companies/${id}/full_analysis/`),
   },
@@ -100,6 +102,51 @@ export const apiService = {
     upcomingTasks: () => api.get('/dashboard/upcoming_tasks/'),
   },
 
+  // Change stream (server-sent events); refetch on events instead of polling.
+  // EventSource cannot send the Authorization header, so every connection is
+  // opened with a short-lived, single-use ticket rather than the API token.
+  stream: {
+    connect: (listeners: Record<string, (event: MessageEvent) => void>) => {
+      let source: EventSource | null = null
+      let lastEventId = ''
+      let closed = false
+      let retry: ReturnType<typeof setTimeout> | undefined
+
+      const reconnect = () => {
+        source?.close()
+        if (!closed) retry = setTimeout(open, 3000)
+      }
+      const open = async () => {
+        try {
+          const { data } = await api.post('/stream/ticket/')
+          if (closed) return
+          const params = new URLSearchParams({ ticket: data.ticket })
+          if (lastEventId) params.set('last_event_id', lastEventId)
+          source = new EventSource(`${API_BASE_URL}/stream/?${params}`)
+          Object.entries(listeners).forEach(([name, listener]) => {
+            source!.addEventListener(name, (event) => {
+              lastEventId = (event as MessageEvent).lastEventId || lastEventId
+              listener(event as MessageEvent)
+            })
+          })
+          // The ticket is spent, so EventSource's own retry would be rejected
+          source.onerror = reconnect
+        } catch {
+          reconnect()
+        }
+      }
+
+      open()
+      return {
+        close: () => {
+          closed = true
+          clearTimeout(retry)
+          source?.close()
+        },
+      }
+    },
+  },
+
   // User Profile
   profile: {
     get: () => api.get('/profiles/me/'),